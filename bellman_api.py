@@ -0,0 +1,318 @@
+"""Headless route-finding API and command line tool.
+
+Load a graph once, then answer any number of (source[, target]) queries
+without Tkinter or a display:
+
+    from bellman_api import RouteFinder
+    finder = RouteFinder.from_file("roads.csv")
+    finder.query("A", "C")   # {"source": "A", "target": "C", "distance": 15, "path": ["A", "B", "C"], "engine": "dijkstra"}
+
+"engine" says which algorithm answered: with the default engine "auto" that
+is Dijkstra when no road is negative and Bellman-Ford (early-exit) otherwise.
+
+Command line (queries are read from stdin or --queries, one "SOURCE [TARGET]" per line):
+
+    python bellman_api.py roads.csv --format jsonl < queries.txt
+
+Graph files are read by bellman_import: DIMACS .gr, CSV edge lists and
+matrices, JSON, "from to weight" text and .bfg snapshots. A parsed file is
+kept as a snapshot, so the next run with the same file skips the parsing.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+from bellman_batch import BatchSolver
+from bellman_cache import ResultCache
+from bellman_graph import Graph
+from bellman_import import import_graph, read_graph
+from bellman_profile import NO_PROFILE
+from bellman_solver import (INF, ENGINE_CHOICES, ROUTE_MODES, BACKENDS, BACKEND_EXE, Cancelled, NegativeCycleError,
+                            open_solver)
+
+
+def load_graph(path):
+    """Read a graph file, returns (names, edges) with edges as (from_index, to_index, weight).
+    import_graph() is the better choice for big files: it keeps the roads compact."""
+    graph = read_graph(path)
+    return graph.names, list(graph.edges())
+
+
+class RouteFinder:
+    """Answers shortest-route queries on one graph, reusing results per source.
+
+    With point_to_point set to "dijkstra" or "bidirectional", a query with a
+    target whose source tree isn't cached runs a search that stops at the
+    target instead of solving (and caching) the whole tree.
+
+    With a bellman_cache.ResultCache, trees are also looked up on disk before
+    any solver is started, and stored there after being solved.
+    """
+
+    def __init__(self, names=None, edges=None, backend="auto", engine="auto", point_to_point=None, cache=None):
+        self.backend = backend
+        self.engine = engine
+        self.point_to_point = point_to_point  # None, or one of ROUTE_MODES
+        self.cache = cache  # ResultCache or None
+        self.solver = None
+        self.graph = Graph.from_edges([], [])  # bellman_graph.Graph shared with the solver
+        self.trees = {}  # (source, engine) -> ShortestPathTree for the current graph
+        self.profile = NO_PROFILE  # A bellman_profile.RunProfile here times the solver's stages
+        self.preloading = False  # Cleared by stop_preload() to end a preload() early
+        self.cancelled = False  # Set by cancel(), even before a solver is open; see reset_cancel()
+        if names is not None:
+            self.set_graph(names, edges)
+
+    @classmethod
+    def from_file(cls, path, snapshot_dir=None, **options):
+        """Create a RouteFinder for a graph file (see bellman_import.import_graph)"""
+        finder = cls(**options)
+        finder.set_graph_model(import_graph(path, snapshot_dir))
+        return finder
+
+    def set_backend(self, backend):
+        """Switch solver backend ("auto", "c" or "numpy"); the next query opens it"""
+        if backend != self.backend:
+            self.close()
+            self.backend = backend
+
+    @property
+    def names(self):
+        """City names of the current graph"""
+        return self.graph.names
+
+    def set_graph(self, names, edges):
+        """Replace the graph with (from_index, to_index, weight) edges"""
+        self.set_graph_model(Graph.from_edges(names, edges))
+
+    def set_graph_model(self, graph):
+        """Replace the graph with a bellman_graph.Graph; cached results are dropped only if it changed"""
+        if graph is self.graph or graph == self.graph:
+            return
+        self.graph = graph
+        self.trees = {}
+
+    def tree(self, source, engine=None, progress=None):
+        """ShortestPathTree from source (raises ValueError for unknown cities / negative cycles).
+
+        progress(pass_number, relaxations) is called while a long query runs.
+        """
+        engine = engine or self.engine
+        key = (source, engine)
+        if key not in self.trees:
+            tree = self._from_disk(source, engine)
+            if tree is None:
+                try:
+                    tree = self._solver().query(source, engine, progress)
+                except NegativeCycleError:
+                    if self.cache is not None:
+                        self.cache.put_negative_cycle(self.graph.digest(), source, engine, self.graph.V)
+                    try:
+                        self._count_work()  # The worker finished normally, so its counters are valid
+                    except (OSError, RuntimeError):
+                        pass  # Report the negative cycle, not a failure to read the counters
+                    raise
+                self._count_work()
+                if self.cache is not None:
+                    with self.profile.stage("disk cache store"):
+                        self.cache.put(self.graph.digest(), source, engine, tree)
+            self.trees[key] = tree
+        return self.trees[key]
+
+    def _from_disk(self, source, engine):
+        """Tree from the disk cache, or None (also None when there is no cache)"""
+        if self.cache is None or source not in self.graph.index:
+            return None
+        with self.profile.stage("disk cache lookup"):
+            try:
+                return self.cache.get(self.graph.digest(), source, engine, self.graph.names)
+            finally:
+                if self.profile.enabled:
+                    self.profile.counters.update(self.cache.stats())
+
+    def route(self, source, target, bidirectional=False, progress=None):
+        """bellman_solver.Route source -> target from a search that stops at the target
+        (a full Bellman-Ford query when the graph has negative roads). Not cached."""
+        route = self._solver().route(source, target, bidirectional, progress)
+        self._count_work()
+        return route
+
+    def _count_work(self):
+        """Add the solver's work counters to the profile after a query that finished.
+        Not called after Cancelled or a worker crash: there is nothing to count then."""
+        if self.profile.enabled:
+            self.profile.counters.update(self.solver.stats())
+
+    def _solver(self):
+        """The solver with the current graph loaded (opened on first use)"""
+        if self.solver is None:
+            self.solver = open_solver(self.backend)
+            if self.cancelled:
+                self.solver.cancel()  # cancel() came before there was a solver to tell
+        if self.cancelled:
+            raise Cancelled("Query cancelled")
+        self.solver.profile = self.profile
+        self.solver.set_graph_model(self.graph)
+        return self.solver
+
+    def cached(self, source, engine=None):
+        """Tree already known for this source (from a query or preload()), else None"""
+        return self.trees.get((source, engine or self.engine))
+
+    def preload(self, sources=None, engine=None, workers=None, on_tree=None, started=False):
+        """Solve many sources on all CPU cores (see bellman_batch) and cache their trees.
+
+        sources defaults to every city. on_tree(done, total) is called as each one
+        arrives. Stops early after stop_preload() or when set_graph() changes the
+        graph. Sources that fail (negative cycle) are skipped; query() reports them.
+        To run it in another thread, set preloading = True before starting the
+        thread and pass started=True, so a stop_preload() in between isn't lost.
+        """
+        if not started:
+            self.preloading = True
+        engine = engine or self.engine
+        graph, trees = self.graph, self.trees
+        todo = [s for s in (graph.names if sources is None else sources) if (s, engine) not in trees]
+        if not todo:
+            return
+        with BatchSolver(graph, self.backend, engine, workers) as batch:
+            for done, (source, tree) in enumerate(batch.solve(todo), 1):
+                if not self.preloading or self.graph is not graph:
+                    break  # Stopped, or the graph was replaced while we worked
+                if not isinstance(tree, Exception):
+                    trees[(source, engine)] = tree
+                if on_tree:
+                    on_tree(done, len(todo))
+        self.preloading = False
+
+    def stop_preload(self):
+        """Make a preload() running in another thread stop after its current source"""
+        self.preloading = False
+
+    def cancel(self):
+        """Stop a query running in another thread; it raises bellman_solver.Cancelled.
+
+        Works before the query has opened a solver too. Queries keep raising
+        Cancelled until reset_cancel().
+        """
+        self.cancelled = True
+        if self.solver is not None:
+            self.solver.cancel()
+
+    def reset_cancel(self):
+        """Forget an earlier cancel() before starting a new job"""
+        self.cancelled = False
+        if self.solver is not None:
+            self.solver.reset_cancel()
+
+    def query(self, source, target=None):
+        """Result dict for one query; errors are reported in the dict instead of raised"""
+        try:
+            if target is not None and self.point_to_point and self.cached(source) is None:
+                route = self.route(source, target, self.point_to_point == "bidirectional")
+                d = route.distance
+                return {"source": source, "target": target, "distance": None if d == INF else d,
+                        "path": route.path, "engine": route.engine}
+            tree = self.tree(source)
+            if target is None:
+                return {"source": source,
+                        "distances": {n: (None if d == INF else d) for n, d in tree.distances().items()},
+                        "engine": tree.engine}
+            d = tree.distance(target)
+            return {"source": source, "target": target,
+                    "distance": None if d == INF else d, "path": tree.path_to(target), "engine": tree.engine}
+        except (KeyError, ValueError) as e:
+            message = f"Unknown city {e}" if isinstance(e, KeyError) else str(e)
+            return {"source": source, "target": target, "error": message}
+
+    def close(self):
+        """Release the solver (stops the C worker if one is running)"""
+        if self.solver is not None:
+            self.solver.close()
+            self.solver = None
+        self.trees = {}
+
+
+def parse_query(line):
+    """'A' / 'A B' / 'A,B' -> (source, target or None); blank lines and comments give None"""
+    parts = line.split("#")[0].replace(",", " ").split()
+    if not parts:
+        return None
+    return parts[0], (parts[1] if len(parts) > 1 else None)
+
+
+def write_csv_rows(writer, result):
+    """One CSV row per (source, target) pair in a query result"""
+    if "error" in result:
+        writer.writerow([result["source"], result["target"] or "", "", "", result["error"], ""])
+    elif "distances" in result:
+        for target, d in result["distances"].items():
+            writer.writerow([result["source"], target, "INF" if d is None else d, "", "", result["engine"]])
+    else:
+        d = result["distance"]
+        writer.writerow([result["source"], result["target"], "INF" if d is None else d,
+                         ">".join(result["path"]), "", result["engine"]])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer shortest-route queries on a graph file")
+    parser.add_argument("graph", help="graph file (.gr, .json, .csv edge list or matrix, .bfg snapshot "
+                                      "or 'from to weight' text)")
+    parser.add_argument("--queries", help="query file, one 'SOURCE [TARGET]' per line (default: stdin)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl", help="output format")
+    parser.add_argument("--backend", choices=BACKENDS, default="auto", help="solver backend")
+    parser.add_argument("--engine", choices=ENGINE_CHOICES, default="auto",
+                        help="algorithm (auto = Dijkstra unless a road is negative)")
+    parser.add_argument("--point-to-point", choices=list(ROUTE_MODES),
+                        help="answer 'SOURCE TARGET' queries with a search that stops at the target")
+    parser.add_argument("--cache-dir", help="where solved trees are kept between runs (default: user cache folder)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="don't read or write the disk cache (results and graph snapshots)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="solve the distinct sources on this many processes first (reads all queries before answering)")
+    args = parser.parse_args(argv)
+    if args.backend == "c" and not os.path.exists(BACKEND_EXE):
+        parser.error("Compile C program: gcc bellman_backend.c -o bellman_backend.exe")
+
+    cache = None if args.no_cache else ResultCache(args.cache_dir)
+    snapshot_dir = False if args.no_cache else args.cache_dir and os.path.join(args.cache_dir, "snapshots")
+    try:
+        finder = RouteFinder.from_file(args.graph, snapshot_dir, backend=args.backend, engine=args.engine,
+                                       point_to_point=args.point_to_point, cache=cache)
+    except (OSError, ValueError) as e:  # Malformed lines are listed with their numbers
+        sys.exit(str(e))
+    source_file = open(args.queries) if args.queries else sys.stdin
+    interactive = source_file is sys.stdin  # A program driving us over a pipe waits for each answer
+    writer = csv.writer(sys.stdout) if args.format == "csv" else None
+    if writer:
+        writer.writerow(["source", "target", "distance", "path", "error", "engine"])
+        if interactive:
+            sys.stdout.flush()
+    try:
+        lines = source_file
+        if args.workers > 1:
+            lines = list(source_file)
+            queries = [q for q in map(parse_query, lines) if q]
+            finder.preload([s for s in dict.fromkeys(q[0] for q in queries) if s in finder.names],
+                           workers=args.workers)
+        for line in lines:
+            query = parse_query(line)
+            if query is None:
+                continue
+            result = finder.query(*query)
+            if writer:
+                write_csv_rows(writer, result)
+            else:
+                sys.stdout.write(json.dumps(result) + "\n")
+            if interactive:
+                sys.stdout.flush()
+    finally:
+        finder.close()
+        if source_file is not sys.stdin:
+            source_file.close()
+
+
+if __name__ == "__main__":
+    main()
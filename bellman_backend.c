@@ -2,9 +2,15 @@
 #include <stdlib.h>
 #include <string.h>
 #include <limits.h>
+#include <stdint.h>
+#include <time.h>
+#ifdef _WIN32
+#include <fcntl.h>
+#include <io.h>
+#endif
 
 // Define max limits for our arrays
-#define MAX 50        // Maximum number of cities we can handle
+// (there is no limit on the number of cities: everything is allocated to fit the graph)
 #define NAME_LEN 30   // Maximum length for a city name
 
 // Structure to store an edge (road)
@@ -18,18 +24,115 @@ struct Edge {
 struct Graph {
     int V, E;              // V = number of vertices (cities), E = number of edges (roads)
     struct Edge* edge;     // Pointer to array of edges (dynamically allocated)
+    int* outStart;         // Outgoing edges of city u are outEdge[outStart[u] .. outStart[u+1]-1]
+    int* outEdge;          // Edge indices grouped by source city (used by SPFA and Dijkstra)
+    int* inStart;          // Same for incoming edges: inEdge[inStart[v] .. inStart[v+1]-1] end at v
+    int* inEdge;           // (used by bidirectional Dijkstra to search backwards from the target)
+    int hasNegative;       // 1 if any road has a negative weight (Dijkstra can't be used then)
+    struct CityTable* cities;  // City names (text modes only, NULL in binary mode)
 };
 
+// City names with a hash index, so looking up a name doesn't scan every city
+struct CityTable {
+    int count;                 // Number of cities added so far
+    char (*names)[NAME_LEN];   // names[i] = name of city i
+    int* slots;                // Open-addressing hash table of city indices (-1 = empty)
+    int capacity;              // Number of slots (power of two, at least twice the city count)
+};
+
+// Relaxation engines that can be selected per query
+#define ENGINE_CLASSIC    0  // Textbook: always V-1 passes over every edge
+#define ENGINE_EARLY_EXIT 1  // Stop as soon as a full pass changes nothing
+#define ENGINE_SPFA       2  // Queue-based: only relax edges out of cities that just improved
+#define ENGINE_DIJKSTRA   3  // Binary heap, each city settled once (non-negative weights only)
+#define ENGINE_AUTO       4  // Text modes only: Dijkstra, or early-exit if a road is negative
+
 // Global memoization table for caching shortest paths
-// This stores previously calculated results so we don't recalculate
-int memo[MAX][MAX];  
+// This stores previously calculated results so we don't recalculate.
+// Rows are only allocated for sources that were actually queried, so a graph
+// with thousands of cities doesn't need a V x V table up front.
+// Distances are long long so that long routes of big roads can't overflow int;
+// LLONG_MAX marks an unreachable city.
+long long** memo = NULL;  // memo[src] = distances from src, or NULL if not computed yet
+int** memoPred = NULL;    // Previous city on each cached shortest path
+int memoSize = 0;         // Number of rows in memo / memoPred
 
-// Initialize memo table with INT_MAX (means uncomputed/infinite)
+// Work counters, read by the binary worker's STATS command
+// passes/attempted/improved describe the last query, memo counts since the graph was loaded
+struct Counters {
+    long long passes;      // Relaxation passes (SPFA: rounds of V cities taken off the queue)
+    long long attempted;   // Edge relaxations tried
+    long long improved;    // Relaxations that shortened a distance
+    long long memoHits;    // Queries answered from the memo table
+    long long memoMisses;  // Queries that had to run the algorithm
+} counters;
+
+// Reset the memo table for a graph with V cities (drops every cached row)
 void initializeMemo(int V) {
-    // Loop through all possible source and destination combinations
-    for (int i = 0; i < V; i++)
-        for (int j = 0; j < V; j++)
-            memo[i][j] = INT_MAX;  // Set to infinity initially
+    for (int i = 0; i < memoSize; i++) {
+        free(memo[i]);
+        free(memoPred[i]);
+    }
+    free(memo);
+    free(memoPred);
+    memo = (long long**) calloc(V, sizeof(long long*));  // All NULL = nothing cached yet
+    memoPred = (int**) calloc(V, sizeof(int*));
+    memoSize = V;
+    counters.memoHits = counters.memoMisses = 0;
+}
+
+// Hash function for city names (djb2)
+unsigned int hashName(const char* name) {
+    unsigned int h = 5381;
+    while (*name)
+        h = h * 33 + (unsigned char) *name++;
+    return h;
+}
+
+// Create an empty city table with room for V cities
+struct CityTable* createCityTable(int V) {
+    struct CityTable* table = (struct CityTable*) malloc(sizeof(struct CityTable));
+    table->count = 0;
+    table->names = malloc((size_t) V * NAME_LEN);
+    table->capacity = 16;
+    while (table->capacity < 2 * V)
+        table->capacity *= 2;
+    table->slots = (int*) malloc(table->capacity * sizeof(int));
+    for (int i = 0; i < table->capacity; i++)
+        table->slots[i] = -1;
+    return table;
+}
+
+// Find index of a city by name
+// Returns the index if found, -1 if not found
+int findCityIndex(struct CityTable* table, const char* name) {
+    unsigned int mask = table->capacity - 1;
+    // Linear probing: walk from the hashed slot until we hit the city or an empty slot
+    for (unsigned int slot = hashName(name) & mask; table->slots[slot] != -1; slot = (slot + 1) & mask)
+        if (strcmp(table->names[table->slots[slot]], name) == 0)  // strcmp returns 0 if strings match
+            return table->slots[slot];
+    return -1;  // City not found
+}
+
+// Add a city name, returns its index (or -1 if the name is already taken)
+int addCity(struct CityTable* table, const char* name) {
+    if (findCityIndex(table, name) != -1)
+        return -1;
+    unsigned int mask = table->capacity - 1;
+    unsigned int slot = hashName(name) & mask;
+    while (table->slots[slot] != -1)
+        slot = (slot + 1) & mask;
+    strcpy(table->names[table->count], name);
+    table->slots[slot] = table->count;
+    return table->count++;
+}
+
+// Free a city table created by createCityTable()
+void freeCityTable(struct CityTable* table) {
+    if (table == NULL) return;
+    free(table->names);
+    free(table->slots);
+    free(table);
 }
 
 // Create a new graph dynamically
@@ -42,11 +145,60 @@ struct Graph* createGraph(int V, int E) {
     
     // Allocate memory for all the edges
     graph->edge = (struct Edge*) malloc(E * sizeof(struct Edge));
+    graph->outStart = NULL;  // Filled in by buildAdjacency() once the edges are read
+    graph->outEdge = NULL;
+    graph->inStart = NULL;
+    graph->inEdge = NULL;
+    graph->hasNegative = 0;
+    graph->cities = NULL;
     return graph;
 }
 
+// Group edge indices by one end of the edge (byDest = 0: source city, 1: destination city)
+// into start[] offsets and an edges[] list, like a bucket sort
+void groupEdges(struct Graph* graph, int byDest, int** start, int** edges) {
+    int V = graph->V, E = graph->E;
+    *start = (int*) calloc(V + 1, sizeof(int));
+    *edges = (int*) malloc((E + 1) * sizeof(int));
+
+    // Count edges per city, then turn the counts into start offsets
+    for (int j = 0; j < E; j++)
+        (*start)[(byDest ? graph->edge[j].dest : graph->edge[j].src) + 1]++;
+    for (int u = 0; u < V; u++)
+        (*start)[u + 1] += (*start)[u];
+
+    // Place each edge in its city's slot
+    int* next = (int*) malloc((V + 1) * sizeof(int));
+    memcpy(next, *start, V * sizeof(int));
+    for (int j = 0; j < E; j++)
+        (*edges)[next[byDest ? graph->edge[j].dest : graph->edge[j].src]++] = j;
+    free(next);
+}
+
+// Build the outgoing/incoming edge lists and note whether any weight is negative
+void buildAdjacency(struct Graph* graph) {
+    groupEdges(graph, 0, &graph->outStart, &graph->outEdge);
+    groupEdges(graph, 1, &graph->inStart, &graph->inEdge);
+    graph->hasNegative = 0;
+    for (int j = 0; j < graph->E; j++)
+        if (graph->edge[j].weight < 0)
+            graph->hasNegative = 1;
+}
+
+// Free a graph created by createGraph()
+void freeGraph(struct Graph* graph) {
+    if (graph == NULL) return;
+    free(graph->edge);
+    free(graph->outStart);
+    free(graph->outEdge);
+    free(graph->inStart);
+    free(graph->inEdge);
+    freeCityTable(graph->cities);
+    free(graph);
+}
+
 // Print all distances from the given source city
-void printDistances(int src, int dist[], char cityNames[][NAME_LEN], int V) {
+void printDistances(int src, long long dist[], char cityNames[][NAME_LEN], int V) {
     printf("Source City: %s\n", cityNames[src]);
     printf("------------------------------------\n");
     printf("%-15s Distance\n", "City");  // %-15s means left-align with 15 characters
@@ -54,107 +206,395 @@ void printDistances(int src, int dist[], char cityNames[][NAME_LEN], int V) {
 
     // Print distance to each city
     for (int i = 0; i < V; i++) {
-        if (dist[i] == INT_MAX)
+        if (dist[i] == LLONG_MAX)
             printf("%-15s INF\n", cityNames[i]);  // INF means unreachable
         else
-            printf("%-15s %d\n", cityNames[i], dist[i]);  // Print actual distance
+            printf("%-15s %lld\n", cityNames[i], dist[i]);  // Print actual distance
     }
 }
 
-// Bellman-Ford algorithm with memoization
-// This finds the shortest path from source city to all other cities
-void BellmanFord(struct Graph* graph, int src, char cityNames[][NAME_LEN]) {
+// Optional progress callback, called after each pass with the pass number and
+// the number of edge relaxations tried so far (set by the binary worker mode)
+void (*progressHook)(int pass, long long relaxations) = NULL;
+
+// Relax every edge in passes (ENGINE_CLASSIC / ENGINE_EARLY_EXIT)
+// Returns 1 if the graph has a negative weight cycle reachable from the source
+int relaxPasses(struct Graph* graph, long long dist[], int pred[], int earlyExit) {
     int V = graph->V;  // Number of cities
     int E = graph->E;  // Number of roads
-    int dist[V];       // Array to store shortest distances
+    long long relaxations = 0;
 
-    // Check if results are already computed (memoization optimization)
-    // If we already calculated shortest paths from this source, use cached results
-    int memoized = 1;
-    for (int i = 0; i < V; i++) {
-        if (memo[src][i] == INT_MAX) {
-            memoized = 0;  // Not cached yet
-            break;
-        }
-    }
-
-    // If we found cached results, just print them and return
-    if (memoized) {
-        printf("Using cached results for %s\n\n", cityNames[src]);
-        printDistances(src, memo[src], cityNames, V);
-        return;
-    }
-
-    // Step 1: Initialize distances from source to all vertices as infinite
-    for (int i = 0; i < V; i++)
-        dist[i] = INT_MAX;
-    dist[src] = 0;  // Distance from source to itself is 0
-
-    // Step 2: Relax all edges |V| - 1 times
+    // Relax all edges |V| - 1 times
     // This is the core of Bellman-Ford algorithm
     for (int i = 1; i <= V - 1; i++) {
+        int changed = 0;
         for (int j = 0; j < E; j++) {
             int u = graph->edge[j].src;      // Source city of this edge
             int v = graph->edge[j].dest;     // Destination city of this edge
             int w = graph->edge[j].weight;   // Distance of this road
             
             // If we found a shorter path to v through u, update it
-            if (dist[u] != INT_MAX && dist[u] + w < dist[v])
+            if (dist[u] != LLONG_MAX && dist[u] + w < dist[v]) {
                 dist[v] = dist[u] + w;
+                pred[v] = u;  // Remember we reached v through u
+                changed = 1;
+                counters.improved++;
+            }
         }
+        relaxations += E;
+        counters.passes++;
+        counters.attempted += E;
+        if (progressHook) progressHook(i, relaxations);
+        // Nothing changed in a whole pass: distances are final, and since the
+        // next pass would change nothing either there can't be a negative cycle
+        if (earlyExit && !changed)
+            return 0;
     }
 
-    // Step 3: Check for negative weight cycles
+    // Check for negative weight cycles
     // If we can still relax an edge, there's a negative cycle
+    counters.attempted += E;
     for (int j = 0; j < E; j++) {
         int u = graph->edge[j].src;
         int v = graph->edge[j].dest;
         int w = graph->edge[j].weight;
-        if (dist[u] != INT_MAX && dist[u] + w < dist[v]) {
-            printf("Error: Graph contains a negative weight cycle!\n");
-            return;
+        if (dist[u] != LLONG_MAX && dist[u] + w < dist[v])
+            return 1;
+    }
+    return 0;
+}
+
+// Queue-based Bellman-Ford (SPFA)
+// Only cities whose distance just improved have their outgoing edges relaxed.
+// Without negative cycles a city enters the queue at most once per "round" of
+// Bellman-Ford, i.e. at most V-1 times, so a city queued V times means there
+// is a negative cycle.
+// Returns 1 if the graph has a negative weight cycle reachable from the source
+int relaxQueue(struct Graph* graph, int src, long long dist[], int pred[]) {
+    int V = graph->V;
+    int* queue = (int*) malloc(V * sizeof(int));  // Circular queue, each city is in it at most once
+    int* inQueue = (int*) calloc(V, sizeof(int));
+    int* timesQueued = (int*) calloc(V, sizeof(int));
+    int head = 0, size = 0, negativeCycle = 0;
+    long long processed = 0, relaxations = 0;
+
+    queue[0] = src; size = 1; inQueue[src] = 1; timesQueued[src] = 1;
+    while (size > 0 && !negativeCycle) {
+        int u = queue[head];
+        head = (head + 1) % V; size--;
+        inQueue[u] = 0;
+        relaxations += graph->outStart[u + 1] - graph->outStart[u];
+        // Report roughly once per "round": every V cities taken off the queue
+        if (progressHook && ++processed % V == 0) progressHook((int) (processed / V), relaxations);
+
+        // Relax all roads leaving u
+        for (int k = graph->outStart[u]; k < graph->outStart[u + 1]; k++) {
+            struct Edge* e = &graph->edge[graph->outEdge[k]];
+            int v = e->dest;
+            if (dist[u] + e->weight < dist[v]) {
+                dist[v] = dist[u] + e->weight;
+                pred[v] = u;
+                counters.improved++;
+                if (!inQueue[v]) {
+                    if (++timesQueued[v] >= V) { negativeCycle = 1; break; }
+                    queue[(head + size) % V] = v; size++;
+                    inQueue[v] = 1;
+                }
+            }
         }
     }
 
-    // Store results in memo table for future use
-    for (int i = 0; i < V; i++)
-        memo[src][i] = dist[i];
+    counters.attempted += relaxations;
+    counters.passes += (processed + V - 1) / V;
+    free(queue); free(inQueue); free(timesQueued);
+    return negativeCycle;
+}
 
-    // Display results
-    printDistances(src, dist, cityNames, V);
+// Binary min-heap of (distance, city) pairs for Dijkstra
+// A city may be pushed again when its distance improves; the old entry is
+// simply skipped when it comes out ("lazy deletion"), so no decrease-key is needed.
+struct HeapItem {
+    long long key;  // Distance when the city was pushed
+    int city;
+};
+
+struct Heap {
+    struct HeapItem* items;
+    int size, capacity;
+};
+
+// Add a city to the heap (grows the array as needed)
+void heapPush(struct Heap* heap, long long key, int city) {
+    if (heap->size == heap->capacity) {
+        heap->capacity = heap->capacity ? 2 * heap->capacity : 64;
+        heap->items = (struct HeapItem*) realloc(heap->items, heap->capacity * sizeof(struct HeapItem));
+    }
+    // Sift up: move parents down until the new item's place is found
+    int i = heap->size++;
+    while (i > 0 && heap->items[(i - 1) / 2].key > key) {
+        heap->items[i] = heap->items[(i - 1) / 2];
+        i = (i - 1) / 2;
+    }
+    heap->items[i].key = key;
+    heap->items[i].city = city;
 }
 
-// Find index of a city by name
-// Returns the index if found, -1 if not found
-int findCityIndex(char cityNames[][NAME_LEN], int count, char name[]) {
-    for (int i = 0; i < count; i++)
-        if (strcmp(cityNames[i], name) == 0)  // strcmp returns 0 if strings match
-            return i;
-    return -1;  // City not found
+// Remove the item with the smallest key into *top, returns 0 if the heap is empty
+int heapPop(struct Heap* heap, struct HeapItem* top) {
+    if (heap->size == 0) return 0;
+    *top = heap->items[0];
+    struct HeapItem last = heap->items[--heap->size];
+    // Sift down: move the smaller child up until the last item fits
+    int i = 0;
+    while (2 * i + 1 < heap->size) {
+        int child = 2 * i + 1;
+        if (child + 1 < heap->size && heap->items[child + 1].key < heap->items[child].key)
+            child++;
+        if (heap->items[child].key >= last.key) break;
+        heap->items[i] = heap->items[child];
+        i = child;
+    }
+    heap->items[i] = last;
+    return 1;
+}
+
+// Dijkstra's algorithm (only correct when no road is negative)
+// Each city is settled once, in order of distance, so the work is O(E log V)
+// instead of Bellman-Ford's O(V * E). dist[]/pred[] must be initialized like
+// for Bellman-Ford. With target >= 0 the search stops as soon as the target is
+// settled (point-to-point): only cities settled so far have final distances.
+// Returns the number of settled cities.
+int dijkstra(struct Graph* graph, int src, int target, long long dist[], int pred[]) {
+    char* settled = (char*) calloc(graph->V, 1);
+    struct Heap heap = {NULL, 0, 0};
+    struct HeapItem top;
+    int count = 0;
+    long long relaxations = 0;
+
+    heapPush(&heap, 0, src);
+    while (heapPop(&heap, &top)) {
+        int u = top.city;
+        if (settled[u]) continue;  // Stale entry: u was settled earlier with a smaller distance
+        settled[u] = 1;
+        count++;
+        if (u == target) break;  // The target's distance can't get any smaller now
+
+        // Relax all roads leaving u
+        for (int k = graph->outStart[u]; k < graph->outStart[u + 1]; k++) {
+            struct Edge* e = &graph->edge[graph->outEdge[k]];
+            int v = e->dest;
+            if (!settled[v] && dist[u] + e->weight < dist[v]) {
+                dist[v] = dist[u] + e->weight;
+                pred[v] = u;
+                counters.improved++;
+                heapPush(&heap, dist[v], v);
+            }
+        }
+        relaxations += graph->outStart[u + 1] - graph->outStart[u];
+        // Progress counts settled cities (checked every 1024 so the clock isn't read per city)
+        if (progressHook && count % 1024 == 0) progressHook(count, relaxations);
+    }
+
+    counters.passes++;  // A single sweep over the cities
+    counters.attempted += relaxations;
+    free(settled);
+    free(heap.items);
+    return count;
+}
+
+// Bidirectional Dijkstra: one search forward from src and one backward from
+// target (over incoming roads), always advancing the side with the smaller
+// frontier. Every time a road reaches a city the other side has seen, the
+// route through it is a candidate; the search stops once the two frontiers
+// together can't beat the best candidate. Writes the route into path[]
+// (up to V cities) and returns its length in cities, 0 if target is unreachable.
+// *distance receives the route's length, *settledCount the cities settled.
+int bidirectionalDijkstra(struct Graph* graph, int src, int target, int path[], long long* distance,
+                          int* settledCount) {
+    int V = graph->V;
+    long long* dist[2];          // dist[0] = from src, dist[1] = to target
+    int* link[2];                // link[0] = previous city, link[1] = next city towards target
+    char* settled[2];
+    struct Heap heap[2] = {{NULL, 0, 0}, {NULL, 0, 0}};
+    for (int side = 0; side < 2; side++) {
+        dist[side] = (long long*) malloc(V * sizeof(long long));
+        link[side] = (int*) malloc(V * sizeof(int));
+        settled[side] = (char*) calloc(V, 1);
+        for (int i = 0; i < V; i++) {
+            dist[side][i] = LLONG_MAX;
+            link[side][i] = -1;
+        }
+    }
+    dist[0][src] = dist[1][target] = 0;
+    heapPush(&heap[0], 0, src);
+    heapPush(&heap[1], 0, target);
+    long long best = src == target ? 0 : LLONG_MAX;
+    int meet = src == target ? src : -1;
+    int count = 0;
+    long long relaxations = 0;
+
+    while (heap[0].size > 0 && heap[1].size > 0
+           && heap[0].items[0].key + heap[1].items[0].key < best) {
+        int side = heap[0].items[0].key <= heap[1].items[0].key ? 0 : 1;
+        struct HeapItem top;
+        heapPop(&heap[side], &top);
+        int u = top.city;
+        if (settled[side][u]) continue;  // Stale entry
+        settled[side][u] = 1;
+        count++;
+
+        // Forward: roads leaving u. Backward: roads arriving at u.
+        int* start = side == 0 ? graph->outStart : graph->inStart;
+        int* list = side == 0 ? graph->outEdge : graph->inEdge;
+        for (int k = start[u]; k < start[u + 1]; k++) {
+            struct Edge* e = &graph->edge[list[k]];
+            int v = side == 0 ? e->dest : e->src;
+            if (dist[side][u] + e->weight < dist[side][v]) {
+                dist[side][v] = dist[side][u] + e->weight;
+                link[side][v] = u;
+                counters.improved++;
+                heapPush(&heap[side], dist[side][v], v);
+            }
+            // Both searches have reached v: src -> v -> target is a candidate route
+            if (dist[1 - side][v] != LLONG_MAX && dist[side][v] + dist[1 - side][v] < best) {
+                best = dist[side][v] + dist[1 - side][v];
+                meet = v;
+            }
+        }
+        relaxations += start[u + 1] - start[u];
+        if (progressHook && count % 1024 == 0) progressHook(count, relaxations);
+    }
+
+    // Route = src ... meet (following previous cities backwards) + meet ... target
+    int length = 0;
+    if (meet != -1) {
+        for (int v = meet; v != -1; v = link[0][v]) path[length++] = v;
+        for (int i = 0, j = length - 1; i < j; i++, j--) {
+            int swap = path[i]; path[i] = path[j]; path[j] = swap;
+        }
+        for (int v = link[1][meet]; v != -1; v = link[1][v]) path[length++] = v;
+    }
+    *distance = best;
+    *settledCount = count;
+    counters.passes++;
+    counters.attempted += relaxations;
+    for (int side = 0; side < 2; side++) {
+        free(dist[side]); free(link[side]); free(settled[side]); free(heap[side].items);
+    }
+    return length;
+}
+
+// Core Bellman-Ford with memoization
+// Fills dist[] with shortest distances and pred[] with the previous city on each
+// shortest path (-1 for the source and unreachable cities) using the chosen engine.
+// Returns 1 if the graph has a negative weight cycle, 0 otherwise.
+// *cached is set to 1 when the answer came from the memo table.
+int shortestPaths(struct Graph* graph, int src, int engine, long long dist[], int pred[], int* cached) {
+    int V = graph->V;  // Number of cities
+
+    // Check if results are already computed (memoization optimization)
+    // If we already calculated shortest paths from this source, use cached results.
+    // All engines give the same distances, so the cache is shared between them.
+    counters.passes = counters.attempted = counters.improved = 0;
+    *cached = memo[src] != NULL;
+    if (*cached) {
+        counters.memoHits++;
+        for (int i = 0; i < V; i++) {
+            dist[i] = memo[src][i];
+            pred[i] = memoPred[src][i];
+        }
+        return 0;
+    }
+
+    // Initialize distances from source to all vertices as infinite
+    for (int i = 0; i < V; i++) {
+        dist[i] = LLONG_MAX;
+        pred[i] = -1;  // No previous city known yet
+    }
+    dist[src] = 0;  // Distance from source to itself is 0
+    counters.memoMisses++;
+
+    // Dijkstra is only valid without negative roads; the text modes fall back to Bellman-Ford
+    if (engine == ENGINE_AUTO || engine == ENGINE_DIJKSTRA)
+        engine = graph->hasNegative ? ENGINE_EARLY_EXIT : ENGINE_DIJKSTRA;
+
+    int negativeCycle = 0;
+    if (engine == ENGINE_DIJKSTRA)
+        dijkstra(graph, src, -1, dist, pred);
+    else if (engine == ENGINE_SPFA)
+        negativeCycle = relaxQueue(graph, src, dist, pred);
+    else
+        negativeCycle = relaxPasses(graph, dist, pred, engine == ENGINE_EARLY_EXIT);
+    if (negativeCycle)
+        return 1;
+
+    // Store results in memo table for future use
+    memo[src] = (long long*) malloc(V * sizeof(long long));
+    memoPred[src] = (int*) malloc(V * sizeof(int));
+    memcpy(memo[src], dist, V * sizeof(long long));
+    memcpy(memoPred[src], pred, V * sizeof(int));
+    return 0;
+}
+
+// Bellman-Ford algorithm with memoization
+// This finds the shortest path from source city to all other cities and prints the table
+void BellmanFord(struct Graph* graph, int src, int engine) {
+    int V = graph->V;  // Number of cities
+    long long* dist = (long long*) malloc(V * sizeof(long long));  // Array to store shortest distances
+    int* pred = (int*) malloc(V * sizeof(int));  // Array to store the previous city on each shortest path
+    int cached;
+
+    if (shortestPaths(graph, src, engine, dist, pred, &cached)) {
+        printf("Error: Graph contains a negative weight cycle!\n");
+    } else {
+        // If we found cached results, say so
+        if (cached)
+            printf("Using cached results for %s\n\n", graph->cities->names[src]);
+
+        // Display results
+        printDistances(src, dist, graph->cities->names, V);
+    }
+    free(dist);
+    free(pred);
 }
 
-int main() {
+// Read a graph from stdin: "V E", then V city names, then E lines "from to distance"
+// Returns NULL if the input is malformed
+struct Graph* readGraph() {
     int V, E;
     // Read number of vertices (cities) and edges (roads)
-    scanf("%d %d", &V, &E);
+    if (scanf("%d %d", &V, &E) != 2 || V < 1 || E < 0)
+        return NULL;
 
     // Create the graph structure
     struct Graph* graph = createGraph(V, E);
-    char cityNames[MAX][NAME_LEN];  // Array to store all city names
+    graph->cities = createCityTable(V);
 
-    // Read city names
-    for (int i = 0; i < V; i++)
-        scanf("%s", cityNames[i]);
+    // Read city names (names must be unique)
+    for (int i = 0; i < V; i++) {
+        char name[NAME_LEN];
+        if (scanf("%29s", name) != 1 || addCity(graph->cities, name) == -1) {
+            freeGraph(graph);
+            return NULL;
+        }
+    }
 
     // Read all the roads (edges)
     for (int i = 0; i < E; i++) {
         char srcName[NAME_LEN], destName[NAME_LEN];
         int dist;
-        scanf("%s %s %d", srcName, destName, &dist);  // Read: from_city to_city distance
+        if (scanf("%29s %29s %d", srcName, destName, &dist) != 3) {  // Read: from_city to_city distance
+            freeGraph(graph);
+            return NULL;
+        }
         
-        // Convert city names to indices
-        int src = findCityIndex(cityNames, V, srcName);
-        int dest = findCityIndex(cityNames, V, destName);
+        // Convert city names to indices (hash lookup)
+        int src = findCityIndex(graph->cities, srcName);
+        int dest = findCityIndex(graph->cities, destName);
+        if (src == -1 || dest == -1) {
+            freeGraph(graph);
+            return NULL;
+        }
         
         // Store this edge in our graph
         graph->edge[i].src = src;
@@ -162,21 +602,287 @@ int main() {
         graph->edge[i].weight = dist;
     }
 
-    // Initialize the memoization table
+    // A new graph means any cached results are stale
+    buildAdjacency(graph);
     initializeMemo(V);
+    return graph;
+}
+
+// Convert an engine name (classic, early-exit, spfa, dijkstra, auto) to its ENGINE_* code
+// Returns -1 for unknown names
+int parseEngine(char name[]) {
+    if (strcmp(name, "classic") == 0) return ENGINE_CLASSIC;
+    if (strcmp(name, "early-exit") == 0) return ENGINE_EARLY_EXIT;
+    if (strcmp(name, "spfa") == 0) return ENGINE_SPFA;
+    if (strcmp(name, "dijkstra") == 0) return ENGINE_DIJKSTRA;
+    if (strcmp(name, "auto") == 0) return ENGINE_AUTO;
+    return -1;
+}
+
+// Long-lived worker mode (started with --serve)
+// The graph and memo table stay in memory between queries, so repeated
+// queries on the same graph are answered from the cache. Commands:
+//   GRAPH            followed by a graph in the normal input format (replaces the old one)
+//   ENGINE <name>    use classic, early-exit, spfa, dijkstra or auto for the following queries
+//                    (dijkstra and auto use early-exit on graphs with negative roads)
+//   QUERY <source>   run Bellman-Ford from <source> on the current graph
+//   QUIT             exit the worker
+// Every response ends with a line containing only END.
+void serve(int engine) {
+    struct Graph* graph = NULL;
+    char command[16];
+
+    while (scanf("%15s", command) == 1) {
+        if (strcmp(command, "GRAPH") == 0) {
+            freeGraph(graph);
+            graph = readGraph();
+            printf(graph ? "OK\n" : "Error: Invalid graph.\n");
+        } else if (strcmp(command, "ENGINE") == 0) {
+            char name[16];
+            scanf("%15s", name);
+            int chosen = parseEngine(name);
+            if (chosen == -1) {
+                printf("Error: Unknown engine %s\n", name);
+            } else {
+                engine = chosen;
+                printf("OK\n");
+            }
+        } else if (strcmp(command, "QUERY") == 0) {
+            char srcCity[NAME_LEN];
+            scanf("%29s", srcCity);
+            int srcIndex = graph ? findCityIndex(graph->cities, srcCity) : -1;
+            if (srcIndex == -1)
+                printf("Invalid source city.\n");
+            else
+                BellmanFord(graph, srcIndex, engine);
+        } else if (strcmp(command, "QUIT") == 0) {
+            break;
+        } else {
+            printf("Error: Unknown command %s\n", command);
+        }
+        printf("END\n");
+        fflush(stdout);  // The caller waits for END, so don't keep it in the buffer
+    }
+    freeGraph(graph);
+}
+
+// Binary protocol codes (see serveBinary)
+#define CMD_GRAPH 1
+#define CMD_QUERY 2
+#define CMD_QUIT  3
+#define CMD_STATS 4
+#define CMD_ROUTE 5
+#define STATUS_OK             0
+#define STATUS_INVALID        1
+#define STATUS_NEGATIVE_CYCLE 2
+#define STATUS_PROGRESS       3
+
+// Progress frame for the binary worker: int32 STATUS_PROGRESS, int32 pass, int64 relaxations
+// Sent at most every 50 ms so fast queries don't pay for it
+void writeProgress(int pass, long long relaxations) {
+    static clock_t lastReport = 0;
+    clock_t now = clock();
+    if (now - lastReport < CLOCKS_PER_SEC / 20)
+        return;
+    lastReport = now;
+    int32_t frame[2] = {STATUS_PROGRESS, pass};
+    int64_t done = relaxations;
+    fwrite(frame, sizeof(int32_t), 2, stdout);
+    fwrite(&done, sizeof(int64_t), 1, stdout);
+    fflush(stdout);  // The caller shows this while it waits
+}
+
+// Read exactly count int32 values from stdin, returns 1 on success
+int readInts(int32_t* buffer, int count) {
+    return (int) fread(buffer, sizeof(int32_t), count, stdin) == count;
+}
+
+// Write a single int32 to stdout
+void writeInt(int32_t value) {
+    fwrite(&value, sizeof(int32_t), 1, stdout);
+}
+
+// Long-lived worker using a binary protocol (started with --binary)
+// No text formatting or city names: everything is native-endian int32 arrays.
+//   GRAPH: int32 1, V, E, then src[E], dest[E], weight[E]
+//          -> int32 status
+//   QUERY: int32 2, source index, engine (ENGINE_* code)
+//          -> int32 status, cached flag, V, then int64 dist[V] (INT64_MAX = unreachable), int32 pred[V]
+//             (only status/cached/V = 0 are sent when status is not OK)
+//             Long queries first send any number of progress frames:
+//             int32 3, pass, then int64 relaxations tried so far
+//             (cancel a query by killing the worker)
+//          (ENGINE_DIJKSTRA is rejected with STATUS_INVALID when a road is negative)
+//   ROUTE: int32 5, source index, target index, mode (0 = Dijkstra stopping at the target,
+//          1 = bidirectional Dijkstra); only for graphs without negative roads
+//          -> int32 status, settled cities, path length n, int64 distance (INT64_MAX = unreachable),
+//             then int32 path[n] (source first). Not memoized. Progress frames may come first,
+//             with the number of settled cities in place of the pass.
+//   STATS: int32 4
+//          -> int32 status, then int64 passes, attempted, improved (last query), memo hits, memo misses
+//   QUIT:  int32 3
+void serveBinary() {
+    struct Graph* graph = NULL;
+    int32_t header[2];
+
+#ifdef _WIN32
+    // Windows translates \n in text mode, which would corrupt binary data
+    _setmode(_fileno(stdin), _O_BINARY);
+    _setmode(_fileno(stdout), _O_BINARY);
+#endif
+    progressHook = writeProgress;
+
+    while (readInts(header, 1)) {
+        if (header[0] == CMD_GRAPH) {
+            freeGraph(graph);
+            graph = NULL;
+            if (!readInts(header, 2)) break;
+            int V = header[0], E = header[1];
+            if (V < 1 || E < 0) {
+                writeInt(STATUS_INVALID);
+                fflush(stdout);
+                continue;
+            }
+
+            // Read the three edge arrays straight into temporary buffers
+            int32_t* buffer = (int32_t*) malloc(3 * (size_t) E * sizeof(int32_t) + 1);
+            if (!readInts(buffer, 3 * E)) { free(buffer); break; }
+            graph = createGraph(V, E);
+            int valid = 1;
+            for (int i = 0; i < E; i++) {
+                graph->edge[i].src = buffer[i];
+                graph->edge[i].dest = buffer[E + i];
+                graph->edge[i].weight = buffer[2 * E + i];
+                if (buffer[i] < 0 || buffer[i] >= V || buffer[E + i] < 0 || buffer[E + i] >= V)
+                    valid = 0;  // Edge points at a city that doesn't exist
+            }
+            free(buffer);
+
+            if (!valid) {
+                freeGraph(graph);
+                graph = NULL;
+            } else {
+                buildAdjacency(graph);
+                initializeMemo(V);  // New graph, old cached results are stale
+            }
+            writeInt(valid ? STATUS_OK : STATUS_INVALID);
+        } else if (header[0] == CMD_QUERY) {
+            if (!readInts(header, 2)) break;
+            int src = header[0], engine = header[1];
+            if (graph == NULL || src < 0 || src >= graph->V || engine < ENGINE_CLASSIC || engine > ENGINE_DIJKSTRA
+                || (engine == ENGINE_DIJKSTRA && graph->hasNegative)) {
+                writeInt(STATUS_INVALID); writeInt(0); writeInt(0);
+            } else {
+                int V = graph->V, cached;
+                long long* dist = (long long*) malloc(V * sizeof(long long));
+                int* pred = (int*) malloc(V * sizeof(int));
+                if (shortestPaths(graph, src, engine, dist, pred, &cached)) {
+                    writeInt(STATUS_NEGATIVE_CYCLE); writeInt(0); writeInt(0);
+                } else {
+                    writeInt(STATUS_OK); writeInt(cached); writeInt(V);
+                    fwrite(dist, sizeof(int64_t), V, stdout);  // LLONG_MAX is already INT64_MAX
+                    fwrite(pred, sizeof(int32_t), V, stdout);
+                }
+                free(dist);
+                free(pred);
+            }
+        } else if (header[0] == CMD_ROUTE) {
+            int32_t request[3];
+            if (!readInts(request, 3)) break;
+            int src = request[0], target = request[1], mode = request[2];
+            if (graph == NULL || graph->hasNegative || src < 0 || src >= graph->V
+                || target < 0 || target >= graph->V || mode < 0 || mode > 1) {
+                int64_t none = INT64_MAX;
+                writeInt(STATUS_INVALID); writeInt(0); writeInt(0);
+                fwrite(&none, sizeof(int64_t), 1, stdout);
+            } else {
+                int V = graph->V, settled, length = 0;
+                int* path = (int*) malloc(V * sizeof(int));
+                int64_t distance = INT64_MAX;
+                counters.passes = counters.attempted = counters.improved = 0;
+                if (mode == 1) {
+                    long long best;
+                    length = bidirectionalDijkstra(graph, src, target, path, &best, &settled);
+                    if (length > 0) distance = best;
+                } else {
+                    long long* dist = (long long*) malloc(V * sizeof(long long));
+                    int* pred = (int*) malloc(V * sizeof(int));
+                    for (int i = 0; i < V; i++) {
+                        dist[i] = LLONG_MAX;
+                        pred[i] = -1;
+                    }
+                    dist[src] = 0;
+                    settled = dijkstra(graph, src, target, dist, pred);
+                    if (dist[target] != LLONG_MAX) {
+                        distance = dist[target];
+                        // Walk back from the target, then reverse into source-first order
+                        for (int v = target; v != -1; v = pred[v]) path[length++] = v;
+                        for (int i = 0, j = length - 1; i < j; i++, j--) {
+                            int swap = path[i]; path[i] = path[j]; path[j] = swap;
+                        }
+                    }
+                    free(dist);
+                    free(pred);
+                }
+                writeInt(STATUS_OK); writeInt(settled); writeInt(length);
+                fwrite(&distance, sizeof(int64_t), 1, stdout);
+                fwrite(path, sizeof(int32_t), length, stdout);
+                free(path);
+            }
+        } else if (header[0] == CMD_STATS) {
+            int64_t values[5] = {counters.passes, counters.attempted, counters.improved,
+                                 counters.memoHits, counters.memoMisses};
+            writeInt(STATUS_OK);
+            fwrite(values, sizeof(int64_t), 5, stdout);
+        } else {
+            break;  // CMD_QUIT or unknown command
+        }
+        fflush(stdout);  // The caller blocks until the whole response arrives
+    }
+    freeGraph(graph);
+}
+
+int main(int argc, char* argv[]) {
+    // Optional "--engine <name>" picks the engine for the text modes (default: classic)
+    int engine = ENGINE_CLASSIC;
+    for (int i = 1; i + 1 < argc; i++) {
+        if (strcmp(argv[i], "--engine") == 0 && (engine = parseEngine(argv[i + 1])) == -1) {
+            printf("Error: Unknown engine %s\n", argv[i + 1]);
+            return 1;
+        }
+    }
+
+    // Persistent worker modes
+    if (argc > 1 && strcmp(argv[1], "--serve") == 0) {
+        serve(engine);
+        return 0;
+    }
+    if (argc > 1 && strcmp(argv[1], "--binary") == 0) {
+        serveBinary();  // Used by the GUI
+        return 0;
+    }
+
+    // One-shot mode: read one graph and one source, print the table and exit
+    struct Graph* graph = readGraph();
+    if (graph == NULL) {
+        printf("Error: Invalid graph.\n");
+        return 0;
+    }
 
     // Read the source city name
     char srcCity[NAME_LEN];
-    scanf("%s", srcCity);
+    scanf("%29s", srcCity);
 
     // Find the index of source city
-    int srcIndex = findCityIndex(cityNames, V, srcCity);
+    int srcIndex = findCityIndex(graph->cities, srcCity);
     if (srcIndex == -1) {
         printf("Invalid source city.\n");
+        freeGraph(graph);
         return 0;
     }
 
     // Run Bellman-Ford algorithm
-    BellmanFord(graph, srcIndex, cityNames);
+    BellmanFord(graph, srcIndex, engine);
+    freeGraph(graph);
     return 0;
 }
@@ -0,0 +1,100 @@
+"""Solve many sources at once on all CPU cores.
+
+    with BatchSolver(graph) as batch:                       # A bellman_graph.Graph
+        for source, tree in batch.solve(["A", "B", "C"]):   # In completion order
+            ...
+
+The edge arrays are written once into a multiprocessing shared memory block;
+every pool process attaches to it, opens its own solver (its own C worker when
+the backend is "c") and loads the graph from there, so no task carries the
+graph. Tasks only send a source name and get back two compact arrays.
+"""
+import multiprocessing
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from bellman_solver import INF, INT64_MAX, ShortestPathTree, open_solver
+
+# Per-process state of a pool worker, filled in by _start_worker()
+_worker = {}
+
+
+def _start_worker(block_name, edge_count, names, backend, engine):
+    """Pool initializer: attach to the shared edge arrays and load them into a solver"""
+    block = shared_memory.SharedMemory(name=block_name)
+    edges = np.ndarray((3, edge_count), dtype=np.int32, buffer=block.buf)
+    solver = open_solver(backend)
+    solver.set_graph_arrays(names, edges[0], edges[1], edges[2])
+    del edges  # The solver has its own copy; drop the view so the block can be closed
+    block.close()
+    _worker.update(solver=solver, engine=engine)
+
+
+def _solve_one(source):
+    """Pool task: (source, dist, pred, engine, backend) with dist as int64 (INT64_MAX = unreachable),
+    or (source, error) when the query fails"""
+    solver = _worker["solver"]
+    try:
+        tree = solver.query(source, _worker["engine"])
+    except ValueError as e:  # Includes NegativeCycleError
+        return source, e
+    dist = array('q', (INT64_MAX if d == INF else d for d in tree.dist))
+    return source, dist, array('i', tree.pred), tree.engine, tree.backend
+
+
+class BatchSolver:
+    """Process pool with one graph in shared memory; solve() streams (source, tree) pairs"""
+
+    def __init__(self, graph, backend="auto", engine="auto", workers=None):
+        self.names = list(graph.names)
+        self.engine = engine
+        self.workers = workers or os.cpu_count() or 1
+        E = graph.E
+        # One block holding src[E], dest[E], weight[E] as int32 (at least 1 byte: size 0 isn't allowed)
+        self.block = shared_memory.SharedMemory(create=True, size=max(1, 3 * E * 4))
+        table = np.ndarray((3, E), dtype=np.int32, buffer=self.block.buf)
+        table[:] = graph.columns()
+        del table
+        # "spawn": forking a process that has threads running (the GUI) can copy held locks
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_start_worker,
+                                        initargs=(self.block.name, E, self.names, backend, engine))
+
+    def solve(self, sources):
+        """Yield (source, ShortestPathTree) as each source finishes; a failed source yields
+        (source, exception) instead (e.g. NegativeCycleError)"""
+        futures = [self.pool.submit(_solve_one, source) for source in sources]
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                if len(result) == 2:
+                    yield result
+                    continue
+                source, dist, pred, engine, backend = result
+                yield source, ShortestPathTree(self.names, source, [INF if d == INT64_MAX else d for d in dist],
+                                               list(pred), False, engine, backend)
+        finally:
+            for future in futures:
+                future.cancel()  # Only matters if the caller stopped early
+
+    def close(self):
+        """Stop the pool (and its C workers) and free the shared memory"""
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.block.close()
+        self.block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def solve_many(graph, sources, backend="auto", engine="auto", workers=None):
+    """Convenience wrapper: dict source -> tree (or exception) for every source"""
+    with BatchSolver(graph, backend, engine, workers) as batch:
+        return dict(batch.solve(sources))
@@ -0,0 +1,229 @@
+"""Benchmark harness: times every stage of a run on seeded graphs.
+
+Each case builds one graph, then measures the stages the GUI goes through:
+
+    generate      build the edge list (not part of a real run, reported for scale)
+    graph         Graph.from_edges(): pack the edge list into CSR arrays
+    spawn         start the C worker (first tiny request); 0 for NumPy
+    load          set_graph_model(): send and index the edges
+    solve         first query from the source
+    solve_cached  same query again (memo hit)
+    route         point-to-point Dijkstra to the last city, then route_bidir for
+                  bidirectional Dijkstra (graphs without negative roads only)
+    path_to       one path (to the last city) from the predecessor array
+    paths         every path at once, only up to 60 cities (fork view)
+    format        results table text
+    layout        tree_layout() (and fork_layout() for small graphs)
+    render        first draw on an Agg canvas, then render_repeat for a redraw
+
+Results are written as JSON so two commits can be compared:
+
+    python bellman_bench.py --sizes 10,1000,100000 --output new.json
+    python bellman_bench.py --compare old.json new.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import matplotlib
+matplotlib.use("Agg")  # Headless: rendering is measured off screen
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from bellman_graph import Graph
+from bellman_render import TreeRenderer, fork_layout, tree_layout
+from bellman_solver import BACKEND_EXE, ENGINES, Cancelled, NegativeCycleError, open_solver
+
+
+def dense_graph(V, rng):
+    """Every ordered pair connected, weights 1..50 (what "Generate Random Distances" does)"""
+    return [(i, j, rng.randint(1, 50)) for i in range(V) for j in range(V) if i != j]
+
+
+def grid_graph(V, rng):
+    """Road-like grid: each city linked both ways to its right and lower neighbour"""
+    width = max(1, int(V ** 0.5))
+    edges = []
+    for v in range(V):
+        for u in (v + 1 if (v + 1) % width else None, v + width):
+            if u is not None and u < V:
+                edges.append((v, u, rng.randint(1, 50)))
+                edges.append((u, v, rng.randint(1, 50)))
+    return edges
+
+
+def chain_graph(V, rng):
+    """Worst case for Bellman-Ford: one long path 0 -> V-1 -> V-2 -> ... -> 1. Roads are
+    relaxed in order of their start city, so every pass moves the frontier only one city"""
+    return [(0, V - 1, rng.randint(1, 50))] + [(i + 1, i, rng.randint(1, 50)) for i in range(1, V - 1)]
+
+
+def negative_graph(V, rng):
+    """Sparse random graph with negative roads but no negative cycle.
+
+    Weights are w + p[u] - p[v] for w >= 0 and random city potentials p, so any
+    cycle sums to a non-negative amount while single roads can be negative.
+    """
+    potential = [rng.randint(0, 100) for _ in range(V)]
+    edges = [(i, i + 1, rng.randint(0, 20)) for i in range(V - 1)]  # Keeps everything reachable
+    for _ in range(3 * V):
+        u, v = rng.randrange(V), rng.randrange(V)
+        if u != v:
+            edges.append((u, v, rng.randint(0, 50)))
+    return [(u, v, w + potential[u] - potential[v]) for u, v, w in edges]
+
+
+GENERATORS = {"dense": dense_graph, "grid": grid_graph, "chain": chain_graph, "negative": negative_graph}
+
+
+def estimated_edges(kind, V):
+    """Edge count a generator will produce, checked before building the graph"""
+    return {"dense": V * (V - 1), "grid": 4 * V, "chain": V - 1, "negative": 4 * V}[kind]
+
+
+def timed(function, *args):
+    """(seconds, result) of one call"""
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def run_case(kind, V, backend, engine, seed, timeout):
+    """Benchmark one (graph, size, backend, engine) combination; returns a list of result rows"""
+    rows = []
+
+    def record(stage, seconds, status="ok"):
+        rows.append({"graph": kind, "vertices": V, "edges": len(edges), "backend": backend,
+                     "engine": engine, "stage": stage, "seconds": seconds, "status": status})
+
+    seconds, edges = timed(GENERATORS[kind], V, random.Random(seed))
+    record("generate", seconds)
+    names = [str(i) for i in range(V)]
+    seconds, graph = timed(Graph.from_edges, names, edges)
+    record("graph", seconds)
+
+    solver = open_solver(backend)
+    try:
+        record("spawn", timed(solver.set_graph, ["a", "b"], [(0, 1, 1)])[0] if backend == "c" else 0.0)
+        record("load", timed(solver.set_graph_model, graph)[0])
+
+        # Long solves are stopped through the same cancel() the GUI's Cancel button uses
+        timer = threading.Timer(timeout, solver.cancel)
+        timer.start()
+        try:
+            seconds, tree = timed(solver.query, names[0], engine)
+        except Cancelled:
+            record("solve", timeout, "timeout")
+            return rows
+        except NegativeCycleError:
+            record("solve", 0.0, "negative-cycle")
+            return rows
+        except ValueError:  # Dijkstra asked for on a graph with negative roads
+            record("solve", 0.0, "not-applicable")
+            return rows
+        finally:
+            timer.cancel()
+        record("solve", seconds)
+        record("solve_cached", timed(solver.query, names[0], engine)[0])
+        if not solver.has_negative:
+            record("route", timed(solver.route, names[0], names[-1])[0])
+            record("route_bidir", timed(solver.route, names[0], names[-1], True)[0])
+    finally:
+        solver.close()
+
+    record("path_to", timed(tree.path_to, names[-1])[0])
+    record("format", timed(tree.format)[0])
+    seconds, layout = timed(tree_layout, tree)
+    record("layout", seconds)
+    if V <= 60:  # Same limit as the GUI's fork view, which draws every path in full
+        record("paths", timed(lambda: sum(1 for _ in tree.paths()))[0])
+        record("fork_layout", timed(fork_layout, tree)[0])
+
+    # A fresh figure per case, so "render" includes the first full draw like a new window
+    fig = Figure(figsize=(7, 7), dpi=100)
+    renderer = TreeRenderer(fig.add_subplot(111), FigureCanvasAgg(fig))
+    record("render", timed(renderer.show_layout, layout)[0])
+    record("render_repeat", timed(renderer.show_layout, layout)[0])
+    return rows
+
+
+def git_commit():
+    """Current commit hash, or None outside a git checkout"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(old_path, new_path):
+    """Print stage timings of two result files side by side"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    key = lambda r: (r["graph"], r["vertices"], r["backend"], r["engine"], r["stage"])
+    before = {key(r): r for r in old["results"]}
+    print(f"{'graph':<9}{'V':>8} {'backend':<7} {'engine':<11} {'stage':<14}{'old s':>10}{'new s':>10}{'ratio':>8}")
+    for r in new["results"]:
+        o = before.get(key(r))
+        if o is None or o["status"] != "ok" or r["status"] != "ok":
+            continue
+        ratio = r["seconds"] / o["seconds"] if o["seconds"] else float("nan")
+        print(f"{r['graph']:<9}{r['vertices']:>8} {r['backend']:<7} {r['engine']:<11} {r['stage']:<14}"
+              f"{o['seconds']:>10.4f}{r['seconds']:>10.4f}{ratio:>8.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time every stage of a shortest-path run on seeded graphs")
+    parser.add_argument("--sizes", default="10,100,1000,10000,100000", help="comma separated city counts")
+    parser.add_argument("--graphs", default=",".join(GENERATORS), help="comma separated: " + ", ".join(GENERATORS))
+    parser.add_argument("--backends", default="c,numpy", help="comma separated solver backends")
+    parser.add_argument("--engines", default=",".join(ENGINES), help="comma separated engines (auto works too)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the graph generators")
+    parser.add_argument("--max-edges", type=int, default=2_000_000, help="skip graphs with more roads than this")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds before a solve is cancelled")
+    parser.add_argument("--output", help="write JSON here (default: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files and exit")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    backends = args.backends.split(",")
+    if "c" in backends and not os.path.exists(BACKEND_EXE):
+        print("C backend not compiled, benchmarking NumPy only", file=sys.stderr)
+        backends.remove("c")
+
+    results = []
+    for kind in args.graphs.split(","):
+        for V in (int(size) for size in args.sizes.split(",")):
+            if estimated_edges(kind, V) > args.max_edges:
+                print(f"skip {kind} V={V}: more than {args.max_edges} roads", file=sys.stderr)
+                continue
+            for backend in backends:
+                for engine in args.engines.split(","):
+                    print(f"{kind} V={V} {backend} {engine}", file=sys.stderr)
+                    results += run_case(kind, V, backend, engine, args.seed, args.timeout)
+
+    report = {"meta": {"commit": git_commit(), "python": platform.python_version(),
+                       "platform": platform.platform(), "seed": args.seed,
+                       "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+              "results": results}
+    text = json.dumps(report, indent=1)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
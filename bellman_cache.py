@@ -0,0 +1,190 @@
+"""Results cache on local disk, shared between sessions and processes.
+
+    cache = ResultCache()                       # ~/.cache/bellman-ford-city-distance, 256 MB
+    digest = graph.digest()                     # bellman_graph.Graph
+    tree = cache.get(digest, "A", "auto", graph.names)   # None on a miss
+    if tree is None:
+        tree = solver.query("A", "auto")
+        cache.put(digest, "A", "auto", tree)
+
+Each entry is one file named after a hash of (graph, source, engine). The
+graph part is Graph.digest(), which ignores edge order, so the same roads typed
+in a different order hit the same entry. A file holds the distance and
+predecessor arrays as raw little-endian int64/int32 (about 12 bytes per city),
+or just a marker when the source reaches a negative cycle.
+
+Sharing between processes needs no lock: entries are written to a temporary
+file and renamed into place (readers see the whole file or nothing), a hit
+updates the file's modification time, and when the directory grows past its
+budget the least recently used files are deleted. A file that disappears
+while being read is just a miss.
+"""
+import hashlib
+import os
+import struct
+import tempfile
+from array import array
+
+from bellman_solver import INF, INT64_MAX, NegativeCycleError, ShortestPathTree
+
+MAGIC = b"BFC1"  # Format tag at the start of every entry; change it when the layout changes
+HEADER = struct.Struct("<4sBi")  # magic, status, V
+STATUS_OK, STATUS_NEGATIVE_CYCLE = 0, 2  # Same codes as the C worker
+DEFAULT_BUDGET = 256 * 1024 * 1024  # Bytes on disk before old entries are evicted
+
+
+def default_cache_dir():
+    """$BELLMAN_CACHE_DIR, else the user's local cache folder"""
+    if os.environ.get("BELLMAN_CACHE_DIR"):
+        return os.environ["BELLMAN_CACHE_DIR"]
+    base = (os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME")
+            or os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "bellman-ford-city-distance")
+
+
+def _short_text(text):
+    """Length-prefixed UTF-8 string (engine and backend names)"""
+    data = text.encode()[:255]
+    return bytes([len(data)]) + data
+
+
+class ResultCache:
+    """Shortest path trees on disk, keyed by (graph hash, source, engine), with LRU eviction"""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_BUDGET):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.used = None  # Bytes in the directory as of the last scan plus our own writes since
+        self.hits = self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, digest, source, engine):
+        """File for one entry"""
+        key = hashlib.sha1("\0".join((digest, source, engine)).encode()).hexdigest()
+        return os.path.join(self.directory, key + ".bin")
+
+    def get(self, digest, source, engine, names):
+        """Cached ShortestPathTree (cached=True) or None. Raises NegativeCycleError if that
+        was the stored outcome."""
+        path = self.path(digest, source, engine)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            self.misses += 1
+            return None
+        tree = self._decode(data, names, source)
+        if tree is None:  # Truncated, from another format version, or for a different city count
+            self._remove(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        if tree is NegativeCycleError:
+            raise NegativeCycleError("Error: Graph contains a negative weight cycle!")
+        return tree
+
+    def _decode(self, data, names, source):
+        """Parse one entry; None if it isn't valid for these cities"""
+        if len(data) < HEADER.size:
+            return None
+        magic, status, V = HEADER.unpack_from(data)
+        if magic != MAGIC or V != len(names):
+            return None
+        if status == STATUS_NEGATIVE_CYCLE:
+            return NegativeCycleError
+        offset = HEADER.size
+        texts = []
+        for _ in range(2):  # engine, backend
+            if offset >= len(data):
+                return None
+            size = data[offset]
+            texts.append(data[offset + 1:offset + 1 + size].decode())
+            offset += 1 + size
+        if len(data) != offset + 12 * V:
+            return None
+        dist = array('q'); dist.frombytes(data[offset:offset + 8 * V])
+        pred = array('i'); pred.frombytes(data[offset + 8 * V:])
+        if struct.pack("=i", 1) != struct.pack("<i", 1):  # Entries are little-endian on every machine
+            dist.byteswap(); pred.byteswap()
+        engine, backend = texts
+        return ShortestPathTree(names, source, [INF if d == INT64_MAX else d for d in dist], list(pred),
+                                cached=True, engine=engine, backend=f"{backend} via disk cache")
+
+    def put(self, digest, source, engine, tree):
+        """Store a tree"""
+        dist = array('q', (INT64_MAX if d == INF else d for d in tree.dist))
+        pred = array('i', tree.pred)
+        if struct.pack("=i", 1) != struct.pack("<i", 1):
+            dist.byteswap(); pred.byteswap()
+        self._write(self.path(digest, source, engine),
+                    HEADER.pack(MAGIC, STATUS_OK, len(tree.dist)) + _short_text(tree.engine or "")
+                    + _short_text(tree.backend or "") + dist.tobytes() + pred.tobytes())
+
+    def put_negative_cycle(self, digest, source, engine, V):
+        """Remember that this source reaches a negative cycle"""
+        self._write(self.path(digest, source, engine), HEADER.pack(MAGIC, STATUS_NEGATIVE_CYCLE, V))
+
+    def _write(self, path, data):
+        """Atomically create or replace an entry, then evict if over budget"""
+        fd, temp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp, path)  # Atomic: other processes never see half a file
+        except OSError:
+            self._remove(temp)
+            return  # A full or read-only disk just means no caching
+        if self.used is None:
+            self.used = self._scan()[1]
+        else:
+            self.used += len(data)
+        if self.used > self.max_bytes:
+            self.evict()
+
+    def _scan(self):
+        """(entries as (last used, size, path), total bytes)"""
+        entries = []
+        try:
+            with os.scandir(self.directory) as listing:
+                for entry in listing:
+                    if entry.name.endswith(".bin"):
+                        try:
+                            info = entry.stat()
+                        except OSError:
+                            continue  # Deleted by another process meanwhile
+                        entries.append((info.st_mtime, info.st_size, entry.path))
+        except OSError:
+            pass
+        return entries, sum(size for _, size, _ in entries)
+
+    def evict(self):
+        """Delete least recently used entries until the cache is below 90% of its budget"""
+        entries, total = self._scan()
+        entries.sort()
+        target = self.max_bytes * 0.9  # Some headroom so the next write doesn't evict again
+        for _, size, path in entries:
+            if total <= target:
+                break
+            self._remove(path)
+            total -= size
+        self.used = total
+
+    def clear(self):
+        """Delete every entry"""
+        for _, _, path in self._scan()[0]:
+            self._remove(path)
+        self.used = 0
+
+    def stats(self):
+        """Counters for profiles: hits and misses of this object, bytes on disk"""
+        return {"disk_cache_hits": self.hits, "disk_cache_misses": self.misses,
+                "disk_cache_bytes": self._scan()[1]}
+
+    @staticmethod
+    def _remove(path):
+        """Delete a file that another process may already have deleted"""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,267 @@
+"""Seeded random road networks, generated with vectorized NumPy sampling.
+
+    graph = generate(100_000, topology="geometric", density=0.0001, seed=7)   # bellman_graph.Graph
+    print(describe(graph))
+
+Topologies (density is the share of possible roads; results are approximate):
+- random: every ordered pair of cities gets a road with probability density
+- grid: roads both ways between horizontal and vertical neighbours of a
+  square grid; density is the share of those roads that is kept
+- scale-free: road ends are drawn with power-law probabilities, so a few
+  hub cities have most of the roads (like airline networks)
+- geometric: cities are random points in a unit square, roads join every
+  pair closer than the radius that gives the requested density (both ways)
+
+Weights are integers in [low, high] from the chosen distribution. A share of
+them can be made negative, and negative cycles can be:
+- forbid: negative roads come from city potentials (w + p[u] - p[v] with
+  w >= 0), so every cycle keeps its original, non-negative total
+- allow: that share of roads has its sign flipped; cycles may appear
+- force: like allow, plus a cycle through the first city whose roads are
+  all negative, so a run from that city always reports a negative cycle
+
+The same arguments and seed always give the same graph. From the command line:
+
+    python bellman_generate.py 1000000 --topology grid --seed 1 --output grid.bfg
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from bellman_graph import INT32_MAX, Graph
+
+TOPOLOGIES = ("random", "grid", "scale-free", "geometric")
+WEIGHT_DISTRIBUTIONS = ("uniform", "normal", "exponential")
+CYCLE_MODES = ("forbid", "allow", "force")
+SCALE_FREE_EXPONENT = 2.5  # Degree distribution P(k) ~ k^-2.5
+DENSE_LIMIT = 4_000_000  # Up to this many city pairs "random" flips a coin per pair; above it samples roads
+MAX_ROADS = 50_000_000  # Refuse requests for more roads than this (about 1.2 GB while generating)
+
+
+def _unique_roads(V, src, dest):
+    """Drop self-loops and repeated (from, to) pairs; returns sorted int64 arrays"""
+    keep = src != dest
+    keys = np.sort(src[keep].astype(np.int64) * V + dest[keep])  # Sorting beats np.unique's hashing here
+    if len(keys):  # A very low density can leave no road at all
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+    return keys // V, keys % V
+
+
+def _random_roads(V, density, rng):
+    """Each ordered pair independently with probability density"""
+    if V * V <= DENSE_LIMIT:
+        mask = rng.random((V, V)) < density
+        np.fill_diagonal(mask, False)
+        return np.nonzero(mask)
+    count = rng.binomial(V * (V - 1), density)
+    src = rng.integers(0, V, count)
+    dest = rng.integers(0, V - 1, count)
+    dest += dest >= src  # Uniform over the other V - 1 cities
+    return _unique_roads(V, src, dest)
+
+
+def _grid_roads(V, density, rng):
+    """Neighbours on a square grid filled row by row, both directions"""
+    side = int(np.ceil(np.sqrt(V)))
+    i = np.arange(V)
+    right = i[(i % side < side - 1) & (i + 1 < V)]
+    down = i[i + side < V]
+    src = np.concatenate((right, right + 1, down, down + side))
+    dest = np.concatenate((right + 1, right, down + side, down))
+    keep = rng.random(len(src)) < density
+    return src[keep], dest[keep]
+
+
+def _scale_free_roads(V, density, rng):
+    """Chung-Lu style: both ends drawn with probability ~ rank^(-1/(exponent - 1))"""
+    count = rng.binomial(V * (V - 1), density)
+    cdf = np.cumsum(np.arange(1, V + 1, dtype=np.float64) ** (-1 / (SCALE_FREE_EXPONENT - 1)))
+    hubs = rng.permutation(V)  # Which cities are the hubs
+
+    def ends():  # Inverse transform sampling; sorted lookups are far faster than rng.choice(p=...)
+        return hubs[np.minimum(np.searchsorted(cdf, np.sort(rng.random(count)) * cdf[-1], side="right"), V - 1)]
+
+    src = ends()
+    return _unique_roads(V, src, ends()[rng.permutation(count)])  # Shuffled, so the two ends are independent
+
+
+def _geometric_roads(V, density, rng):
+    """Pairs of random points closer than the radius, found through a grid of cells so
+    only points in neighbouring cells are compared"""
+    points = rng.random((V, 2))
+    radius = np.sqrt(density / np.pi)  # Share of the square within the radius of a point (away from the edges)
+    cells = int(max(1, min(1 / radius, np.sqrt(V))))  # Cells at least one radius wide
+    cell_xy = np.minimum((points * cells).astype(np.int64), cells - 1)
+    cell = cell_xy[:, 0] * cells + cell_xy[:, 1]
+    order = np.argsort(cell, kind="stable")
+    start = np.searchsorted(cell[order], np.arange(cells * cells + 1))  # Cell c holds order[start[c]:start[c + 1]]
+    src_parts, dest_parts = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            x, y = cell_xy[:, 0] + dx, cell_xy[:, 1] + dy
+            i = np.nonzero((x >= 0) & (x < cells) & (y >= 0) & (y < cells))[0]
+            c = x[i] * cells + y[i]
+            counts = start[c + 1] - start[c]
+            # Every (point, city in the neighbouring cell) pair, as flat arrays
+            j = order[np.arange(counts.sum()) + np.repeat(start[c] - np.cumsum(counts) + counts, counts)]
+            i = np.repeat(i, counts)
+            close = (i != j) & (((points[i] - points[j]) ** 2).sum(axis=1) <= radius * radius)
+            src_parts.append(i[close]); dest_parts.append(j[close])
+    return np.concatenate(src_parts), np.concatenate(dest_parts)
+
+
+ROAD_GENERATORS = {"random": _random_roads, "grid": _grid_roads, "scale-free": _scale_free_roads,
+                   "geometric": _geometric_roads}
+
+
+def _weights(count, distribution, low, high, rng):
+    """count integer weights in [low, high]"""
+    if distribution == "uniform":
+        return rng.integers(low, high + 1, count)
+    if distribution == "normal":  # Centered, with [low, high] as +-3 standard deviations
+        w = rng.normal((low + high) / 2, (high - low) / 6, count)
+    else:  # exponential: mostly short roads, a few long ones
+        w = low + rng.exponential(max(1, (high - low) / 4), count)
+    return np.clip(np.rint(w), low, high).astype(np.int64)
+
+
+def _negative_without_cycles(V, src, dest, weight, share, rng):
+    """Reweight with integer city potentials so about share of the roads turn negative.
+
+    Road u -> v becomes w + p[u] - p[v]. Around any cycle the potentials cancel,
+    so no cycle gets a negative total. With p = floor(P * z) for random z in
+    [0, 1), a road turns negative once P is above w / (z[v] - z[u]); P is
+    picked from those thresholds. At most the roads with z[u] < z[v] can turn
+    negative (about half). A road that lands on exactly 0 becomes 1 instead:
+    the GUI grid reads 0 as "no road", and a dearer road can't make a cycle negative.
+    """
+    z = rng.random(V)
+    rise = z[dest] - z[src]
+    uphill = rise > 0
+    thresholds = np.sort(weight[uphill] / rise[uphill])
+    wanted = min(int(round(share * len(weight))), len(thresholds))
+    if wanted == 0:
+        return weight
+    P = min(thresholds[wanted - 1] * 1.000001 + 1, 1e9)  # Keeps weights well inside 32 bits
+    p = np.floor(P * z).astype(np.int64)
+    shifted = weight + p[src] - p[dest]
+    return np.where((shifted == 0) & (weight != 0), 1, shifted)
+
+
+def generate(V, topology="random", density=1.0, weights="uniform", low=1, high=50,
+             negative=0.0, cycles="forbid", seed=None, names=None):
+    """Random Graph with V cities (see the module docstring for the options).
+    Raises ValueError for impossible options."""
+    if V < 2:
+        raise ValueError("Error: A graph needs at least 2 cities.")
+    if topology not in ROAD_GENERATORS:
+        raise ValueError(f"Error: Unknown topology {topology!r} (choose from {', '.join(TOPOLOGIES)}).")
+    if weights not in WEIGHT_DISTRIBUTIONS:
+        raise ValueError(f"Error: Unknown weight distribution {weights!r}.")
+    if cycles not in CYCLE_MODES:
+        raise ValueError(f"Error: Unknown negative cycle mode {cycles!r}.")
+    if not 0 < density <= 1 or not 0 <= negative <= 1:
+        raise ValueError("Error: Density must be in (0, 1] and the negative share in [0, 1].")
+    if low > high or max(abs(low), abs(high)) > INT32_MAX // 2:
+        raise ValueError("Error: Weights need low <= high, both well inside 32 bits.")
+    if cycles == "forbid" and negative > 0 and low < 0:
+        raise ValueError("Error: Forbidding negative cycles needs non-negative base weights (low >= 0).")
+    expected = 4 * V if topology == "grid" else density * V * (V - 1)
+    if expected > MAX_ROADS:
+        raise ValueError(f"Error: That would be about {expected:,.0f} roads; lower the density.")
+
+    rng = np.random.default_rng(seed)
+    src, dest = (np.asarray(a, dtype=np.int64) for a in ROAD_GENERATORS[topology](V, density, rng))
+    weight = _weights(len(src), weights, low, high, rng)
+    if negative > 0 and cycles == "forbid":
+        weight = _negative_without_cycles(V, src, dest, weight, negative, rng)
+    elif negative > 0:
+        weight = np.where(rng.random(len(weight)) < negative, -np.abs(weight), weight)
+    if cycles == "force":
+        # A cycle through city 0 whose roads are all negative; it replaces any roads between its cities
+        ring = np.concatenate(([0], 1 + rng.choice(V - 1, min(2, V - 1), replace=False)))
+        ring_src, ring_dest = ring, np.roll(ring, -1)
+        keep = ~np.isin(src * V + dest, ring_src * V + ring_dest)
+        src = np.concatenate((src[keep], ring_src))
+        dest = np.concatenate((dest[keep], ring_dest))
+        weight = np.concatenate((weight[keep], -rng.integers(1, max(2, abs(high)) + 1, len(ring))))
+    if names is None:
+        names = [str(i) for i in range(V)]
+    return Graph.from_arrays(names, src, dest, weight)
+
+
+def describe(graph):
+    """Short text summary of a graph (shown instead of the road list for big graphs)"""
+    src, dest, weight = graph.columns()
+    degree = np.diff(np.frombuffer(graph.offsets, dtype=np.int32))
+    possible = graph.V * (graph.V - 1)
+    lines = [f"{graph.V:,} cities, {graph.E:,} roads ({graph.E / possible:.4%} of all city pairs)"]
+    if graph.E:
+        lines.append(f"Roads per city: {graph.E / graph.V:.1f} on average, {degree.max():,} at most, "
+                     f"{int((degree == 0).sum()):,} cities with none")
+        lines.append(f"Weights: {weight.min():,} to {weight.max():,} (mean {weight.mean():.1f}), "
+                     f"{int((weight < 0).sum()):,} negative")
+    lines.append(f"Road arrays: {graph.nbytes() / 1024:,.1f} KB")
+    return "\n".join(lines) + "\n"
+
+
+def save_graph(graph, path):
+    """Write a graph as a .bfg snapshot, DIMACS .gr (cities renumbered 1..V), CSV edge
+    list or 'from to weight' text, chosen by the file extension"""
+    if path.endswith(".bfg"):
+        from bellman_import import save_snapshot  # Only needed for snapshots
+        save_snapshot(graph, path)
+        return
+    src, dest, weight = graph.columns()
+    names = graph.names
+    with open(path, "w", newline="") as f:
+        if path.endswith(".gr"):
+            f.write(f"c generated by bellman_generate.py\np sp {graph.V} {graph.E}\n")
+        elif path.endswith(".csv"):
+            f.write("from,to,weight\n")
+        for start in range(0, graph.E, 1 << 20):  # A million roads of text at a time
+            rows = zip(src[start:start + (1 << 20)].tolist(), dest[start:start + (1 << 20)].tolist(),
+                       weight[start:start + (1 << 20)].tolist())
+            if path.endswith(".gr"):
+                f.write("".join(f"a {u + 1} {v + 1} {w}\n" for u, v, w in rows))
+            elif path.endswith(".csv"):
+                f.write("".join(f"{names[u]},{names[v]},{w}\n" for u, v, w in rows))
+            else:
+                f.write("".join(f"{names[u]} {names[v]} {w}\n" for u, v, w in rows))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a seeded random road network")
+    parser.add_argument("cities", type=int, help="number of cities")
+    parser.add_argument("--topology", choices=TOPOLOGIES, default="random")
+    parser.add_argument("--density", type=float, default=None,
+                        help="share of possible roads (default: 1 for grid, else about 4 roads per city)")
+    parser.add_argument("--weights", choices=WEIGHT_DISTRIBUTIONS, default="uniform", help="weight distribution")
+    parser.add_argument("--low", type=int, default=1, help="smallest weight")
+    parser.add_argument("--high", type=int, default=50, help="largest weight")
+    parser.add_argument("--negative", type=float, default=0.0, help="share of roads made negative (0-1)")
+    parser.add_argument("--cycles", choices=CYCLE_MODES, default="forbid", help="negative cycles")
+    parser.add_argument("--seed", type=int, default=None, help="random seed (same seed = same graph)")
+    parser.add_argument("--output", help="write the graph to a .bfg, .gr, .csv or text file")
+    args = parser.parse_args(argv)
+
+    density = args.density
+    if density is None:
+        density = 1.0 if args.topology == "grid" else min(1.0, 4 / max(1, args.cities - 1))
+    start = time.perf_counter()
+    try:
+        graph = generate(args.cities, args.topology, density, args.weights, args.low, args.high,
+                         args.negative, args.cycles, args.seed)
+    except ValueError as e:
+        sys.exit(str(e))
+    sys.stdout.write(describe(graph))
+    print(f"Generated in {time.perf_counter() - start:.2f} s")
+    if args.output:
+        save_graph(graph, args.output)
+        print(f"Written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
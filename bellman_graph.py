@@ -0,0 +1,150 @@
+"""Compact graph model shared by every stage of a run.
+
+A Graph is built once when the roads change (from the GUI's edge model, a
+file or an edge list) and then handed as-is to the solvers, the all-pairs
+cache, the live-update tree, the disk cache and the batch solver.
+
+Roads are stored in CSR ("compressed sparse row") form, grouped by the city
+they leave:
+
+    roads leaving city u:   targets[offsets[u] : offsets[u + 1]]
+    their weights:          weights[offsets[u] : offsets[u + 1]]
+
+offsets, targets and weights are array('i') buffers, so a road costs 8 bytes
+instead of a (from, to, weight) tuple of Python ints (over 100 bytes), and
+NumPy or the C worker can use the buffers without converting them. A graph
+opened from a snapshot (bellman_import.open_snapshot) uses read-only int32
+memoryviews of the mapped file instead; they behave the same.
+"""
+import hashlib
+import struct
+from array import array
+
+import numpy as np
+
+INT32_MIN, INT32_MAX = -2**31, 2**31 - 1
+
+
+def _int32_array(values):
+    """array('i') with the contents of a NumPy array"""
+    result = array('i')
+    result.frombytes(np.ascontiguousarray(values, dtype=np.int32).tobytes())
+    return result
+
+
+class Graph:
+    """Cities and one-way roads in CSR arrays, plus a name <-> index table"""
+
+    __slots__ = ("names", "index", "offsets", "targets", "weights", "has_negative", "_digest")
+
+    def __init__(self, names, offsets, targets, weights, digest=None):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}  # city name -> index
+        self.offsets = offsets  # array('i'), V + 1 entries
+        self.targets = targets  # array('i'), E entries
+        self.weights = weights  # array('i'), E entries
+        # Rules out Dijkstra
+        self.has_negative = len(weights) > 0 and int(np.frombuffer(weights, dtype=np.int32).min()) < 0
+        self._digest = digest  # Known already when opened from a snapshot
+
+    @classmethod
+    def from_arrays(cls, names, src, dest, weight):
+        """Build from three equal-length integer sequences (any order; roads keep
+        their relative order within each city). Raises ValueError for roads that
+        point at a missing city or weights that don't fit in 32 bits."""
+        V = len(names)
+        src, dest, weight = (np.asarray(x, dtype=np.int64).ravel() for x in (src, dest, weight))
+        if len(src) and (min(src.min(), dest.min()) < 0 or max(src.max(), dest.max()) >= V):
+            raise ValueError("Error: Invalid graph.")
+        if len(weight) and (weight.min() < INT32_MIN or weight.max() > INT32_MAX):
+            raise ValueError("Error: Road weight out of range.")
+        order = np.argsort(src, kind="stable")  # Group by source city
+        offsets = np.zeros(V + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=V), out=offsets[1:])
+        return cls(names, _int32_array(offsets), _int32_array(dest[order]), _int32_array(weight[order]))
+
+    @classmethod
+    def from_edges(cls, names, edges):
+        """Build from (from_index, to_index, weight) triples"""
+        table = np.array(edges, dtype=np.int64).reshape(-1, 3)
+        return cls.from_arrays(names, table[:, 0], table[:, 1], table[:, 2])
+
+    @classmethod
+    def from_model(cls, names, model):
+        """Build from the GUI's {(from_index, to_index): weight} edge model"""
+        pairs = np.array(list(model), dtype=np.int64).reshape(-1, 2)
+        weight = np.fromiter(model.values(), dtype=np.int64, count=len(model))
+        return cls.from_arrays(names, pairs[:, 0], pairs[:, 1], weight)
+
+    def to_model(self):
+        """The GUI's {(from_index, to_index): weight} edge model: the cheapest of any
+        parallel roads, self-loops dropped (the model has one weight per city pair)"""
+        src, dest, weight = (column.astype(np.int64) for column in self.columns())
+        keep = src != dest
+        src, dest, weight = src[keep], dest[keep], weight[keep]
+        order = np.lexsort((weight, dest, src))  # Cheapest first within each (src, dest) pair
+        src, dest, weight = src[order], dest[order], weight[order]
+        first = np.ones(len(src), dtype=bool)
+        first[1:] = (src[1:] != src[:-1]) | (dest[1:] != dest[:-1])
+        return dict(zip(zip(src[first].tolist(), dest[first].tolist()), weight[first].tolist()))
+
+    @property
+    def V(self):
+        """Number of cities"""
+        return len(self.names)
+
+    @property
+    def E(self):
+        """Number of roads"""
+        return len(self.targets)
+
+    def columns(self):
+        """(src, dest, weight) as int32 NumPy arrays in CSR order. dest and weight are
+        views of the graph's buffers (no copy); only src is built."""
+        offsets = np.frombuffer(self.offsets, dtype=np.int32)
+        src = np.repeat(np.arange(self.V, dtype=np.int32), np.diff(offsets))
+        return src, np.frombuffer(self.targets, dtype=np.int32), np.frombuffer(self.weights, dtype=np.int32)
+
+    def roads(self, u):
+        """(target, weight) pairs of the roads leaving city u"""
+        start, end = self.offsets[u], self.offsets[u + 1]
+        return zip(self.targets[start:end], self.weights[start:end])
+
+    def edges(self):
+        """Every road as (from_index, to_index, weight), grouped by source city"""
+        for u in range(self.V):
+            for v, w in self.roads(u):
+                yield u, v, w
+
+    def weight(self, u, v):
+        """Cheapest road u -> v, or None if there is none"""
+        found = [w for t, w in self.roads(u) if t == v]
+        return min(found) if found else None
+
+    def nbytes(self):
+        """Bytes used by the road arrays"""
+        return sum(a.itemsize * len(a) for a in (self.offsets, self.targets, self.weights))
+
+    def digest(self):
+        """Stable hash of the city names and the set of roads (road order doesn't matter).
+
+        Roads are sorted and hashed as little-endian int64 triples, so the same
+        graph gives the same hash on every machine and in every session (the
+        disk cache uses it in its file names). Computed once per Graph.
+        """
+        if self._digest is None:
+            src, dest, weight = (c.astype("<i8") for c in self.columns())
+            order = np.lexsort((weight, dest, src))
+            h = hashlib.sha1()
+            h.update(struct.pack("<2q", self.V, self.E))
+            h.update("\0".join(self.names).encode())
+            h.update(np.stack((src[order], dest[order], weight[order]), axis=1).tobytes())
+            self._digest = h.hexdigest()
+        return self._digest
+
+    def __eq__(self, other):
+        """Same cities and the same roads in the same order"""
+        return (isinstance(other, Graph) and self.names == other.names and self.offsets == other.offsets
+                and self.targets == other.targets and self.weights == other.weights)
+
+    __hash__ = None  # Mutable buffers: compare with ==, key dictionaries by digest()
@@ -1,11 +1,32 @@
 import tkinter as tk
-from tkinter import messagebox, scrolledtext
-import subprocess  # To run our C program
-import random      # For generating random distances
-import matplotlib.pyplot as plt
+from tkinter import messagebox, scrolledtext, filedialog, ttk
+import queue, threading  # The solver runs in a background thread so the window stays responsive
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
-import networkx as nx  # For graph visualization
+from bellman_solver import AllPairs, DynamicShortestPaths, ENGINE_CHOICES, BACKENDS, Cancelled, pick_engine
+from bellman_api import RouteFinder  # Same API the headless command line tool uses
+from bellman_import import import_graph, parse_weight  # Streaming file import with cached snapshots
+from bellman_render import TreeRenderer, fork_layout, tree_layout  # Artist-reusing tree drawing
+from bellman_profile import NO_PROFILE, RunProfile  # Opt-in per-stage timings
+from bellman_cache import ResultCache  # Solved trees kept on disk between sessions
+from bellman_graph import Graph  # Compact road arrays built once per matrix change
+from bellman_generate import CYCLE_MODES, TOPOLOGIES, WEIGHT_DISTRIBUTIONS, describe, generate  # Random networks
+
+MATRIX_LIMIT = 15  # Above this many cities the Entry grid is replaced by a paged road table
+PAGE_SIZE = 200    # Roads shown per page in the road table
+LIST_LIMIT = 100_000  # Above this many roads the road table shows a count instead of the roads
+DRAW_LIMIT = 60    # Above this many cities the fork view is not drawn (the tree view has no limit)
+FORK_LIMIT = 15    # "auto" view: fork layout up to this many cities, shared tree above
+PRELOAD_LIMIT = 2000  # Preloading keeps V trees of V entries, so bigger graphs aren't preloaded
+
+def city_label(i):
+    """Spreadsheet-style city name: A..Z, then AA, AB, ..."""
+    name = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        name = chr(65 + r) + name
+    return name
 
 class BellmanFordGUI:
     def __init__(self, root):
@@ -17,6 +38,25 @@ class BellmanFordGUI:
 
         # Variables to store our data
         self.city_entries, self.city_names, self.city_count, self.graph_data = [], [], 0, None
+        self.city_index = {}  # city name -> index
+        self.routes = RouteFinder()  # Opens the solver on first run (C worker stays alive between runs)
+        try:
+            self.disk_cache = ResultCache()  # Shared with bellman_api.py and other windows
+        except OSError:
+            self.disk_cache = None  # No writable cache folder: solve every time
+        self.all_pairs = AllPairs()  # Every source's result, reused until the matrix changes
+        # (from_index, to_index) -> weight, kept in sync with the matrix cells. None until
+        # needed for an imported or generated Graph: road_model() builds it from self.graph
+        self.edge_model = {}
+        self.graph = None  # Graph built from edge_model; rebuilt on the next run after any change
+        self.dynamic, self.redraw_job = None, None  # Live tree updated on single-cell edits
+        self.worker, self.task_id = None, 0  # Background solve; results from older task ids are ignored
+        self.results = queue.Queue()  # (task_id, kind, ...) messages from the worker thread
+        self.poll_job = None
+        self.preloader = None  # Background thread solving the other sources on all cores
+        self.expanded, self.collapsed = set(), set()  # Tree view: subtrees the user opened / closed
+        self.profile, self.last_profile = NO_PROFILE, None  # Timings of the run being shown / last profiled run
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Create title label at the top with better styling
         title_frame = tk.Frame(root, bg='#2c3e50', pady=15)
@@ -44,13 +84,17 @@ class BellmanFordGUI:
         
         frame_top = tk.Frame(input_section, bg='#f0f0f0')
         frame_top.pack(pady=5)
-        tk.Label(frame_top, text="Number of Cities (2-15):", font=("Arial", 10), 
+        tk.Label(frame_top, text="Number of Cities:", font=("Arial", 10), 
                 bg='#f0f0f0').grid(row=0, column=0, padx=5, sticky='w')
         self.entry_cities = tk.Entry(frame_top, width=10, font=("Arial", 10))
         self.entry_cities.grid(row=0, column=1, padx=5)
         tk.Button(frame_top, text="Create Matrix", command=self.create_matrix, 
                  bg='#3498db', fg='white', font=("Arial", 10, "bold"), 
                  relief=tk.RAISED, padx=10, pady=5).grid(row=0, column=2, padx=5)
+        # Large networks come from files instead of typing into a grid
+        tk.Button(frame_top, text="📂 Import Roads", command=self.import_roads, 
+                 bg='#3498db', fg='white', font=("Arial", 10, "bold"), 
+                 relief=tk.RAISED, padx=10, pady=5).grid(row=0, column=3, padx=5)
 
         # Section 2: Distance matrix container (with better styling)
         matrix_section = tk.LabelFrame(left_frame, text="📝 Step 2: Distance Matrix", 
@@ -68,6 +112,29 @@ class BellmanFordGUI:
                                     relief=tk.RAISED, padx=10, pady=5)
         self.random_btn.pack(pady=5)
 
+        # Generator options: how the random network looks (seed = same graph every time)
+        gen_frame = tk.Frame(matrix_section, bg='#f0f0f0')
+        gen_frame.pack(pady=2)
+        self.topology_var = tk.StringVar(value="random")
+        self.density_var = tk.StringVar(value="auto")  # auto = complete grid / 3 roads per city, like before
+        self.seed_var = tk.StringVar(value="")  # Blank = different every time
+        self.weights_var = tk.StringVar(value="uniform")
+        self.negative_var = tk.StringVar(value="0")  # % of roads made negative
+        self.cycles_var = tk.StringVar(value="forbid")
+        options = [("Topology:", ttk.Combobox(gen_frame, textvariable=self.topology_var, values=TOPOLOGIES,
+                                              state="readonly", width=10)),
+                   ("Density:", tk.Entry(gen_frame, textvariable=self.density_var, width=7)),
+                   ("Seed:", tk.Entry(gen_frame, textvariable=self.seed_var, width=7)),
+                   ("Weights:", ttk.Combobox(gen_frame, textvariable=self.weights_var,
+                                             values=WEIGHT_DISTRIBUTIONS, state="readonly", width=10)),
+                   ("Negative %:", tk.Entry(gen_frame, textvariable=self.negative_var, width=7)),
+                   ("Neg. cycles:", ttk.Combobox(gen_frame, textvariable=self.cycles_var, values=CYCLE_MODES,
+                                                 state="readonly", width=7))]
+        for k, (label, widget) in enumerate(options):
+            tk.Label(gen_frame, text=label, font=("Arial", 9), bg='#f0f0f0').grid(
+                row=k // 3, column=2 * (k % 3), padx=2, pady=1, sticky='e')
+            widget.grid(row=k // 3, column=2 * (k % 3) + 1, padx=2, pady=1, sticky='w')
+
         # Section 3: Source selection and algorithm execution
         control_section = tk.LabelFrame(left_frame, text="🚀 Step 3: Run Algorithm", 
                                        font=("Arial", 11, "bold"), bg='#f0f0f0', 
@@ -79,14 +146,80 @@ class BellmanFordGUI:
         tk.Label(source_frame, text="Select Source City:", font=("Arial", 10), 
                 bg='#f0f0f0').pack(side=tk.LEFT, padx=5)
         self.source_var = tk.StringVar()
-        self.source_menu = tk.OptionMenu(source_frame, self.source_var, [])
-        self.source_menu.config(font=("Arial", 10), width=8)
+        # Combobox instead of OptionMenu: it scrolls, so it works with thousands of cities
+        self.source_menu = ttk.Combobox(source_frame, textvariable=self.source_var, state="readonly",
+                                        font=("Arial", 10), width=8)
         self.source_menu.pack(side=tk.LEFT, padx=5)
 
-        # Button to run the algorithm
-        tk.Button(control_section, text="▶ Run Algorithm", command=self.run_algorithm,
+        # Algorithm (same results, different amount of work): auto = Dijkstra unless a road is negative
+        tk.Label(source_frame, text="Engine:", font=("Arial", 10), 
+                bg='#f0f0f0').pack(side=tk.LEFT, padx=5)
+        self.engine_var = tk.StringVar(value="auto")
+        self.engine_menu = tk.OptionMenu(source_frame, self.engine_var, *ENGINE_CHOICES)
+        self.engine_menu.config(font=("Arial", 10), width=9)
+        self.engine_menu.pack(side=tk.LEFT, padx=5)
+
+        # Which solver runs the algorithm: auto = C backend if compiled, otherwise NumPy
+        solver_frame = tk.Frame(control_section, bg='#f0f0f0')
+        solver_frame.pack(pady=5)
+        tk.Label(solver_frame, text="Solver:", font=("Arial", 10), 
+                bg='#f0f0f0').pack(side=tk.LEFT, padx=5)
+        self.backend_var = tk.StringVar(value="auto")
+        backend_menu = tk.OptionMenu(solver_frame, self.backend_var, *BACKENDS)
+        backend_menu.config(font=("Arial", 10), width=8)
+        backend_menu.pack(side=tk.LEFT, padx=5)
+
+        # Drawing style: fork = one row per destination, tree = every city once (scales to large graphs)
+        tk.Label(solver_frame, text="View:", font=("Arial", 10), 
+                bg='#f0f0f0').pack(side=tk.LEFT, padx=5)
+        self.view_var = tk.StringVar(value="auto")
+        view_menu = tk.OptionMenu(solver_frame, self.view_var, "auto", "fork", "tree",
+                                  command=lambda value: self.draw_graph(self.graph_data))
+        view_menu.config(font=("Arial", 10), width=6)
+        view_menu.pack(side=tk.LEFT, padx=5)
+
+        # All-pairs mode: solve every source once, then switching source is instant
+        self.all_pairs_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(control_section, text="Precompute all sources (instant source switching)",
+                      variable=self.all_pairs_var, font=("Arial", 9), bg='#f0f0f0').pack()
+        self.source_var.trace_add("write", lambda *args: self.on_source_change())
+
+        # Preload: after a single-source run, solve every other source on all cores (bellman_batch)
+        self.preload_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(control_section, text="Preload the other sources on all cores after a run",
+                      variable=self.preload_var, font=("Arial", 9), bg='#f0f0f0').pack()
+
+        # Disk cache: a graph + source solved before (in any session) is answered without a solver
+        self.disk_cache_var = tk.BooleanVar(value=self.disk_cache is not None)
+        tk.Checkbutton(control_section, text="Reuse results saved on disk by earlier sessions",
+                      variable=self.disk_cache_var, font=("Arial", 9), bg='#f0f0f0').pack()
+
+        # Live mode: after a run, editing one cell repairs the result instead of re-solving
+        self.live_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(control_section, text="Live update when a distance is edited",
+                      variable=self.live_var, font=("Arial", 9), bg='#f0f0f0').pack()
+
+        # Profiling: time every stage of a run and show it in the panel under the graph
+        self.profile_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(control_section, text="Profile runs (stage timings + solver counters)",
+                      variable=self.profile_var, font=("Arial", 9), bg='#f0f0f0').pack()
+
+        # Button to run the algorithm (a second click restarts it with the current inputs)
+        run_frame = tk.Frame(control_section, bg='#f0f0f0')
+        run_frame.pack(pady=10)
+        tk.Button(run_frame, text="▶ Run Algorithm", command=self.run_algorithm,
                  bg='#27ae60', fg='white', font=("Arial", 11, "bold"),
-                 relief=tk.RAISED, padx=20, pady=8).pack(pady=10)
+                 relief=tk.RAISED, padx=20, pady=8).pack(side=tk.LEFT, padx=5)
+        self.cancel_btn = tk.Button(run_frame, text="■ Cancel", command=self.cancel_run, state="disabled",
+                                    bg='#c0392b', fg='white', font=("Arial", 11, "bold"),
+                                    relief=tk.RAISED, padx=10, pady=8)
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
+
+        # Progress of the running solve (passes / relaxations reported by the solver)
+        self.progress_bar = ttk.Progressbar(control_section, mode="determinate", length=300)
+        self.progress_bar.pack()
+        self.progress_label = tk.Label(control_section, text="", font=("Arial", 9), bg='#f0f0f0', fg='#555')
+        self.progress_label.pack()
 
         # Section 4: Results display (with better styling)
         results_section = tk.LabelFrame(left_frame, text="📋 Results", 
@@ -104,35 +237,90 @@ class BellmanFordGUI:
         graph_header.pack(fill=tk.X)
         tk.Label(graph_header, text="🗺️ Network Graph Visualization", 
                 font=("Arial", 13, "bold"), bg='#34495e', fg='white').pack()
+
+        # Collapsible profile panel (packed before the canvas so it always gets its space)
+        profile_frame = tk.Frame(right_frame, bg='white')
+        profile_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=5)
+        profile_bar = tk.Frame(profile_frame, bg='white')
+        profile_bar.pack(fill=tk.X)
+        self.profile_toggle = tk.Button(profile_bar, text="▸ ⏱ Profile", command=self.toggle_profile_panel,
+                                        font=("Arial", 9, "bold"), relief=tk.FLAT, bg='white')
+        self.profile_toggle.pack(side=tk.LEFT)
+        tk.Button(profile_bar, text="Export Trace", command=lambda: self.export_profile("trace"),
+                 font=("Arial", 9)).pack(side=tk.RIGHT, padx=2)
+        tk.Button(profile_bar, text="Export JSON", command=lambda: self.export_profile("json"),
+                 font=("Arial", 9)).pack(side=tk.RIGHT, padx=2)
+        self.profile_text = scrolledtext.ScrolledText(profile_frame, height=12, font=("Consolas", 9),
+                                                      bg='#ffffff', relief=tk.SUNKEN, borderwidth=1)
         
         # Create a matplotlib figure for drawing the graph with more space
         self.fig = Figure(figsize=(7, 7), dpi=100, facecolor='white')
         self.ax = self.fig.add_subplot(111)
         self.canvas = FigureCanvasTkAgg(self.fig, master=right_frame)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        # Keeps one set of artists for the whole session and only updates their data
+        self.renderer = TreeRenderer(self.ax, self.canvas)
+        self.canvas.mpl_connect('button_press_event', self.on_graph_click)
         
         # Show initial message before any graph is created
-        self.ax.text(0.5, 0.5, 'Run algorithm to see shortest path visualization', 
-                    ha='center', va='center', fontsize=12, color='#7f8c8d', style='italic')
-        self.ax.set_xlim(0, 1); self.ax.set_ylim(0, 1); self.ax.axis('off'); self.canvas.draw()
+        self.draw_graph()
 
     def create_matrix(self):
         """Creates the distance matrix based on user input"""
         try:
             # Get the number of cities from the entry box and validate
-            self.city_count = int(self.entry_cities.get())
-            if not 2 <= self.city_count <= 15:
-                messagebox.showerror("Error", "Enter 2-15 cities"); return
+            count = int(self.entry_cities.get())
+            if count < 2:
+                messagebox.showerror("Error", "Enter at least 2 cities"); return
         except ValueError:
             messagebox.showerror("Error", "Invalid number"); return
 
+        # Auto-generate city names: A, B, ..., Z, AA, AB, etc.
+        self.load_cities([city_label(i) for i in range(count)], {})
+
+    def import_roads(self):
+        """Load cities and roads from a file (same formats as bellman_api.py)"""
+        path = filedialog.askopenfilename(title="Import roads",
+                                          filetypes=[("Graph files", "*.gr *.csv *.json *.txt *.bfg"),
+                                                     ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            graph = import_graph(path)  # Malformed lines come back as one error listing their numbers
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Error", f"Could not import {path}:\n{e}"); return
+        if graph.V < 2:
+            messagebox.showerror("Error", "The file needs at least 2 cities"); return
+        self.entry_cities.delete(0, tk.END); self.entry_cities.insert(0, str(graph.V))
+        # Keep the imported (possibly memory-mapped) Graph and its digest; the edge
+        # model is only built if the grid is shown or a road is edited
+        self.load_cities(graph.names, None, graph)
+
+    def load_cities(self, names, edge_model, graph=None):
+        """Set up cities and roads, then show them as a grid (small) or a road table (large).
+        edge_model may be None when graph holds the roads (see road_model())."""
+        if self.worker and self.worker.is_alive():
+            self.cancel_run()  # Its result would belong to the old cities
+        self.routes.stop_preload()
         # Clear any existing matrix
         for widget in self.matrix_frame.winfo_children(): widget.destroy()
         self.city_entries.clear()
+        self.city_names, self.city_count = list(names), len(names)
+        self.city_index = {name: i for i, name in enumerate(self.city_names)}
+        self.edge_model, self.dynamic, self.graph = edge_model, None, graph
 
-        # Auto-generate city names: A, B, C, D, etc. (chr(65) = 'A')
-        self.city_names = [chr(65 + i) for i in range(self.city_count)]
+        if self.city_count <= MATRIX_LIMIT:
+            self.build_matrix_view()
+        else:
+            self.build_table_view()
 
+        # Update the source city dropdown menu
+        self.source_menu["values"] = self.city_names
+        self.source_var.set(self.city_names[0])
+        self.random_btn.config(state="normal")  # Enable the random button
+
+    def build_matrix_view(self):
+        """Grid of Entry widgets, one per city pair (small graphs only)"""
         # Add instruction label and column headers
         tk.Label(self.matrix_frame, text="Enter distances (0 = same city, INF = no direct road)", 
                 font=("Arial", 9, "italic"), bg='#f0f0f0', fg='#555').grid(
@@ -158,19 +346,98 @@ class BellmanFordGUI:
                     e.insert(0, "0")
                     e.config(state='readonly', readonlybackground='#ecf0f1')  # Diagonal is read-only
                 else:
-                    e.insert(0, "")
+                    w = self.road_model().get((i, j))
+                    e.insert(0, "" if w is None else str(w))
+                    # Every keystroke updates just this cell in the edge model
+                    e.bind("<KeyRelease>", lambda event, i=i, j=j: self.on_cell_edit(i, j))
                 row_entries.append(e)
             self.city_entries.append(row_entries)
 
-        # Update the source city dropdown menu
-        self.source_var.set(self.city_names[0])
-        menu = self.source_menu["menu"]
-        menu.delete(0, "end")
-        for name in self.city_names:
-            menu.add_command(label=name, command=lambda v=name: self.source_var.set(v))
-        self.random_btn.config(state="normal")  # Enable the random button
 
-    def draw_graph(self, highlight_source=None, shortest_distances=None):
+    def build_table_view(self):
+        """Paged road table for large graphs: only one page of rows exists at a time"""
+        tk.Label(self.matrix_frame, text=f"{self.city_count} cities - roads are listed instead of a {self.city_count}x{self.city_count} grid", 
+                font=("Arial", 9, "italic"), bg='#f0f0f0', fg='#555').pack(pady=5)
+        self.road_table = ttk.Treeview(self.matrix_frame, columns=("from", "to", "weight"),
+                                       show="headings", height=10)
+        for col in ("from", "to", "weight"):
+            self.road_table.heading(col, text=col.capitalize())
+            self.road_table.column(col, width=90, anchor="center")
+        self.road_table.pack(fill=tk.BOTH, expand=True)
+
+        # Paging controls
+        nav = tk.Frame(self.matrix_frame, bg='#f0f0f0')
+        nav.pack(pady=3)
+        tk.Button(nav, text="◀", command=lambda: self.show_road_page(self.road_page - 1)).pack(side=tk.LEFT)
+        self.page_label = tk.Label(nav, text="", font=("Arial", 9), bg='#f0f0f0', width=28)
+        self.page_label.pack(side=tk.LEFT)
+        tk.Button(nav, text="▶", command=lambda: self.show_road_page(self.road_page + 1)).pack(side=tk.LEFT)
+
+        # Editor row: set (or clear) one road
+        editor = tk.Frame(self.matrix_frame, bg='#f0f0f0')
+        editor.pack(pady=3)
+        self.road_fields = []
+        for label in ("From", "To", "Weight"):
+            tk.Label(editor, text=label, font=("Arial", 9), bg='#f0f0f0').pack(side=tk.LEFT, padx=2)
+            field = tk.Entry(editor, width=8, font=("Arial", 9))
+            field.pack(side=tk.LEFT, padx=2)
+            self.road_fields.append(field)
+        tk.Button(editor, text="Set Road", command=self.set_road_from_fields,
+                 font=("Arial", 9)).pack(side=tk.LEFT, padx=5)
+        self.road_table.bind("<<TreeviewSelect>>", lambda event: self.on_road_select())
+        self.road_page = 0
+        self.refresh_road_table()
+
+    def road_model(self):
+        """The edge model, built from self.graph on first use (a Python-level copy of
+        every road, so big imports that are never edited skip it)"""
+        if self.edge_model is None:
+            self.edge_model = self.graph.to_model()
+        return self.edge_model
+
+    def road_count(self):
+        """Number of roads, without building the edge model"""
+        return len(self.edge_model) if self.edge_model is not None else self.graph.E
+
+    def refresh_road_table(self):
+        """Re-sort the road list after the edge model changed and redisplay the current page"""
+        self.road_rows = sorted(self.road_model()) if self.road_count() <= LIST_LIMIT else []
+        self.show_road_page(self.road_page)
+
+    def show_road_page(self, page):
+        """Fill the table with one page of roads"""
+        pages = max(1, (len(self.road_rows) + PAGE_SIZE - 1) // PAGE_SIZE)
+        self.road_page = min(max(page, 0), pages - 1)
+        self.road_table.delete(*self.road_table.get_children())
+        start = self.road_page * PAGE_SIZE
+        for i, j in self.road_rows[start:start + PAGE_SIZE]:
+            self.road_table.insert("", tk.END, values=(self.city_names[i], self.city_names[j], self.edge_model[(i, j)]))
+        end = min(start + PAGE_SIZE, len(self.road_rows))
+        if self.road_count() > LIST_LIMIT:  # Listing (and sorting) millions of rows would stall the window
+            self.page_label.config(text=f"{self.road_count():,} roads - too many to list")
+            return
+        self.page_label.config(text=f"Roads {start + 1 if end else 0}-{end} of {len(self.road_rows)}")
+
+    def on_road_select(self):
+        """Copy the selected road into the editor fields"""
+        selection = self.road_table.selection()
+        if selection:
+            for field, value in zip(self.road_fields, self.road_table.item(selection[0], "values")):
+                field.delete(0, tk.END); field.insert(0, value)
+
+    def set_road_from_fields(self):
+        """Apply the editor row: blank, INF or 0 weight removes the road"""
+        src, dst, weight = (field.get().strip() for field in self.road_fields)
+        if src not in self.city_index or dst not in self.city_index or src == dst:
+            messagebox.showerror("Error", "Enter two different existing cities"); return
+        try:
+            w = parse_weight(weight)
+        except ValueError:
+            messagebox.showerror("Error", "Weight must be an integer or INF"); return
+        self.apply_edge_change(self.city_index[src], self.city_index[dst], w)
+        self.refresh_road_table()
+
+    def draw_graph(self, tree=None):
         """Draw a horizontal binary-tree-like graph with n-1 separate paths.
 
         This method ONLY displays results after algorithm execution - no pre-run visualization.
@@ -189,326 +456,360 @@ class BellmanFordGUI:
         Row 2:  A ────────→ D         [Direct path to D]
         Row 3:  A ─→ B               [Path to B]
         
-        Verification: Sum of edge weights along each path is compared to reported distance.
+        fork_layout() computes the positions; the renderer only moves its existing
+        artists there and blits them, so repeated runs don't rebuild the plot.
         """
-        self.ax.clear()
-        self.txt_output.tag_config("warn", foreground="red")
-
         # Only draw graph after algorithm has been run
-        if not (highlight_source and shortest_distances):
-            self.ax.text(0.5, 0.5, 'Run algorithm to see shortest path visualization', 
-                        ha='center', va='center', fontsize=12, color='#7f8c8d', style='italic')
-            self.ax.set_xlim(0, 1); self.ax.set_ylim(0, 1); self.ax.axis('off'); self.canvas.draw(); return
-
-        # Build a dictionary of all directed edges present in the matrix: (u,v)->weight
-        all_edges = {}
-        for i in range(self.city_count):
-            for j in range(self.city_count):
-                val = self.city_entries[i][j].get().strip().upper()
-                if val and val != "INF":
-                    try:
-                        w = int(val)
-                    except ValueError:
-                        continue
-                    if not (i == j and w == 0):
-                        all_edges[(self.city_names[i], self.city_names[j])] = w
-
-        source = highlight_source
-
-        # Get n-1 destinations (excluding source) - each gets its own horizontal path/row
-        destinations = [c for c in self.city_names if c != source]
-        n_dest = len(destinations)
-        y_spacing = 1.8  # vertical spacing between path rows
-        
-        # We'll create completely separate paths for each destination
-        # Using a custom graph to draw each path independently
-        all_paths = []  # List of (destination, path_nodes, path_edges, y_position)
-        verification_messages = []
-
-        for idx, dest in enumerate(destinations):
-            # Calculate y-position for this path (centered around 0)
-            y_pos = (idx - (n_dest - 1) / 2) * y_spacing
-            
-            dest_dist = shortest_distances.get(dest, float('inf'))
-            
-            # If destination unreachable, create a simple unreachable marker
-            if dest_dist == float('inf'):
-                all_paths.append((dest, [source, dest], [], y_pos, dest_dist))
-                continue
-
-            # Reconstruct shortest path by backtracking from destination
-            path = [dest]
-            current = dest
-            safe_break = 0
-            while current != source and safe_break < (self.city_count * 2):
-                safe_break += 1
-                found = False
-                for p in self.city_names:
-                    if p == current: continue
-                    if (p, current) in all_edges:
-                        w = all_edges[(p, current)]
-                        p_dist = shortest_distances.get(p, float('inf'))
-                        cur_dist = shortest_distances[current]
-                        if p_dist != float('inf') and p_dist + w == cur_dist:
-                            path.insert(0, p)
-                            current = p
-                            found = True
-                            break
-                if not found:
-                    break
-
-            # Verify path starts from source
-            if path[0] != source:
-                # Path reconstruction failed
-                all_paths.append((dest, [source, dest], [], y_pos, dest_dist))
-                continue
-
-            # Build edges for this path
-            path_edges = [(path[i], path[i+1], all_edges.get((path[i], path[i+1]), 0)) 
-                         for i in range(len(path) - 1)]
-
-            # Verification: sum edge weights
-            sum_w = sum(w for _, _, w in path_edges)
-            if sum_w != dest_dist:
-                verification_messages.append(
-                    f"⚠ Path to {dest}: sum={sum_w} vs reported={dest_dist}")
-
-            all_paths.append((dest, path, path_edges, y_pos, dest_dist))
-
-        # Now draw all paths
-        # Create NetworkX graph for drawing (we'll add nodes/edges for each path)
-        G = nx.DiGraph()
-        pos = {}
-        node_info = {}  # Track node appearances: node_key -> (city_name, distance, is_source, is_dest, is_reachable)
-        edge_list = []
-        edge_labels_dict = {}
-
-        # Add source node ONCE (shared by all paths)
-        source_key = f"{source}_SOURCE"
-        pos[source_key] = (0.0, 0.0)  # Center vertically at y=0
-        node_info[source_key] = (source, 0, True, False, True)
-        G.add_node(source_key)
-
-        for dest, path_nodes, path_edges, y_pos, dest_dist in all_paths:
-            is_reachable = dest_dist != float('inf')
-            path_len = len(path_nodes)
-            
-            # Skip the source node (already added) and position remaining nodes
-            for i, node_name in enumerate(path_nodes):
-                if i == 0:  # This is the source node
-                    continue  # Skip, already added
-                
-                # Create unique node key for this path: "CityName_rowIndex"
-                node_key = f"{node_name}_{dest}"
-                
-                # Calculate x position (spread from 2 to 10, leaving gap after source at 0)
-                remaining_nodes = path_len - 1  # Exclude source
-                if remaining_nodes == 1:
-                    x_pos = 10.0
-                else:
-                    # Position intermediate and destination nodes
-                    x_pos = 2.0 + (8.0 * (i - 1)) / (remaining_nodes - 1)
-                
-                pos[node_key] = (x_pos, y_pos)
-                
-                # Track node information
-                is_destination = (node_name == dest)
-                node_distance = shortest_distances.get(node_name, float('inf'))
-                
-                node_info[node_key] = (node_name, node_distance, False, is_destination, is_reachable)
-                G.add_node(node_key)
-            
-            # Add edges for this path
-            for i in range(len(path_nodes) - 1):
-                # First edge is from the shared source to first intermediate/destination
-                if i == 0:
-                    src_key = source_key  # Use the shared source
-                else:
-                    src_key = f"{path_nodes[i]}_{dest}"
-                
-                dst_key = f"{path_nodes[i+1]}_{dest}"
-                weight = path_edges[i][2] if i < len(path_edges) else 0
-                
-                G.add_edge(src_key, dst_key)
-                edge_list.append((src_key, dst_key))
-                edge_labels_dict[(src_key, dst_key)] = f"[{weight}]" if is_reachable else ""
-
-        # Draw all edges (all are part of shortest paths in this design)
-        reachable_edges = [(u, v) for (u, v) in edge_list 
-                          if node_info.get(v, (None, None, None, None, False))[4]]
-        unreachable_edges = [(u, v) for (u, v) in edge_list 
-                            if not node_info.get(v, (None, None, None, None, False))[4]]
-        
-        # Draw reachable path edges (green, prominent)
-        if reachable_edges:
-            nx.draw_networkx_edges(G, pos, edgelist=reachable_edges, edge_color='#00AA00',
-                                  arrows=True, arrowsize=20, ax=self.ax, alpha=0.9, width=3,
-                                  arrowstyle='->', connectionstyle='arc3,rad=0')
-        
-        # Draw unreachable path edges (gray, dashed)
-        if unreachable_edges:
-            nx.draw_networkx_edges(G, pos, edgelist=unreachable_edges, edge_color='#CCCCCC',
-                                  arrows=True, arrowsize=15, ax=self.ax, alpha=0.4, width=1.5,
-                                  style='dashed', arrowstyle='->', connectionstyle='arc3,rad=0')
-
-        # Draw nodes with appropriate colors
-        node_colors = []
-        node_edge_colors = []
-        for node_key in G.nodes():
-            city_name, node_dist, is_source, is_dest, is_reachable = node_info[node_key]
-            
-            if is_source:
-                node_colors.append('#FF4444')  # Red for source
-                node_edge_colors.append('#CC0000')
-            elif is_dest and is_reachable:
-                node_colors.append('#44FF44')  # Green for reachable destinations
-                node_edge_colors.append('#00AA00')
-            elif is_dest and not is_reachable:
-                node_colors.append('#4488FF')  # Blue for unreachable
-                node_edge_colors.append('#0066CC')
-            elif is_reachable:
-                node_colors.append('#90EE90')  # Light green for intermediate nodes
-                node_edge_colors.append('#00AA00')
-            else:
-                node_colors.append('#CCCCCC')  # Gray for unreachable intermediates
-                node_edge_colors.append('#999999')
-
-        nx.draw_networkx_nodes(G, pos, node_color=node_colors, node_size=1000, 
-                              edgecolors=node_edge_colors, linewidths=2.5, ax=self.ax, alpha=0.95)
-
-        # Draw node labels showing city name and distance
-        labels = {}
-        for node_key in G.nodes():
-            city_name, node_dist, is_source, is_dest, is_reachable = node_info[node_key]
-            dtext = '∞' if node_dist == float('inf') else str(int(node_dist))
-            labels[node_key] = f"{city_name}\n({dtext})"
-        
-        nx.draw_networkx_labels(G, pos, labels=labels, font_size=9, font_weight='bold', 
-                               font_family='sans-serif', ax=self.ax)
-
-        # Draw edge weight labels
-        if edge_labels_dict:
-            # Only show labels for reachable paths
-            reachable_labels = {k: v for k, v in edge_labels_dict.items() if v and k in reachable_edges}
-            if reachable_labels:
-                nx.draw_networkx_edge_labels(G, pos, reachable_labels, font_size=9, 
-                                            font_color='#006400', font_weight='bold', ax=self.ax, 
-                                            bbox=dict(boxstyle='round,pad=0.4', facecolor='#E8F8E8', 
-                                            edgecolor='#00AA00', alpha=0.9, linewidth=1.5))
-
-        # Legend - positioned outside the plot area to avoid overlap
-        legend_elements = [
-            plt.Line2D([0], [0], marker='o', color='w', markerfacecolor='#FF4444', 
-                      markersize=10, label='Source City', markeredgewidth=1.5, markeredgecolor='#CC0000'),
-            plt.Line2D([0], [0], marker='o', color='w', markerfacecolor='#44FF44', 
-                      markersize=10, label='Destination (Reachable)', markeredgewidth=1.5, markeredgecolor='#00AA00'),
-            plt.Line2D([0], [0], marker='o', color='w', markerfacecolor='#90EE90', 
-                      markersize=10, label='Intermediate Node', markeredgewidth=1.5, markeredgecolor='#00AA00'),
-            plt.Line2D([0], [0], marker='o', color='w', markerfacecolor='#4488FF', 
-                      markersize=10, label='Unreachable', markeredgewidth=1.5, markeredgecolor='#0066CC'),
-            plt.Line2D([0], [0], color='#00AA00', linewidth=2.5, label='Path Edge')
-        ]
-        
-        # Position legend outside the plot area (below the graph)
-        self.ax.legend(handles=legend_elements, loc='upper center', bbox_to_anchor=(0.5, -0.02),
-                      ncol=3, frameon=True, fancybox=True, shadow=True, fontsize=9,
-                      framealpha=0.95, edgecolor='#34495e', facecolor='white')
-
-        # Add informative title with statistics
-        reachable_count = sum(1 for d in shortest_distances.values() if d != float('inf')) - 1  # Exclude source
-        total_cities = len(self.city_names) - 1  # Exclude source
-        title_text = f"Horizontal Tree: Shortest Paths from {source}\n"
-        title_text += f"{n_dest} paths shown | Reachable: {reachable_count}/{total_cities} cities"
-        self.ax.set_title(title_text, fontsize=12, fontweight='bold', pad=15, color='#2c3e50')
-
-        # If verification messages exist, print them to the results pane in red
-        if verification_messages:
-            self.txt_output.insert(tk.END, "\n", "warn")
-            for msg in verification_messages:
-                self.txt_output.insert(tk.END, msg + "\n", "warn")
-
-        # Adjust plot margins to accommodate legend at bottom
-        self.ax.margins(0.15)
-        self.ax.axis('off')
-        self.fig.tight_layout()
-        self.canvas.draw()
+        if tree is None:
+            self.renderer.show_message('Run algorithm to see shortest path visualization'); return
+
+        view = self.view_var.get()
+        if view == "tree" or (view == "auto" and len(tree.names) > FORK_LIMIT):
+            # Shared tree: each city once, big subtrees collapsed until clicked
+            with self.profile.stage("path reconstruction"):
+                layout = tree_layout(tree, self.expanded, self.collapsed)
+        elif len(tree.names) > DRAW_LIMIT:
+            self.renderer.show_message(f'{len(tree.names)} cities - too many to draw in the fork view\nChoose the tree view or see the results pane'); return
+        else:
+            with self.profile.stage("path reconstruction"):
+                layout = fork_layout(tree)
+        with self.profile.stage("render"):
+            self.renderer.show_layout(layout)
+
+    def on_graph_click(self, event):
+        """Tree view: clicking a collapsed city expands its subtree, clicking an opened one folds it again"""
+        layout = self.renderer.layout
+        if not layout or "names" not in layout or event.x is None:
+            return
+        i = self.renderer.node_at(event.x, event.y)
+        if i is None or layout["names"][i] is None or i == 0:
+            return  # Empty space, the unreachable summary or the source
+        name = layout["names"][i]
+        if i in layout["collapsed"]:
+            self.expanded.add(name); self.collapsed.discard(name)
+        else:
+            self.collapsed.add(name); self.expanded.discard(name)
+        self.draw_graph(self.graph_data)
 
     def randomize_matrix(self):
-        """Fill the matrix with random distances for quick testing"""
-        for i in range(self.city_count):
-            for j in range(self.city_count):
-                if i != j:  # Skip diagonal (read-only)
-                    self.city_entries[i][j].delete(0, tk.END)
-                    self.city_entries[i][j].insert(0, str(random.randint(1, 50)))
-        # Don't draw graph yet - only after running algorithm
+        """Fill the edge model with a generated road network (bellman_generate) for quick testing"""
+        topology = self.topology_var.get()
+        try:
+            density = self.density_var.get().strip().lower()
+            if density in ("", "auto"):  # Complete graph in the grid, a sparse network (3 roads per city) above it
+                density = 1.0 if self.city_entries or topology == "grid" else min(1.0, 3 / (self.city_count - 1))
+            seed = self.seed_var.get().strip()
+            options = dict(topology=topology, density=float(density), seed=int(seed) if seed else None,
+                           weights=self.weights_var.get(), negative=float(self.negative_var.get() or 0) / 100,
+                           cycles=self.cycles_var.get())
+        except ValueError:
+            messagebox.showerror("Error", "Density, seed and negative % must be numbers"); return
+        try:
+            graph = generate(self.city_count, names=self.city_names, **options)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e)); return
+
+        # The generated graph already is the model's Graph; the live tree is stale. The
+        # edge model is only built here for the grid (see road_model())
+        self.edge_model, self.dynamic, self.graph = None, None, graph
+        if not self.city_entries:
+            self.refresh_road_table()  # Big networks only get a road count (see LIST_LIMIT)
+        else:
+            model = self.road_model()
+            for i in range(self.city_count):
+                for j in range(self.city_count):
+                    if i != j:  # Skip diagonal (read-only)
+                        w = model.get((i, j))
+                        self.city_entries[i][j].delete(0, tk.END)
+                        self.city_entries[i][j].insert(0, "" if w is None else str(w))
+        # Don't draw graph yet - only after running algorithm; a summary instead of every road
         self.txt_output.delete("1.0", tk.END)
-        self.txt_output.insert(tk.END, "Random distances generated. Select source city and run algorithm.\n")
+        self.txt_output.insert(tk.END, f"Generated a {topology} road network:\n{describe(graph)}\n"
+                                       "Select source city and run algorithm.\n")
+
+    def parse_cell(self, i, j):
+        """Weight typed in one matrix cell, or None for no road (blank, INF, 0 or not a number)"""
+        val = self.city_entries[i][j].get().strip().upper()
+        if val in ["", "INF", "0"]:
+            return None
+        try: return int(val)
+        except ValueError: return None
+
+    def current_graph(self):
+        """Graph of the current edge model, built once per change and shared by every stage"""
+        if self.graph is None:  # edge_model is always built when graph is None
+            self.graph = Graph.from_model(self.city_names, self.edge_model)
+        return self.graph
+
+    def on_cell_edit(self, i, j):
+        """Keep the edge model in sync with one edited cell"""
+        self.apply_edge_change(i, j, self.parse_cell(i, j))
+
+    def apply_edge_change(self, i, j, w):
+        """Update one road in the edge model (None removes it) and repair the live result"""
+        model = self.road_model()  # The first edit of an imported graph builds it
+        if model.get((i, j)) == w:
+            return  # Nothing changed (e.g. cursor keys)
+        if w is None: model.pop((i, j), None)
+        else: model[(i, j)] = w
+        self.graph = None
+
+        if not (self.live_var.get() and self.dynamic and self.dynamic.source == self.source_var.get()):
+            return
+        try:
+            tree = self.dynamic.set_edge(i, j, w)
+        except ValueError as e:
+            self.txt_output.delete("1.0", tk.END); self.txt_output.insert(tk.END, str(e) + "\n")
+            return
+        # Update the text right away, but only redraw the graph once typing pauses
+        self.txt_output.delete("1.0", tk.END); self.txt_output.insert(tk.END, tree.format())
+        self.txt_output.insert(tk.END, f"\nLive update: {self.dynamic.touched} of {len(tree.names)} cities re-evaluated\n")
+        if self.redraw_job: self.root.after_cancel(self.redraw_job)
+        self.redraw_job = self.root.after(300, lambda: self.redraw_live(tree))
+
+    def redraw_live(self, tree):
+        """Draw the tree produced by the last live update"""
+        self.redraw_job = None
+        self.graph_data = tree; self.draw_graph(tree)
 
     def run_algorithm(self):
-        """Main function to run the Bellman-Ford algorithm using C backend"""
+        """Start the shortest path solve (C backend or NumPy engine) in a background thread"""
         if not self.city_names:
             messagebox.showerror("Error", "Create city matrix first"); return
 
-        # Build list of edges from the matrix
-        edges = []
-        for i in range(self.city_count):
-            for j in range(self.city_count):
-                val = self.city_entries[i][j].get().strip().upper()
-                if val and val not in ["", "INF", "0"]:
-                    try: edges.append(f"{self.city_names[i]} {self.city_names[j]} {int(val)}")
-                    except ValueError: continue
-
-        if not edges:
+        profile = RunProfile() if self.profile_var.get() else NO_PROFILE
+        with profile.stage("matrix read"):
+            graph = self.current_graph()
+        if not graph.E:
             messagebox.showerror("Error", "No valid distances"); return
 
-        # Prepare input data in the format C program expects
-        src_city = self.source_var.get()
-        V, E = self.city_count, len(edges)
-        data = f"{V} {E}\n" + "\n".join(self.city_names) + "\n" + "\n".join(edges) + "\n" + src_city + "\n"
+        # Read every Tk variable here: the worker thread must not touch widgets
+        job = dict(graph=graph, source=self.source_var.get(),
+                   engine=self.engine_var.get(), backend=self.backend_var.get(),
+                   all_pairs=self.all_pairs_var.get(), disk_cache=self.disk_cache_var.get(), profile=profile)
+        if profile.enabled:
+            mode = "all pairs" if job["all_pairs"] else f"{job['backend']} / {job['engine']}"
+            profile.label = f"{job['source']} - {mode} - {graph.V} cities, {graph.E} roads"
+
+        # A new run supersedes one still in progress: stop it and ignore whatever it returns
+        previous = self.worker
+        self.routes.stop_preload()  # Its trees are kept only if the graph stays the same
+        self.task_id += 1  # Before cancelling, see solve_in_background()
+        if previous and previous.is_alive():
+            self.routes.cancel(); self.all_pairs.cancel()
+        self.worker = threading.Thread(target=self.solve_in_background, args=(self.task_id, previous, job),
+                                       daemon=True)
+        self.worker.start()
+
+        self.cancel_btn.config(state="normal")
+        self.progress_bar.config(value=0, maximum=max(1, graph.V - 1))
+        self.progress_label.config(text=f"Solving from {job['source']}...")
+        if self.poll_job is None:
+            self.poll_job = self.root.after(50, self.poll_results)
+
+    def solve_in_background(self, task, previous, job):
+        """Worker thread: solve, then post the result to self.results (never touches Tk)"""
+        if previous:
+            previous.join()  # The solvers are not shared between threads; wait for the cancelled run
+        # The cancel that stopped the previous run stays in force until here; one that
+        # comes later bumps task_id first, so it is caught below or by the solver itself
+        self.routes.reset_cancel(); self.all_pairs.reset_cancel()
+        if task != self.task_id:
+            return  # Superseded while waiting
+
+        def report(done, total, text):
+            self.results.put((task, "progress", done, total, text))
 
         try:
-            # Run the C program using subprocess - THIS IS WHERE ALGORITHM RUNS
-            result = subprocess.run(["./bellman_backend.exe"], input=data, text=True, capture_output=True)
-            self.txt_output.delete("1.0", tk.END); self.txt_output.insert(tk.END, result.stdout)  # Display C output
-            self.parse_and_visualize_results(result.stdout, src_city)  # Parse and visualize
-        except FileNotFoundError:
-            messagebox.showerror("Error", "Compile C program: gcc bellman_backend.c -o bellman_backend.exe")
-
-    def parse_and_visualize_results(self, output, source_city):
-        """Parse the C program output and update graph with results"""
-        shortest_distances = {}
-        lines = [ln for ln in output.strip().split('\n') if ln.strip()]
-        parsing = False
-        for line in lines:
-            if 'Source City:' in line:
-                # next lines include table heading; start parsing after the next '----' line
-                parsing = False
-                continue
-            if '------------------------------------' in line:
-                parsing = not parsing
-                continue
-            if parsing and line.strip():
-                parts = line.split()
-                if len(parts) >= 2 and parts[0] in self.city_names:
-                    city, dist_str = parts[0], parts[1]
-                    shortest_distances[city] = float('inf') if dist_str == 'INF' else int(dist_str) if dist_str.lstrip('-').isdigit() else None
-
-        # As a fallback if parsing failed to capture the distances (some C outputs vary), try a simple extraction
-        if not shortest_distances:
-            for n in self.city_names:
-                # try to find a line like: "A              0"
-                for line in lines:
-                    if line.strip().startswith(n + ' '):
-                        parts = line.split()
-                        if len(parts) >= 2 and parts[0] == n:
-                            d = parts[1]
-                            shortest_distances[n] = float('inf') if d == 'INF' else int(d) if d.lstrip('-').isdigit() else None
-
-        # ensure source included
-        if source_city not in shortest_distances:
-            shortest_distances[source_city] = 0
-
-        self.graph_data = True; self.draw_graph(highlight_source=source_city, shortest_distances=shortest_distances)
+            if job["all_pairs"]:
+                # Solve all sources at once (skipped if this matrix was already solved)
+                with job["profile"].stage("solve"):
+                    self.all_pairs.compute(job["graph"], lambda k, V: report(
+                        k, V, f"Intermediate city {k} of {V}"))
+                with job["profile"].stage("parse"):
+                    tree = self.all_pairs.tree(job["source"])
+            else:
+                # Send the graph to the solver (only if it changed) and query it - THIS IS WHERE ALGORITHM RUNS
+                self.routes.set_backend(job["backend"])  # Reopens the solver only if the choice changed
+                self.routes.profile = job["profile"]
+                self.routes.cache = self.disk_cache if job["disk_cache"] else None
+                self.routes.set_graph_model(job["graph"])
+                V = job["graph"].V
+                if pick_engine(job["engine"], job["graph"].has_negative) == "dijkstra":  # Counts settled cities, not passes
+                    progress = lambda settled, relaxations: report(
+                        settled, V, f"Settled {settled:,} of {V:,} cities · {relaxations:,} relaxations")
+                else:
+                    progress = lambda passes, relaxations: report(
+                        passes, V - 1, f"Pass {passes} of at most {V - 1} · {relaxations:,} relaxations")
+                tree = self.routes.tree(job["source"], job["engine"], progress)
+        except Exception as e:  # Handed to the Tk thread, which decides how to show it
+            self.results.put((task, "error", e, job))
+            return
+        self.results.put((task, "done", tree, job))
+
+    def preload_in_background(self, task, engine):
+        """Preload thread: fill the RouteFinder cache for every source (never touches Tk)"""
+        try:
+            self.routes.preload(engine=engine, on_tree=lambda done, total: self.results.put(
+                (task, "preload", done, total)), started=True)
+        except Exception as e:  # Preloading is only a speed-up; just say it stopped
+            self.results.put((task, "preload", 0, 0, f"Preload stopped: {e}"))
+
+    def poll_results(self):
+        """Runs on the Tk thread every 50 ms while a solve is active; applies worker messages"""
+        self.poll_job = None
+        while True:
+            try:
+                message = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] != self.task_id:
+                continue  # From a superseded or cancelled run
+            if message[1] == "progress":
+                done, total, text = message[2:]
+                self.progress_bar.config(value=done, maximum=max(1, total))
+                self.progress_label.config(text=text)
+            elif message[1] == "preload":
+                done, total = message[2:4]
+                self.progress_bar.config(value=done, maximum=max(1, total))
+                self.progress_label.config(text=message[4] if len(message) > 4 else
+                                           f"Preloaded {done} of {total} sources")
+            elif message[1] == "done":
+                self.finish_run(*message[2:])
+            else:
+                self.fail_run(*message[2:])
+        busy = any(thread and thread.is_alive() for thread in (self.worker, self.preloader))
+        if busy or not self.results.empty():
+            self.poll_job = self.root.after(50, self.poll_results)
+
+    def finish_run(self, tree, job):
+        """Show a finished result (Tk thread)"""
+        self.cancel_btn.config(state="disabled")
+        self.progress_bar.config(value=self.progress_bar["maximum"])
+        self.progress_label.config(text="Done")
+        # Keep a live copy of this result so single-cell edits can repair it
+        self.dynamic = DynamicShortestPaths(job["graph"], tree) if self.live_var.get() else None
+        self.profile = job["profile"]  # draw_graph() adds its stages to this run's profile
+        self.show_tree(tree)
+        self.profile = NO_PROFILE
+        self.show_profile(job["profile"])
+        if self.preload_var.get() and not job["all_pairs"]:
+            self.start_preload(job)
+
+    def start_preload(self, job):
+        """Solve the remaining sources in the background so switching source is instant"""
+        if self.preloader and self.preloader.is_alive():
+            self.routes.stop_preload()
+            self.preloader.join()  # Stops after its current source
+        if job["graph"].V > PRELOAD_LIMIT:
+            self.progress_label.config(text=f"Done (preloading is limited to {PRELOAD_LIMIT:,} cities)")
+            return
+        self.routes.preloading = True  # Set here, not in the thread, so an early stop_preload() wins
+        self.preloader = threading.Thread(target=self.preload_in_background,
+                                          args=(self.task_id, job["engine"]), daemon=True)
+        self.preloader.start()
+        if self.poll_job is None:
+            self.poll_job = self.root.after(50, self.poll_results)
+
+    def fail_run(self, error, job):
+        """Report an error from the worker (Tk thread)"""
+        self.cancel_btn.config(state="disabled")
+        self.progress_label.config(text="")
+        if isinstance(error, FileNotFoundError):
+            messagebox.showerror("Error", "Compile C program: gcc bellman_backend.c -o bellman_backend.exe"); return
+        self.show_profile(job["profile"])  # Whatever stages finished before the error
+        if isinstance(error, Cancelled):
+            self.progress_label.config(text="Cancelled"); return
+        if isinstance(error, MemoryError):
+            error = RuntimeError("Error: Not enough memory for this graph.")
+        if not isinstance(error, (ValueError, RuntimeError)):
+            raise error
+        # Negative cycles and invalid input are reported in the results pane like before
+        self.txt_output.delete("1.0", tk.END); self.txt_output.insert(tk.END, str(error) + "\n")
+        self.draw_graph()
+
+    def cancel_run(self):
+        """Stop the running solve; the previous results stay on screen"""
+        self.task_id += 1  # Anything the stopped run still posts is ignored
+        if self.worker and self.worker.is_alive():
+            self.routes.cancel(); self.all_pairs.cancel()
+        self.routes.stop_preload()
+        self.cancel_btn.config(state="disabled")
+        self.progress_bar.config(value=0)
+        self.progress_label.config(text="Cancelled")
+
+    def show_tree(self, tree):
+        """Display results table and visualize one shortest path tree"""
+        if not (self.graph_data and self.graph_data.source == tree.source):
+            self.expanded, self.collapsed = set(), set()  # New source: start from the default folding
+        with self.profile.stage("results text"):
+            self.txt_output.delete("1.0", tk.END); self.txt_output.insert(tk.END, tree.format())
+            self.txt_output.insert(tk.END, f"\nSolved by: {tree.backend} ({tree.engine})\n")
+            if self.engine_var.get() == "auto" and tree.engine in ("dijkstra", "early-exit"):
+                why = ("no road is negative, so Dijkstra settles each city once" if tree.engine == "dijkstra"
+                       else "some roads are negative, so Bellman-Ford is needed")
+                self.txt_output.insert(tk.END, f"Picked automatically: {why}\n")
+        self.graph_data = tree; self.draw_graph(tree)
+
+    def show_profile(self, profile):
+        """Put a finished run's timings in the profile panel (opens it)"""
+        if not profile.enabled:
+            return
+        self.last_profile = profile
+        self.profile_text.delete("1.0", tk.END); self.profile_text.insert(tk.END, profile.format())
+        if not self.profile_text.winfo_manager():
+            self.toggle_profile_panel()
+
+    def toggle_profile_panel(self):
+        """Show or hide the profile panel under the graph"""
+        if self.profile_text.winfo_manager():
+            self.profile_text.pack_forget(); self.profile_toggle.config(text="▸ ⏱ Profile")
+        else:
+            self.profile_text.pack(fill=tk.X); self.profile_toggle.config(text="▾ ⏱ Profile")
+
+    def export_profile(self, kind):
+        """Save the last profiled run as JSON or as a trace (chrome://tracing, ui.perfetto.dev)"""
+        if self.last_profile is None:
+            messagebox.showinfo("Profile", "Tick \"Profile runs\" and run the algorithm first"); return
+        path = filedialog.asksaveasfilename(title="Export profile", defaultextension=".json",
+                                            filetypes=[("JSON", "*.json"), ("All files", "*.*")])
+        if not path:
+            return
+        if kind == "trace":
+            self.last_profile.save_trace(path)
+        else:
+            self.last_profile.save_json(path)
+
+    def on_source_change(self):
+        """Redraw straight from the all-pairs or preload cache when the source dropdown changes"""
+        if not self.city_names or self.worker and self.worker.is_alive():
+            return  # A run is rebuilding the results; it shows the selected source when done
+        graph = self.current_graph()
+        if not self.all_pairs_var.get():
+            # Single-source mode: instant only if this source was preloaded for the same graph
+            if self.routes.graph.digest() == graph.digest():
+                tree = self.routes.cached(self.source_var.get(), self.engine_var.get())
+                if tree is not None:
+                    live = self.live_var.get()
+                    self.dynamic = DynamicShortestPaths(graph, tree) if live else None
+                    self.show_tree(tree)
+            return  # Otherwise wait for the Run button as before
+        if not self.all_pairs.matches(graph):
+            return  # Matrix changed since the last run; needs a new Run
+        try:
+            self.show_tree(self.all_pairs.tree(self.source_var.get()))
+        except ValueError as e:
+            self.txt_output.delete("1.0", tk.END); self.txt_output.insert(tk.END, str(e) + "\n")
+            self.draw_graph()
+
+    def on_close(self):
+        """Stop any running solve and the C worker before closing the window"""
+        self.routes.cancel(); self.all_pairs.cancel(); self.routes.stop_preload()
+        for thread in (self.worker, self.preloader):
+            if thread:
+                thread.join(timeout=1)
+        self.routes.close()
+        self.root.destroy()
 
 # Main program starts here
 if __name__ == "__main__":
@@ -0,0 +1,432 @@
+"""Streaming import of road network files, and memory-mapped graph snapshots.
+
+    graph = import_graph("USA-road-d.NY.gr")   # bellman_graph.Graph
+
+Text files are read CHUNK_LINES lines at a time, and each chunk is packed into
+int32 arrays before the next one is read, so the whole text is never in
+memory. Supported formats:
+
+- .gr: DIMACS shortest path format: "p sp CITIES ROADS", then one
+  "a FROM TO WEIGHT" per road with cities numbered from 1 ("c" = comment)
+- .csv with a "from,to,weight" header: one road per row
+- .csv matrix like the GUI: header row of city names, then one row per city
+  ("name, d1, d2, ..."; blank, INF or 0 = no road)
+- .json: {"cities": ["A", ...], "roads": [["A", "B", 10], ...]} (read whole)
+- .bfg: a snapshot written by save_snapshot()
+- anything else: edge list text, one "from to weight" per line (# starts a comment)
+
+Malformed lines are not skipped: reading goes on to find all of them, then
+GraphFileError lists them with their line numbers.
+
+After an import the graph is saved as a snapshot in the user cache folder.
+Importing the same unchanged file again maps the snapshot instead of parsing
+the text: the road arrays are views of the mapped file, so opening costs about
+as much as reading the city names, and processes that open the same snapshot
+share its pages through the OS file cache.
+
+    python bellman_import.py roads.gr --snapshot roads.bfg   # Convert once, open roads.bfg anywhere
+"""
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+
+import numpy as np
+
+from bellman_cache import default_cache_dir
+from bellman_graph import INT32_MAX, INT32_MIN, Graph
+
+CHUNK_LINES = 65536  # Lines parsed per chunk
+MAX_REPORTED = 20  # Malformed lines listed in a GraphFileError (all of them are counted)
+
+# Snapshot file: header, then offsets int32[V + 1], targets int32[E], weights int32[E]
+# (little-endian), then the city names joined by "\0" in UTF-8. The header holds
+# magic, V, E, size of the names, the graph digest (sha1) and the size and
+# modification time (ns) of the file the snapshot was made from.
+SNAPSHOT_MAGIC = b"BFG1"  # Change it when the layout changes
+SNAPSHOT_HEADER = struct.Struct("<4s4xqqq20s4xqq")  # 72 bytes, so the arrays start 8-byte aligned
+
+
+class GraphFileError(ValueError):
+    """A graph file with malformed lines; problems holds (line number, message) pairs.
+    JSON files have no useful line numbers, so there the "number" is a place like "roads[3]"."""
+
+    def __init__(self, path, problems, count):
+        self.path, self.problems, self.count = path, problems, count
+        lines = [f"{number if isinstance(number, str) else f'line {number}'}: {message}"
+                 for number, message in problems]
+        if count > len(problems):
+            lines.append(f"... and {count - len(problems)} more")
+        super().__init__(f"{path}: {count} malformed line{'s' if count != 1 else ''}\n" + "\n".join(lines))
+
+
+class _Problems:
+    """Malformed lines found so far"""
+
+    def __init__(self):
+        self.listed, self.count = [], 0
+
+    def add(self, number, message, line=None):
+        self.count += 1
+        if len(self.listed) < MAX_REPORTED:
+            self.listed.append((number, message if line is None else f"{message}: {line.strip()[:60]!r}"))
+
+    def check(self, path):
+        """Raise GraphFileError if anything was found"""
+        if self.count:
+            raise GraphFileError(path, self.listed, self.count)
+
+
+class _Roads:
+    """Growing int32 columns of the roads read so far"""
+
+    def __init__(self):
+        self.src, self.dest, self.weight = array('i'), array('i'), array('i')
+
+    def add(self, src, dest, weight):
+        for column, values in zip((self.src, self.dest, self.weight), (src, dest, weight)):
+            column.frombytes(np.asarray(values, dtype=np.int32).tobytes())
+
+    def graph(self, names):
+        return Graph.from_arrays(names, self.src, self.dest, self.weight)
+
+
+def _city(index, names, name):
+    """Index of a city name, adding it if it is new"""
+    if name not in index:
+        index[name] = len(names)
+        names.append(name)
+    return index[name]
+
+
+def _weight(text):
+    """Road weight; ValueError unless it is an integer that fits in 32 bits"""
+    if isinstance(text, (float, bool)):  # int() would quietly turn 2.9 into 2
+        raise ValueError("weight must be an integer")
+    w = int(text)
+    if not INT32_MIN <= w <= INT32_MAX:
+        raise ValueError("weight out of range")
+    return w
+
+
+def parse_weight(text):
+    """Road weight from a matrix cell, or None for no road (blank, INF, 0)"""
+    text = text.strip().upper()
+    if text in ["", "INF", "0"]:
+        return None
+    return _weight(text)
+
+
+def _chunks(rows):
+    """Lists of up to CHUNK_LINES items"""
+    while True:
+        chunk = list(itertools.islice(rows, CHUNK_LINES))
+        if not chunk:
+            return
+        yield chunk
+
+
+def read_dimacs(lines, path="<dimacs>"):
+    """Graph from DIMACS .gr lines; cities are named "1".."V" like in the file"""
+    problems, roads = _Problems(), _Roads()
+    V = expected = None
+    number = 0  # Line number of the last line read
+    for chunk in _chunks(lines):
+        first, number = number + 1, number + len(chunk)
+        if V is not None and _dimacs_chunk(chunk, V, roads):
+            continue
+        src, dest, weight = [], [], []
+        for number_here, line in enumerate(chunk, first):
+            parts = line.split()
+            if not parts or parts[0].startswith("c"):
+                continue
+            if parts[0] == "p":
+                if V is not None:
+                    problems.add(number_here, "second 'p' line", line)
+                elif len(parts) != 4 or parts[1] != "sp" or not (parts[2].isdigit() and parts[3].isdigit()):
+                    problems.add(number_here, "expected 'p sp CITIES ROADS'", line)
+                else:
+                    V, expected = int(parts[2]), int(parts[3])
+                continue
+            if parts[0] != "a" or len(parts) != 4:
+                problems.add(number_here, "expected 'a FROM TO WEIGHT'", line)
+                continue
+            if V is None:
+                problems.add(number_here, "road before the 'p sp' line", line)
+                continue
+            try:
+                u, v, w = int(parts[1]), int(parts[2]), _weight(parts[3])
+            except ValueError:
+                problems.add(number_here, "FROM and TO must be city numbers and WEIGHT a 32-bit integer", line)
+                continue
+            if not (1 <= u <= V and 1 <= v <= V):
+                problems.add(number_here, f"city number outside 1..{V}", line)
+                continue
+            src.append(u - 1); dest.append(v - 1); weight.append(w)
+        roads.add(src, dest, weight)
+    if V is None:
+        problems.add(number or 1, "no 'p sp CITIES ROADS' line")
+    elif not problems.count and len(roads.src) != expected:
+        problems.add(number, f"the 'p' line announces {expected} roads but the file has {len(roads.src)}")
+    problems.check(path)
+    return roads.graph([str(i) for i in range(1, V + 1)])
+
+
+def _dimacs_chunk(chunk, V, roads):
+    """Fast path: convert a chunk of only "a" and "c" lines with NumPy in one go. Returns
+    False (adding nothing) if any line needs the line-by-line path."""
+    arcs = [line for line in chunk if not line.startswith("c")]
+    tokens = " ".join(arcs).split()
+    # Every line starts with "a" and every 4th token is the only "a": so each line has 4 fields
+    if (len(tokens) != 4 * len(arcs) or tokens[0::4].count("a") != len(arcs)
+            or sum(1 for line in arcs if line.startswith("a")) != len(arcs)):
+        return False
+    del tokens[0::4]
+    try:
+        numbers = np.fromstring(" ".join(tokens), dtype=np.int64, sep=" ")
+    except ValueError:  # Something that isn't an integer
+        return False
+    if len(numbers) != len(tokens):  # Older NumPy stops at bad data with a warning instead
+        return False
+    u, v, w = numbers.reshape(-1, 3).T
+    if len(u) and (min(u.min(), v.min()) < 1 or max(u.max(), v.max()) > V
+                   or w.min() < INT32_MIN or w.max() > INT32_MAX):  # Too big a number reads as INT64_MAX
+        return False
+    roads.add(u - 1, v - 1, w)
+    return True
+
+
+def read_edge_list(rows, path="<edges>"):
+    """Graph from (line number, [from, to, weight]) rows; cities are named as in the file.
+    Empty rows are skipped."""
+    problems, roads = _Problems(), _Roads()
+    names, index = [], {}
+    for chunk in _chunks(rows):
+        src, dest, weight = [], [], []
+        for number, parts in chunk:
+            if not parts:
+                continue
+            if len(parts) != 3:
+                problems.add(number, "expected FROM TO WEIGHT", " ".join(parts))
+                continue
+            try:
+                w = _weight(parts[2])
+            except ValueError:
+                problems.add(number, "WEIGHT must be a 32-bit integer", " ".join(parts))
+                continue
+            src.append(_city(index, names, parts[0])); dest.append(_city(index, names, parts[1])); weight.append(w)
+        roads.add(src, dest, weight)
+    problems.check(path)
+    return roads.graph(names)
+
+
+def read_matrix(header, rows, path="<matrix>"):
+    """Graph from a distance matrix: header cells after the corner are city names, then
+    (line number, [name, d1, d2, ...]) rows"""
+    problems, roads = _Problems(), _Roads()
+    names, index = [], {}
+    for name in header[1:]:
+        _city(index, names, name)
+    for chunk in _chunks(rows):
+        src, dest, weight = [], [], []
+        for number, row in chunk:
+            if not row:
+                continue
+            if len(row) != len(header):
+                problems.add(number, f"{len(row) - 1} distances for {len(header) - 1} cities", ",".join(row))
+                continue
+            if row[0] not in index:
+                problems.add(number, f"city {row[0]!r} is not in the header", ",".join(row))
+                continue
+            i = index[row[0]]
+            for j, cell in enumerate(row[1:]):
+                try:
+                    w = parse_weight(cell)
+                except ValueError:
+                    problems.add(number, f"column {j + 2}: not a 32-bit integer, blank or INF", ",".join(row))
+                    break
+                if w is not None and i != j:
+                    src.append(i); dest.append(j); weight.append(w)
+        roads.add(src, dest, weight)
+    problems.check(path)
+    return roads.graph(names)
+
+
+def read_json(path):
+    """Graph from {"cities": [...], "roads": [[from, to, weight], ...]} (the whole file is read)"""
+    with open(path) as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not isinstance(data.get("roads"), list):
+        raise GraphFileError(path, [("roads", 'expected a "roads" list of [FROM, TO, WEIGHT]')], 1)
+    problems = _Problems()
+    names, index = [], {}
+    for name in data.get("cities", []):
+        _city(index, names, str(name))
+    edges = []
+    for number, road in enumerate(data["roads"]):
+        if not isinstance(road, list) or len(road) != 3:
+            problems.add(f"roads[{number}]", "expected [FROM, TO, WEIGHT]", json.dumps(road))
+            continue
+        try:
+            w = _weight(road[2])
+        except ValueError:
+            problems.add(f"roads[{number}]", "WEIGHT must be a 32-bit integer", json.dumps(road))
+            continue
+        edges.append((_city(index, names, str(road[0])), _city(index, names, str(road[1])), w))
+    problems.check(path)
+    return Graph.from_edges(names, edges)
+
+
+def read_graph(path):
+    """Parse a graph file in any supported format (no snapshot is made or used)"""
+    if path.endswith(".bfg"):
+        return open_snapshot(path)
+    if path.endswith(".json"):
+        return read_json(path)
+    if path.endswith(".gr"):
+        with open(path) as f:
+            return read_dimacs(f, path)
+    if path.endswith(".csv"):
+        with open(path, newline="") as f:
+            reader = csv.reader(f)
+            rows = ((reader.line_num, [cell.strip() for cell in row]) for row in reader)
+            header = next((row for _, row in rows if row), [])
+            if [h.lower() for h in header[:3]] == ["from", "to", "weight"]:
+                return read_edge_list(rows, path)
+            return read_matrix(header, rows, path)  # First header cell is the corner (may be empty)
+    with open(path) as f:
+        return read_edge_list(((number, line.split("#")[0].split()) for number, line in enumerate(f, 1)), path)
+
+
+def _little_endian(column):
+    """Bytes of an int32 buffer in little-endian order"""
+    return np.frombuffer(column, dtype=np.int32).astype("<i4").tobytes()
+
+
+def _int32_view(buffer):
+    """int32 view of little-endian bytes (a copy on big-endian machines)"""
+    if sys.byteorder == "little":
+        return buffer.cast("i")
+    values = array('i')
+    values.frombytes(buffer)
+    values.byteswap()
+    return values
+
+
+def save_snapshot(graph, path, source_stamp=(0, 0)):
+    """Write a graph to a snapshot file; the file is replaced atomically"""
+    names = "\0".join(graph.names).encode()
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, graph.V, graph.E, len(names),
+                                  bytes.fromhex(graph.digest()), *source_stamp)
+    fd, temp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            for column in (graph.offsets, graph.targets, graph.weights):
+                f.write(_little_endian(column))
+            f.write(names)
+        os.replace(temp, path)  # Fails on Windows while another process maps the old file
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+
+
+def open_snapshot(path, source_stamp=None):
+    """Graph whose road arrays are read-only views of the mapped snapshot file.
+
+    With source_stamp (size, mtime_ns), returns None if the snapshot was made
+    from another version of the file. Raises ValueError if it isn't a snapshot.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < SNAPSHOT_HEADER.size:
+            raise ValueError(f"{path}: not a graph snapshot")
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)  # Stays valid after the file is closed
+    magic, V, E, names_size, digest, *stamp = SNAPSHOT_HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC or size != SNAPSHOT_HEADER.size + 4 * (V + 1 + 2 * E) + names_size:
+        raise ValueError(f"{path}: not a graph snapshot (or a damaged one)")
+    if source_stamp is not None and tuple(stamp) != tuple(source_stamp):
+        return None
+    view = memoryview(data)
+    offset = SNAPSHOT_HEADER.size
+    columns = []
+    for count in (V + 1, E, E):
+        columns.append(_int32_view(view[offset:offset + 4 * count]))
+        offset += 4 * count
+    names = str(view[offset:], "utf-8").split("\0") if V else []
+    if len(names) != V:
+        raise ValueError(f"{path}: damaged graph snapshot")
+    return Graph(names, *columns, digest=digest.hex())
+
+
+def default_snapshot_dir():
+    """Snapshots live next to the results cache"""
+    return os.path.join(default_cache_dir(), "snapshots")
+
+
+def snapshot_path(path, directory=None):
+    """Snapshot file used for a graph file (one per file path; a newer import replaces it)"""
+    key = hashlib.sha1(os.path.realpath(path).encode()).hexdigest()
+    return os.path.join(directory or default_snapshot_dir(), key + ".bfg")
+
+
+def import_graph(path, snapshot_dir=None):
+    """Graph of a file in any supported format, through its snapshot when there is one.
+
+    The first import parses the file and saves a snapshot in snapshot_dir
+    (default: default_snapshot_dir()); later imports of the unchanged file map
+    that snapshot. snapshot_dir=False turns snapshots off.
+    """
+    if path.endswith(".bfg") or snapshot_dir is False:
+        return read_graph(path)
+    info = os.stat(path)
+    stamp = (info.st_size, info.st_mtime_ns)
+    snapshot = snapshot_path(path, snapshot_dir)
+    try:
+        graph = open_snapshot(snapshot, stamp)
+        if graph is not None:
+            return graph
+    except (OSError, ValueError):
+        pass  # No snapshot yet, or a damaged one: parse the file
+    graph = read_graph(path)
+    try:
+        os.makedirs(os.path.dirname(snapshot), exist_ok=True)
+        save_snapshot(graph, snapshot, stamp)
+    except OSError:
+        pass  # A full or read-only disk just means parsing again next time
+    return graph
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a graph file and report its size")
+    parser.add_argument("graph", help="graph file (.gr, .csv, .json, .bfg or 'from to weight' text)")
+    parser.add_argument("--snapshot", help="also write a snapshot to this .bfg file")
+    parser.add_argument("--no-cache", action="store_true", help="parse the file even if a cached snapshot exists")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        graph = import_graph(args.graph, False if args.no_cache else None)
+    except (OSError, ValueError) as e:
+        sys.exit(str(e))
+    seconds = time.perf_counter() - start
+    print(f"{graph.V:,} cities, {graph.E:,} roads, {graph.nbytes() / 2**20:.1f} MB of road arrays, "
+          f"{seconds:.2f} s")
+    if args.snapshot:
+        save_snapshot(graph, args.snapshot)
+        print(f"Snapshot written to {args.snapshot}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Opt-in timing of the stages of one run, plus solver work counters.
+
+    profile = RunProfile()
+    with profile.stage("solve"):
+        ...
+    profile.counters.update(solver.stats())
+    profile.save_trace("run.trace.json")   # open in chrome://tracing or ui.perfetto.dev
+
+Code that may or may not be profiled uses NO_PROFILE by default; its stage()
+does nothing, so the unprofiled path costs one method call per stage.
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class RunProfile:
+    """Stage timings (wall clock, per thread) and counters for one run"""
+
+    enabled = True
+
+    def __init__(self, label=""):
+        self.label = label
+        self.start = time.perf_counter()
+        self.stages = []  # (name, start offset s, duration s, thread name)
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Time the body of a with-block as one stage"""
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.stages.append((name, begin - self.start, end - begin, threading.current_thread().name))
+
+    def totals(self):
+        """Stage name -> total seconds, in first-seen order"""
+        totals = {}
+        for name, _, seconds, _ in self.stages:
+            totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+    def format(self):
+        """Text table for the GUI panel"""
+        totals = self.totals()
+        whole = sum(totals.values()) or 1.0
+        lines = [self.label] if self.label else []
+        lines += [f"{'Stage':<22}{'ms':>10}{'share':>8}", "-" * 40]
+        for name, seconds in totals.items():
+            lines.append(f"{name:<22}{seconds * 1000:>10.2f}{seconds / whole:>8.0%}")
+        if self.counters:
+            lines += ["", "Counters"]
+            lines += [f"  {name:<20}{value:>12,}" for name, value in self.counters.items()]
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        """Plain JSON-friendly summary"""
+        return {"label": self.label,
+                "stages": [{"name": name, "start_ms": start * 1000, "ms": seconds * 1000, "thread": thread}
+                           for name, start, seconds, thread in self.stages],
+                "totals_ms": {name: seconds * 1000 for name, seconds in self.totals().items()},
+                "counters": self.counters}
+
+    def trace_events(self):
+        """Chrome trace-event format: one complete ("X") event per stage, one track per thread"""
+        threads = {}
+        events = []
+        for name, start, seconds, thread in self.stages:
+            tid = threads.setdefault(thread, len(threads) + 1)
+            events.append({"name": name, "ph": "X", "pid": 1, "tid": tid,
+                           "ts": start * 1e6, "dur": seconds * 1e6})
+        events += [{"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": thread}}
+                   for thread, tid in threads.items()]
+        if self.counters:
+            events.append({"name": "counters", "ph": "C", "pid": 1, "tid": 1, "ts": 0, "args": self.counters})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_json(self, path):
+        """Write to_dict() to a file"""
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    def save_trace(self, path):
+        """Write trace_events() to a file"""
+        with open(path, "w") as f:
+            json.dump(self.trace_events(), f)
+
+
+class _NoProfile:
+    """Stand-in when profiling is off: stages are not timed and counters are not kept"""
+
+    enabled = False
+
+    def stage(self, name):
+        return nullcontext()
+
+
+NO_PROFILE = _NoProfile()
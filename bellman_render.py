@@ -0,0 +1,336 @@
+"""Fast redrawing of shortest path trees on a matplotlib axes.
+
+TreeRenderer creates its artists once (a LineCollection per edge style, one
+scatter for all nodes, one collection of arrowheads, pooled Text objects and
+the legend) and afterwards only changes their data. Redraws are blitted: the
+static figure background is saved after each full draw and restored before
+the tree artists are painted on top, so nothing is rebuilt between runs.
+
+fork_layout() and tree_layout() turn a ShortestPathTree into the plain lists
+the renderer draws, without touching matplotlib, so they can be computed
+anywhere. fork_layout() gives every destination its own row (readable for a
+handful of cities); tree_layout() draws the shared tree with each city once
+and collapses deep or large subtrees so it stays usable with thousands.
+Neither needs the road list: the road p -> v used by a shortest path weighs
+exactly dist[v] - dist[p], so edge labels come straight from the tree.
+"""
+import numpy as np
+from matplotlib.collections import LineCollection, PathCollection
+from matplotlib.lines import Line2D
+from matplotlib.path import Path
+from matplotlib.transforms import Affine2D, IdentityTransform
+
+INF = float('inf')
+
+# Node colors (face, border)
+SOURCE_COLORS = ('#FF4444', '#CC0000')
+DEST_COLORS = ('#44FF44', '#00AA00')
+INTERMEDIATE_COLORS = ('#90EE90', '#00AA00')
+UNREACHABLE_COLORS = ('#4488FF', '#0066CC')
+UNREACHABLE_STEP_COLORS = ('#CCCCCC', '#999999')
+COLLAPSED_COLORS = ('#FFD966', '#B8860B')
+
+NODE_SIZE = 1000  # Scatter size (points^2) of a city
+HEAD_SIZE = 12    # Arrowhead length in points
+TREE_DEPTH = 6    # tree_layout(): subtrees deeper than this start collapsed
+TREE_NODES = 20   # tree_layout(): at most this many cities are opened automatically
+LABEL_ROWS = 16   # tree_layout(): above this many rows, labels and arrows are dropped and dots shrink
+
+
+def fork_layout(tree):
+    """Horizontal fork layout: one row per destination, the source shared at (0, 0).
+
+    Returns a dict with
+      nodes: list of (x, y, label, face_color, edge_color)
+      edges: list of ((x0, y0), (x1, y1), reachable, weight_text)
+      title: title text
+    """
+    source = tree.source
+    distances = tree.distances()
+    destinations = [c for c in tree.names if c != source]
+    y_spacing = 1.8  # Vertical spacing between path rows
+
+    nodes = [(0.0, 0.0, f"{source}\n(0)") + SOURCE_COLORS]
+    edges = []
+    for row, dest in enumerate(destinations):
+        y = (row - (len(destinations) - 1) / 2) * y_spacing  # Rows centered around 0
+        reachable = distances[dest] != INF
+        # Read off the predecessor array; unreachable: a dashed stub from the source
+        path = tree.path_to(dest) if reachable else [source, dest]
+        previous = (0.0, 0.0)
+        for i, name in enumerate(path[1:], start=1):
+            # Spread the rest of the path from x=2 to x=10
+            x = 10.0 if len(path) == 2 else 2.0 + 8.0 * (i - 1) / (len(path) - 2)
+            d = distances.get(name, INF)
+            if name == dest:
+                colors = DEST_COLORS if reachable else UNREACHABLE_COLORS
+            else:
+                colors = INTERMEDIATE_COLORS if reachable else UNREACHABLE_STEP_COLORS
+            nodes.append((x, y, f"{name}\n({'∞' if d == INF else int(d)})") + colors)
+            weight = f"[{d - distances[path[i - 1]]}]" if reachable else ""  # Road weight along the path
+            edges.append((previous, (x, y), reachable, weight))
+            previous = (x, y)
+
+    reachable_count = sum(1 for d in distances.values() if d != INF) - 1  # Exclude source
+    title = (f"Horizontal Tree: Shortest Paths from {source}\n"
+             f"{len(destinations)} paths shown | Reachable: {reachable_count}/{len(tree.names) - 1} cities")
+    return {"nodes": nodes, "edges": edges, "title": title}
+
+
+def tree_layout(tree, expanded=(), collapsed=(), max_depth=TREE_DEPTH, max_nodes=TREE_NODES):
+    """Shared shortest path tree: every reachable city drawn once, depth on the x axis.
+
+    Cities are opened breadth-first while they are shallower than max_depth and
+    the drawing stays under max_nodes; the rest are shown as one collapsed node
+    ("+N" hidden cities). Names in expanded are always opened, names in
+    collapsed never are. Unreachable cities are summarised in a single node.
+    Returns the same dict as fork_layout() plus
+      names: city name for each node (None for the unreachable summary)
+      collapsed: indices of nodes with hidden children (clicking one expands it)
+    """
+    children = tree.children()
+    root = tree.index[tree.source]
+    names, dist = tree.names, tree.dist
+
+    # Subtree sizes, children before parents (reverse breadth-first order)
+    order, size = [root], [1] * len(names)
+    for u in order:
+        order.extend(children[u])
+    for u in reversed(order):
+        for v in children[u]:
+            size[u] += size[v]
+
+    # Choose which cities are opened, shallow levels first
+    depth = {root: 0}
+    opened, level = [], [root]
+    shown = 1
+    while level:
+        next_level = []
+        for u in level:
+            kids = children[u]
+            if not kids or names[u] in collapsed:
+                continue
+            if names[u] in expanded or (depth[u] < max_depth and shown + len(kids) <= max_nodes):
+                opened.append(u)
+                shown += len(kids)
+                for v in kids:
+                    depth[v] = depth[u] + 1
+                next_level.extend(kids)
+        level = next_level
+    opened = set(opened)
+
+    # Tidy tree: leaves get consecutive rows, a parent sits midway between its first and last child
+    row, y = {}, 0
+    stack = [(root, False)]
+    while stack:
+        u, done = stack.pop()
+        if u in opened and not done:
+            stack.append((u, True))
+            stack.extend((v, False) for v in reversed(children[u]))
+        elif u in opened:
+            row[u] = (row[children[u][0]] + row[children[u][-1]]) / 2
+        else:
+            row[u] = y
+            y += 1
+
+    index, nodes, node_names, folded, edges = {}, [], [], [], []
+    for u in sorted(row, key=lambda u: (depth[u], row[u])):
+        index[u] = len(nodes)
+        label = f"{names[u]}\n({int(dist[u])})"
+        if u == root:
+            colors = SOURCE_COLORS
+        elif children[u] and u not in opened:
+            colors = COLLAPSED_COLORS
+            label = f"{names[u]} +{size[u] - 1}\n({int(dist[u])})"
+            folded.append(len(nodes))
+        else:
+            colors = DEST_COLORS if not children[u] else INTERMEDIATE_COLORS
+        nodes.append((depth[u] * 2.5, -row[u] * 1.2, label) + colors)
+        node_names.append(names[u])
+    for u in opened:
+        for v in children[u]:
+            a, b = nodes[index[u]][:2], nodes[index[v]][:2]
+            edges.append((a, b, True, f"[{dist[v] - dist[u]}]"))
+
+    unreachable = sum(1 for d in dist if d == INF)
+    if unreachable:
+        nodes.append((0.0, -y * 1.2, f"{unreachable}\nunreachable") + UNREACHABLE_COLORS)
+        node_names.append(None)
+
+    rows = y + (1 if unreachable else 0)
+    detail = rows <= LABEL_ROWS
+    title = (f"Shortest Path Tree from {tree.source}\n"
+             f"{len(row)} of {size[root]} reachable cities shown | {len(folded)} collapsed (click to expand)")
+    return {"nodes": nodes, "edges": edges, "title": title, "names": node_names, "collapsed": folded,
+            "detail": detail, "node_size": max(4, min(NODE_SIZE, (300 / rows) ** 2)),
+            "legend": "tree"}
+
+
+class TreeRenderer:
+    """Draws fork_layout() results (or a message) on one axes, reusing its artists"""
+
+    def __init__(self, ax, canvas):
+        self.ax, self.canvas, self.fig = ax, canvas, ax.figure
+        self.background = None  # Saved figure pixels without the tree artists
+        self.edges = []  # Edges of the shown layout (arrowheads are re-aimed after a resize)
+        self.layout = None  # Layout currently on screen (node_at() looks up clicks in it)
+        self.node_size = NODE_SIZE
+        ax.axis('off')
+
+        # Edges: solid green for shortest paths, dashed gray for unreachable stubs
+        self.path_edges = LineCollection([], colors='#00AA00', linewidths=3, alpha=0.9, zorder=1)
+        self.stub_edges = LineCollection([], colors='#CCCCCC', linewidths=1.5, alpha=0.4,
+                                         linestyles='dashed', zorder=1)
+        # Arrowheads are markers, so they keep their size when the axes are resized
+        self.heads = PathCollection([], sizes=[HEAD_SIZE ** 2], offsets=np.empty((0, 2)),
+                                    offset_transform=ax.transData, transform=IdentityTransform(), zorder=2)
+        for collection in (self.path_edges, self.stub_edges, self.heads):
+            ax.add_collection(collection)
+        self.nodes = ax.scatter([], [], s=NODE_SIZE, linewidths=2.5, alpha=0.95, zorder=3)
+        self.labels, self.weights = [], []  # Pools of Text artists, grown on demand
+        self.message = ax.text(0.5, 0.5, '', transform=ax.transAxes, ha='center', va='center',
+                               fontsize=12, color='#7f8c8d', style='italic')
+
+        legend_elements = [
+            Line2D([0], [0], marker='o', color='w', markerfacecolor='#FF4444',
+                   markersize=10, label='Source City', markeredgewidth=1.5, markeredgecolor='#CC0000'),
+            Line2D([0], [0], marker='o', color='w', markerfacecolor='#44FF44',
+                   markersize=10, label='Destination (Reachable)', markeredgewidth=1.5, markeredgecolor='#00AA00'),
+            Line2D([0], [0], marker='o', color='w', markerfacecolor='#90EE90',
+                   markersize=10, label='Intermediate Node', markeredgewidth=1.5, markeredgecolor='#00AA00'),
+            Line2D([0], [0], marker='o', color='w', markerfacecolor='#4488FF',
+                   markersize=10, label='Unreachable', markeredgewidth=1.5, markeredgecolor='#0066CC'),
+            Line2D([0], [0], color='#00AA00', linewidth=2.5, label='Path Edge')
+        ]
+        tree_elements = [legend_elements[0], legend_elements[2], legend_elements[1],
+            Line2D([0], [0], marker='o', color='w', markerfacecolor='#FFD966',
+                   markersize=10, label='Collapsed (click to expand)', markeredgewidth=1.5, markeredgecolor='#B8860B'),
+            legend_elements[3], legend_elements[4]]
+        # Positioned below the graph, outside the plot area; one legend per layout, both built once
+        style = dict(loc='upper center', bbox_to_anchor=(0.5, -0.02), ncol=3, frameon=True, fancybox=True,
+                     shadow=True, fontsize=9, framealpha=0.95, edgecolor='#34495e', facecolor='white')
+        self.legend = ax.legend(handles=legend_elements, **style)
+        ax.add_artist(self.legend)  # Keep it when the next legend() call replaces ax.legend_
+        self.tree_legend = ax.legend(handles=tree_elements, **style)
+
+        # Margins are fixed once instead of running tight_layout() on every redraw
+        self.fig.subplots_adjust(left=0.02, right=0.98, top=0.9, bottom=0.12)
+        for artist in self.artists():
+            artist.set_animated(True)  # Drawn only by blit(), never baked into the background
+        canvas.mpl_connect('draw_event', self.on_draw)
+
+    def artists(self):
+        """Every artist that changes between redraws"""
+        return ([self.path_edges, self.stub_edges, self.heads, self.nodes, self.message,
+                 self.legend, self.tree_legend, self.ax.title] + self.labels + self.weights)
+
+    def on_draw(self, event):
+        """After a full draw (first show, resize): save the background and paint the tree on it"""
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.set_heads(self.edges)
+        self.paint()
+
+    def paint(self):
+        """Draw every visible tree artist onto the canvas buffer"""
+        for artist in self.artists():
+            if artist.get_visible():
+                self.fig.draw_artist(artist)
+
+    def blit(self):
+        """Repaint only the tree artists over the saved background"""
+        if self.background is None:
+            self.canvas.draw()  # First draw; on_draw() saves the background
+            return
+        self.canvas.restore_region(self.background)
+        self.paint()
+        self.canvas.blit(self.fig.bbox)
+
+    def texts(self, pool, count, **style):
+        """First count Text artists of a pool, creating missing ones and hiding the rest"""
+        while len(pool) < count:
+            text = self.ax.text(0, 0, '', ha='center', va='center', zorder=4, **style)
+            text.set_animated(True)
+            pool.append(text)
+        for text in pool[count:]:
+            text.set_visible(False)
+        return pool[:count]
+
+    def show_message(self, text):
+        """Hide the tree and show a centered message instead"""
+        for artist in self.artists():
+            artist.set_visible(False)
+        self.edges, self.layout = [], None
+        self.message.set_text(text)
+        self.message.set_visible(True)
+        self.blit()
+
+    def show_layout(self, layout):
+        """Move the existing artists to a new layout (see fork_layout / tree_layout)"""
+        nodes, edges = layout["nodes"], layout["edges"]
+        # Level of detail: big layouts are plain dots and lines, rasterized when saved as vector files
+        detail = layout.get("detail", True)
+        self.layout, self.edges = layout, (edges if detail else [])
+        self.node_size = layout.get("node_size", NODE_SIZE)
+        self.message.set_visible(False)
+        self.legend.set_visible(layout.get("legend") != "tree")
+        self.tree_legend.set_visible(layout.get("legend") == "tree")
+        self.ax.set_title(layout["title"], fontsize=12, fontweight='bold', pad=15, color='#2c3e50')
+        self.ax.title.set_visible(True)
+
+        # Fixed limits with a 15% margin, so nothing triggers autoscaling
+        xy = np.array([(x, y) for x, y, *rest in nodes], dtype=float)
+        low, high = xy.min(axis=0), xy.max(axis=0)
+        pad = np.maximum((high - low) * 0.15, 1.0)
+        self.ax.set_xlim(low[0] - pad[0], high[0] + pad[0])
+        self.ax.set_ylim(low[1] - pad[1], high[1] + pad[1])
+
+        self.nodes.set_offsets(xy)
+        self.nodes.set_sizes([self.node_size])
+        self.nodes.set_linewidths(2.5 if detail else 0.5)
+        for collection in (self.nodes, self.path_edges, self.stub_edges):
+            collection.set_rasterized(not detail)
+        self.nodes.set_facecolors([n[3] for n in nodes])
+        self.nodes.set_edgecolors([n[4] for n in nodes])
+        self.nodes.set_visible(True)
+        for text, (x, y, label, *colors) in zip(self.texts(self.labels, len(nodes) if detail else 0, fontsize=9,
+                                                           fontweight='bold'), nodes):
+            text.set_position((x, y)); text.set_text(label); text.set_visible(True)
+
+        self.path_edges.set_segments([(a, b) for a, b, reachable, _ in edges if reachable])
+        self.stub_edges.set_segments([(a, b) for a, b, reachable, _ in edges if not reachable])
+        self.path_edges.set_linewidths(3 if detail else 0.5)
+        self.path_edges.set_visible(True); self.stub_edges.set_visible(True)
+        self.set_heads(self.edges)
+
+        labelled = [(a, b, text) for a, b, reachable, text in self.edges if reachable and text]
+        bbox = dict(boxstyle='round,pad=0.4', facecolor='#E8F8E8', edgecolor='#00AA00', alpha=0.9, linewidth=1.5)
+        for text, (a, b, label) in zip(self.texts(self.weights, len(labelled), fontsize=9, fontweight='bold',
+                                                  color='#006400', bbox=bbox), labelled):
+            text.set_position(((a[0] + b[0]) / 2, (a[1] + b[1]) / 2)); text.set_text(label); text.set_visible(True)
+        self.blit()
+
+    def set_heads(self, edges):
+        """One arrowhead per edge, touching the border of the target node"""
+        if not edges or not self.path_edges.get_visible():
+            self.heads.set_visible(False)
+            return
+        start = self.ax.transData.transform([a for a, *rest in edges])
+        end = self.ax.transData.transform([b for a, b, *rest in edges])
+        angles = np.arctan2(end[:, 1] - start[:, 1], end[:, 0] - start[:, 0])  # In screen space
+        # Triangle pointing along +x, tip pulled back by the node radius (units of HEAD_SIZE points)
+        back = (np.sqrt(self.node_size) / 2 + 2) / HEAD_SIZE
+        triangle = Path([(-back, 0), (-back - 1, 0.4), (-back - 1, -0.4), (-back, 0)], closed=True)
+        self.heads.set_paths([triangle.transformed(Affine2D().rotate(angle)) for angle in angles])
+        self.heads.set_offsets([b for a, b, *rest in edges])
+        self.heads.set_facecolors(['#00AA00' if reachable else '#CCCCCC' for a, b, reachable, _ in edges])
+        self.heads.set_edgecolors('none')
+        self.heads.set_visible(True)
+
+    def node_at(self, x, y, radius=15):
+        """Index of the layout node under pixel position (x, y), or None"""
+        if self.layout is None:
+            return None
+        xy = self.ax.transData.transform([n[:2] for n in self.layout["nodes"]])
+        gap = np.hypot(xy[:, 0] - x, xy[:, 1] - y)
+        i = int(gap.argmin())
+        return i if gap[i] <= max(radius, np.sqrt(self.node_size) / 2) else None
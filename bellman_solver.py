@@ -0,0 +1,920 @@
+"""Shortest-path solvers used by the GUI and by headless callers.
+
+Every solver has the same interface: set_graph_model(graph) (a
+bellman_graph.Graph) or set_graph(names, edges) once, then query(source,
+engine) as often as needed, which returns a ShortestPathTree.
+
+- BackendSolver keeps one bellman_backend.exe --binary worker open and only
+  re-sends the graph when the edge set actually changes. Data goes over the
+  pipe as raw int32/int64 arrays (see serveBinary() in bellman_backend.c).
+- NumpySolver runs Bellman-Ford in Python, relaxing every edge of a pass in
+  one vectorized step, so it works on hosts without a C compiler.
+
+Both pick the algorithm per graph: engine "auto" runs Dijkstra (binary heap,
+O(E log V)) when no road is negative and Bellman-Ford otherwise; the tree's
+engine attribute says which one ran. route() answers a single source -> target
+question with Dijkstra stopping at the target, or bidirectional Dijkstra.
+
+open_solver() picks one of them. AllPairs computes every source at once so
+switching sources needs no solver call at all, and DynamicShortestPaths keeps
+one source's tree up to date as single roads are edited.
+"""
+import heapq
+import os
+import struct
+import subprocess  # To run our C program
+from array import array
+from collections import deque
+
+import numpy as np
+
+from bellman_graph import Graph
+from bellman_profile import NO_PROFILE
+
+# C executable lives next to this script
+BACKEND_EXE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bellman_backend.exe")
+
+# Binary protocol codes, must match bellman_backend.c
+CMD_GRAPH, CMD_QUERY, CMD_QUIT, CMD_STATS, CMD_ROUTE = 1, 2, 3, 4, 5
+STATUS_OK, STATUS_INVALID, STATUS_NEGATIVE_CYCLE, STATUS_PROGRESS = 0, 1, 2, 3
+# Engines: name -> ENGINE_* code in bellman_backend.c
+ENGINES = {"classic": 0, "early-exit": 1, "spfa": 2, "dijkstra": 3}
+# What callers may ask for: "auto" is turned into one of ENGINES by pick_engine()
+ENGINE_CHOICES = ("auto",) + tuple(ENGINES)
+# Point-to-point searches: name -> mode code of the C worker's ROUTE command
+ROUTE_MODES = {"dijkstra": 0, "bidirectional": 1}
+INT64_MAX = 2**63 - 1  # C sends this for unreachable cities
+
+INF = float('inf')  # Distance used on the Python side for unreachable cities
+# Work counters reported by stats(), in the order the C worker sends them
+COUNTERS = ("passes", "relaxations_attempted", "relaxations_improved", "memo_hits", "memo_misses")
+
+
+class NegativeCycleError(ValueError):
+    """Raised when the graph contains a negative weight cycle"""
+
+
+class Cancelled(Exception):
+    """Raised by a query that was stopped with cancel()"""
+
+
+def pick_engine(engine, has_negative):
+    """Engine that actually runs: "auto" means Dijkstra, or early-exit Bellman-Ford
+    when some road is negative (Dijkstra would give wrong answers there)"""
+    if engine == "auto":
+        return "early-exit" if has_negative else "dijkstra"
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine}")
+    if engine == "dijkstra" and has_negative:
+        raise ValueError("Dijkstra needs non-negative road weights; use auto or a Bellman-Ford engine")
+    return engine
+
+
+def format_distances(names, source, dist, cached=False):
+    """Build the same results table the C program prints in text mode"""
+    lines = [f"Using cached results for {source}\n"] if cached else []
+    lines += [f"Source City: {source}", "-" * 36, f"{'City':<15} Distance", "-" * 36]
+    for name, d in zip(names, dist):
+        lines.append(f"{name:<15} {'INF' if d == INF else d}")
+    return "\n".join(lines) + "\n"
+
+
+class Route:
+    """One shortest route from a point-to-point search (no full tree is built)"""
+
+    def __init__(self, names, path, distance, engine, backend, settled):
+        self.path = [names[i] for i in path]  # City names, source first ([] if unreachable)
+        self.distance = distance  # INF if unreachable
+        self.engine = engine  # "dijkstra" (stopped at the target), "bidirectional" or a Bellman-Ford engine
+        self.backend = backend
+        self.settled = settled  # Cities the search finished before it could stop
+
+
+class ShortestPathTree:
+    """Shortest paths from one source, stored as distance + predecessor arrays.
+
+    pred[i] is the index of the city before i on its shortest path (-1 for the
+    source and unreachable cities), so any path is found by following parents
+    back to the source instead of searching for a matching edge.
+    """
+
+    def __init__(self, names, source, dist, pred, cached=False, engine=None, backend=None):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.source = source
+        self.dist = dist
+        self.pred = pred
+        self.cached = cached
+        self.engine = engine  # Which relaxation engine produced this tree
+        self.backend = backend  # Which solver ("c" or "numpy") produced it
+
+    def distance(self, name):
+        """Distance from the source to a city (INF if unreachable)"""
+        return self.dist[self.index[name]]
+
+    def distances(self):
+        """Dictionary city name -> distance"""
+        return dict(zip(self.names, self.dist))
+
+    def is_reachable(self, name):
+        """True if there is a path from the source to this city"""
+        return self.distance(name) != INF
+
+    def path_indices(self, dest):
+        """Indices along the shortest path source -> dest ([] if unreachable)"""
+        v = self.index[dest]
+        if self.dist[v] == INF:
+            return []
+        path = []
+        while v != -1 and len(path) <= len(self.names):  # Bound guards against a corrupt pred array
+            path.append(v)
+            v = self.pred[v]
+        path.reverse()
+        return path
+
+    def path_to(self, dest):
+        """City names along the shortest path source -> dest ([] if unreachable)"""
+        return [self.names[i] for i in self.path_indices(dest)]
+
+    def route(self, dest):
+        """Route to one city, in the same form as a solver's route() answer"""
+        return Route(self.names, self.path_indices(dest), self.distance(dest), self.engine, self.backend,
+                     len(self.names))
+
+    def children(self):
+        """children[i] = indices of the cities whose shortest path ends with the road i -> city"""
+        children = [[] for _ in self.names]
+        for v, p in enumerate(self.pred):
+            if p != -1:
+                children[p].append(v)
+        return children
+
+    def paths(self):
+        """Yield (city, path) for every reachable city, walking the tree depth-first.
+
+        Paths share their prefixes: the same list is extended and cut back as
+        the walk goes, so visiting every path is O(V) even on deep trees. The
+        yielded list changes on the next step - copy it (list(path)) to keep it.
+        Use path_to() when you only need a few destinations.
+        """
+        children = self.children()
+        stack = [(self.index[self.source], 0)]
+        path = []  # Names from the source down to the city being visited
+        while stack:
+            u, depth = stack.pop()
+            del path[depth:]  # Back up to u's parent
+            path.append(self.names[u])
+            yield self.names[u], path
+            stack.extend((v, depth + 1) for v in children[u])
+
+    def format(self):
+        """Results table in the same layout the C program prints"""
+        return format_distances(self.names, self.source, self.dist, self.cached)
+
+
+class BackendSolver:
+    """Talks to one persistent bellman_backend.exe worker over its binary protocol"""
+
+    name = "c"
+
+    def __init__(self, exe_path=BACKEND_EXE):
+        self.exe_path = exe_path
+        self.process = None
+        self.names = []
+        self.index = {}  # city name -> index, replaces the C side's strcmp scan
+        self.graph = None  # Last Graph loaded (None after set_graph_arrays); reloaded into a respawned worker
+        self.loaded = False  # The running worker has a graph
+        self.memo_engines = {}  # source index -> engine that filled the worker's memo row
+        self.has_negative = False  # Any negative road in the loaded graph (rules out Dijkstra)
+        self.cancelled = False
+        self.profile = NO_PROFILE  # Set to a bellman_profile.RunProfile to time the stages
+
+    def _ensure_started(self):
+        """Start the worker if it is not running (raises FileNotFoundError if not compiled)"""
+        if self.process is None or self.process.poll() is not None:
+            self.close()  # Reap a worker that was killed by cancel() or crashed
+            with self.profile.stage("spawn"):
+                self.process = subprocess.Popen([self.exe_path, "--binary"], stdin=subprocess.PIPE,
+                                                stdout=subprocess.PIPE)
+            self.loaded = False  # A fresh worker has no graph loaded
+            if self.graph is not None:  # Restarted after cancel() or a crash: give it the graph back
+                self._load(self.graph.names, *self.graph.columns())
+
+    def _send(self, *chunks):
+        """Write raw bytes to the worker"""
+        self._ensure_started()
+        try:
+            for chunk in chunks:
+                self.process.stdin.write(chunk)
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            self._died()
+
+    def _read(self, size):
+        """Read exactly size bytes from the worker"""
+        data = self.process.stdout.read(size)
+        if len(data) != size:
+            self._died()
+        return data
+
+    def _died(self):
+        """Worker died mid-request: forget it so the next call starts a new one"""
+        self.close()
+        if self.cancelled:
+            raise Cancelled("Query cancelled")
+        raise RuntimeError("C backend stopped unexpectedly")
+
+    def set_graph(self, names, edges):
+        """Load a graph; edges are (from_index, to_index, weight). No-op if unchanged."""
+        with self.profile.stage("serialize"):
+            graph = Graph.from_edges(names, edges)
+        self.set_graph_model(graph)
+
+    def set_graph_model(self, graph):
+        """Load a bellman_graph.Graph; no-op if the worker already has this graph"""
+        self._ensure_started()
+        if graph is self.graph or graph == self.graph:
+            return  # Worker already has this graph and its memo table is still valid
+        self.set_graph_arrays(graph.names, *graph.columns())
+        self.graph = graph
+
+    def set_graph_arrays(self, names, src, dest, weight):
+        """Load a graph given as three int32 arrays (array('i'), NumPy or shared memory views).
+        The arrays aren't kept, so a restarted worker needs them loaded again."""
+        self._ensure_started()
+        self.graph = None
+        self._load(names, src, dest, weight)
+
+    def _load(self, names, src, dest, weight):
+        """Send a graph to the running worker"""
+        self.loaded = False
+        with self.profile.stage("load graph"):  # Pipe transfer + the worker building its adjacency
+            self._send(struct.pack("=3i", CMD_GRAPH, len(names), len(src)),
+                       memoryview(src).cast("B"), memoryview(dest).cast("B"), memoryview(weight).cast("B"))
+            status, = struct.unpack("=i", self._read(4))
+        if status != STATUS_OK:
+            raise ValueError("Error: Invalid graph.")
+        self.loaded = True
+        self.memo_engines = {}  # Loading a graph clears the worker's memo table
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.has_negative = len(weight) > 0 and int(np.min(weight)) < 0
+
+    def _require_graph(self):
+        """Start the worker if needed (reloading the last Graph); raise if it has no graph"""
+        self._ensure_started()
+        if not self.loaded:
+            raise RuntimeError("Error: No graph loaded in the C backend (load the graph again).")
+
+    def _read_status(self, progress):
+        """Status of a QUERY / ROUTE reply, passing any progress frames before it to progress()"""
+        status, = struct.unpack("=i", self._read(4))
+        while status == STATUS_PROGRESS:
+            step, = struct.unpack("=i", self._read(4))
+            relaxations, = struct.unpack("=q", self._read(8))
+            if progress:
+                progress(step, relaxations)
+            status, = struct.unpack("=i", self._read(4))
+        return status
+
+    def query(self, source, engine="auto", progress=None):
+        """Solve from source on the loaded graph and return a ShortestPathTree.
+
+        engine is "auto" or one of ENGINES: "classic" (always V-1 passes),
+        "early-exit" (stop after a pass with no change), "spfa" (queue-based)
+        or "dijkstra" (non-negative roads only). The tree's engine attribute
+        is the one that actually ran.
+        progress(step, relaxations) is called while a long query runs (step is
+        the pass number, or the number of settled cities for Dijkstra).
+        """
+        self._require_graph()
+        if source not in self.index:
+            raise ValueError("Invalid source city.")
+        engine = pick_engine(engine, self.has_negative)
+        if self.cancelled:
+            raise Cancelled("Query cancelled")
+        with self.profile.stage("solve"):  # Until the worker starts answering
+            self._send(struct.pack("=3i", CMD_QUERY, self.index[source], ENGINES[engine]))
+            status = self._read_status(progress)
+        cached, V = struct.unpack("=2i", self._read(8))
+        if status == STATUS_NEGATIVE_CYCLE:
+            raise NegativeCycleError("Error: Graph contains a negative weight cycle!")
+        if status != STATUS_OK:
+            raise ValueError("Invalid source city.")
+        # The worker's memo row is shared between engines; report the engine that filled it
+        if cached:
+            engine = self.memo_engines.get(self.index[source], engine)
+        else:
+            self.memo_engines[self.index[source]] = engine
+
+        with self.profile.stage("parse"):
+            dist = array('q'); dist.frombytes(self._read(8 * V))
+            pred = array('i'); pred.frombytes(self._read(4 * V))
+            return ShortestPathTree(self.names, source, [INF if d == INT64_MAX else d for d in dist],
+                                    list(pred), bool(cached), engine, self.name)
+
+    def route(self, source, target, bidirectional=False, progress=None):
+        """Shortest route source -> target without solving for every city.
+
+        Dijkstra stops as soon as target is settled; bidirectional=True also
+        searches backwards from target and stops where the two meet. Graphs
+        with negative roads need Bellman-Ford, so they get a full query
+        (which still reports negative cycles).
+        """
+        self._require_graph()
+        if source not in self.index:
+            raise ValueError("Invalid source city.")
+        if target not in self.index:
+            raise ValueError("Invalid target city.")
+        if self.has_negative:
+            return self.query(source, progress=progress).route(target)
+        mode = "bidirectional" if bidirectional else "dijkstra"
+        if self.cancelled:
+            raise Cancelled("Query cancelled")
+        with self.profile.stage("solve"):
+            self._send(struct.pack("=4i", CMD_ROUTE, self.index[source], self.index[target], ROUTE_MODES[mode]))
+            status = self._read_status(progress)
+            settled, length = struct.unpack("=2i", self._read(8))
+            distance, = struct.unpack("=q", self._read(8))
+        if status != STATUS_OK:
+            raise ValueError("Invalid source city.")
+        path = array('i'); path.frombytes(self._read(4 * length))
+        return Route(self.names, path, INF if distance == INT64_MAX else distance, mode, self.name, settled)
+
+    def stats(self):
+        """Work counters from the worker: the last query's passes and relaxations, memo hits/misses.
+        All zero when no worker is running (stats() never starts one)."""
+        if self.process is None or self.process.poll() is not None:
+            return dict.fromkeys(COUNTERS, 0)
+        self._send(struct.pack("=i", CMD_STATS))
+        self._read(4)  # Status, always OK
+        values = array('q'); values.frombytes(self._read(8 * len(COUNTERS)))
+        return dict(zip(COUNTERS, values))
+
+    def cancel(self):
+        """Stop a running query from another thread (kills the worker; the next query restarts it).
+
+        Queries keep raising Cancelled until reset_cancel(), so a cancel that
+        arrives before the query starts isn't lost. The pipes are left open for
+        the thread still reading from them; it sees the worker die and close()
+        reaps the process.
+        """
+        self.cancelled = True
+        process = self.process
+        if process is not None and process.poll() is None:
+            process.kill()
+            process.wait()  # So the next query sees a dead worker and starts a new one
+
+    def reset_cancel(self):
+        """Forget an earlier cancel() before starting a new job"""
+        self.cancelled = False
+
+    def close(self):
+        """Stop the worker process, close its pipes and reap it"""
+        process, self.process = self.process, None
+        if process is not None:
+            try:
+                if process.poll() is None:
+                    process.stdin.write(struct.pack("=i", CMD_QUIT))
+                    process.stdin.flush()
+                    process.wait(timeout=1)
+            except (BrokenPipeError, OSError, subprocess.TimeoutExpired):
+                process.kill()
+            for pipe in (process.stdin, process.stdout):
+                try:
+                    pipe.close()
+                except OSError:
+                    pass  # Flushing a pipe to a dead worker can fail; the fd is closed anyway
+            process.wait()  # Reap it so no zombie is left behind
+        self.loaded = False  # self.graph is kept: a restarted worker gets it back
+
+
+class NumpySolver:
+    """Bellman-Ford in NumPy: each pass relaxes every edge with one scatter-min.
+
+    Engines mirror the C backend: "classic" always runs V-1 passes,
+    "early-exit" stops after a pass with no change, and "spfa" additionally
+    only relaxes edges leaving cities that improved in the previous pass.
+    "dijkstra" can't be vectorized this way; it uses heapq over adjacency lists.
+    """
+
+    name = "numpy"
+    UNREACHED = 2**62  # Stands in for infinity; large, but adding an int32 weight can't overflow
+
+    def __init__(self):
+        self.names = []
+        self.index = {}
+        self.src = self.dest = self.weight = None
+        self.graph = None
+        self.memo = {}  # source index -> (dist, pred, engine that computed them), valid until the graph changes
+        self.has_negative = False
+        self.adjacency = None  # Built on the first Dijkstra query, see _adjacency()
+        self.cancelled = False
+        self.profile = NO_PROFILE  # Set to a bellman_profile.RunProfile to time the stages
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def set_graph(self, names, edges):
+        """Load a graph; edges are (from_index, to_index, weight). No-op if unchanged."""
+        with self.profile.stage("serialize"):
+            graph = Graph.from_edges(names, edges)
+        self.set_graph_model(graph)
+
+    def set_graph_model(self, graph):
+        """Load a bellman_graph.Graph; no-op (memo kept) if it is the loaded graph"""
+        if graph is self.graph or graph == self.graph:
+            return
+        self.set_graph_arrays(graph.names, *graph.columns())
+        self.graph = graph
+
+    def set_graph_arrays(self, names, src, dest, weight):
+        """Load a graph given as three integer arrays (copied, so shared memory may be reused)"""
+        src, dest = np.array(src, dtype=np.int64), np.array(dest, dtype=np.int64)
+        if len(src) and (min(src.min(), dest.min()) < 0 or max(src.max(), dest.max()) >= len(names)):
+            raise ValueError("Error: Invalid graph.")
+        self.src, self.dest, self.weight = src, dest, np.array(weight, dtype=np.int64)
+        self.has_negative = bool(len(src)) and int(self.weight.min()) < 0
+        self.adjacency = None
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.memo = {}
+        self.counters["memo_hits"] = self.counters["memo_misses"] = 0
+        self.graph = None
+
+    def _relax(self, src_index, engine, progress=None):
+        """Run the relaxation passes, returns (dist, pred) arrays or raises NegativeCycleError"""
+        V = len(self.names)
+        dist = np.full(V, self.UNREACHED, dtype=np.int64)
+        pred = np.full(V, -1, dtype=np.int64)
+        dist[src_index] = 0
+        src, dest, weight = self.src, self.dest, self.weight
+        relaxations = 0
+        counters = self.counters
+        counters["passes"] = counters["relaxations_improved"] = 0
+
+        for pass_number in range(1, V):
+            if self.cancelled:
+                raise Cancelled("Query cancelled")
+            relaxations += len(src)
+            counters["passes"] += 1
+            if progress:
+                progress(pass_number, relaxations)
+
+            # Candidate distance through every edge whose start is reachable
+            start = dist[src]
+            cand = np.where(start < self.UNREACHED, start + weight, self.UNREACHED)
+            new = dist.copy()
+            np.minimum.at(new, dest, cand)  # Keep the smallest candidate per destination
+            improved = new < dist
+            counters["relaxations_improved"] += int(improved.sum())  # Cities improved (edges can tie)
+            if not improved.any():
+                if engine != "classic":
+                    break  # Converged: nothing can change any more
+                continue
+
+            # Record a predecessor for every improved city: any edge that produced its new value
+            won = improved[dest] & (cand == new[dest])
+            pred[dest[won]] = src[won]
+            dist = new
+
+            if engine == "spfa":
+                # Next pass only needs edges leaving cities that just improved
+                active = improved[self.src]
+                src, dest, weight = self.src[active], self.dest[active], self.weight[active]
+
+        # Negative cycle check: one more relaxation over every edge
+        counters["relaxations_attempted"] = relaxations + len(self.src)
+        start = dist[self.src]
+        cand = np.where(start < self.UNREACHED, start + self.weight, self.UNREACHED)
+        if (cand < dist[self.dest]).any():
+            raise NegativeCycleError("Error: Graph contains a negative weight cycle!")
+        return dist, pred
+
+    def _adjacency(self):
+        """(outgoing, incoming) roads per city as plain lists: (start, other end, weight),
+        roads of city u at start[u] .. start[u+1]-1. Built once per graph."""
+        if self.adjacency is None:
+            V = len(self.names)
+            self.adjacency = []
+            for key, other in ((self.src, self.dest), (self.dest, self.src)):
+                order = np.argsort(key, kind="stable")
+                start = np.zeros(V + 1, dtype=np.int64)
+                np.cumsum(np.bincount(key, minlength=V), out=start[1:])
+                self.adjacency.append((start.tolist(), other[order].tolist(), self.weight[order].tolist()))
+        return self.adjacency
+
+    def _dijkstra(self, src_index, target=-1, progress=None):
+        """Dijkstra with a heapq binary heap, returns (dist, pred, settled count) as lists.
+
+        A city is pushed again whenever it improves; stale heap entries are
+        skipped when popped. With target >= 0 it stops once target is settled.
+        """
+        start, dest, weight = self._adjacency()[0]
+        V = len(self.names)
+        dist, pred, settled = [INF] * V, [-1] * V, [False] * V
+        dist[src_index] = 0
+        heap = [(0, src_index)]
+        count = relaxations = improved = 0
+        while heap:
+            d, u = heapq.heappop(heap)
+            if settled[u]:
+                continue  # Stale entry: u was settled earlier with a smaller distance
+            settled[u] = True
+            count += 1
+            if u == target:
+                break  # Its distance can't get any smaller now
+            for k in range(start[u], start[u + 1]):
+                v, nd = dest[k], d + weight[k]
+                if nd < dist[v]:
+                    dist[v], pred[v] = nd, u
+                    improved += 1
+                    heapq.heappush(heap, (nd, v))
+            relaxations += start[u + 1] - start[u]
+            if count % 1024 == 0:
+                if self.cancelled:
+                    raise Cancelled("Query cancelled")
+                if progress:
+                    progress(count, relaxations)
+        self.counters.update(passes=1, relaxations_attempted=relaxations, relaxations_improved=improved)
+        return dist, pred, count
+
+    def _bidirectional(self, s, t, progress=None):
+        """Bidirectional Dijkstra: (distance, path indices, settled count).
+
+        Alternates between a forward search from s and a backward search from t
+        (over incoming roads), always expanding the side with the smaller
+        frontier, and stops once the two frontiers can't beat the best route
+        found through a city both sides reached.
+        """
+        sides = self._adjacency()
+        dist, link, settled = ({s: 0}, {t: 0}), ({s: -1}, {t: -1}), (set(), set())
+        heaps = ([(0, s)], [(0, t)])
+        best, meet = (0, s) if s == t else (INF, -1)
+        count = relaxations = improved = 0
+        while heaps[0] and heaps[1] and heaps[0][0][0] + heaps[1][0][0] < best:
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            d, u = heapq.heappop(heaps[side])
+            if u in settled[side]:
+                continue  # Stale entry
+            settled[side].add(u)
+            count += 1
+            start, other, weight = sides[side]
+            mine, theirs = dist[side], dist[1 - side]
+            for k in range(start[u], start[u + 1]):
+                v, nd = other[k], d + weight[k]
+                if nd < mine.get(v, INF):
+                    mine[v], link[side][v] = nd, u
+                    improved += 1
+                    heapq.heappush(heaps[side], (nd, v))
+                if v in theirs and mine[v] + theirs[v] < best:  # Both searches reached v
+                    best, meet = mine[v] + theirs[v], v
+            relaxations += start[u + 1] - start[u]
+            if count % 1024 == 0:
+                if self.cancelled:
+                    raise Cancelled("Query cancelled")
+                if progress:
+                    progress(count, relaxations)
+
+        # Route = s ... meet (previous cities, reversed) + meet ... t (next cities)
+        path = []
+        v = meet
+        while v != -1:
+            path.append(v)
+            v = link[0][v]
+        path.reverse()
+        v = link[1][meet] if meet != -1 else -1
+        while v != -1:
+            path.append(v)
+            v = link[1][v]
+        self.counters.update(passes=1, relaxations_attempted=relaxations, relaxations_improved=improved)
+        return best, path, count
+
+    def query(self, source, engine="auto", progress=None):
+        """Solve from source on the loaded graph and return a ShortestPathTree
+        (same engines as BackendSolver.query)"""
+        if source not in self.index:
+            raise ValueError("Invalid source city.")
+        engine = pick_engine(engine, self.has_negative)
+        src_index = self.index[source]
+        cached = src_index in self.memo
+        if cached:
+            self.counters["memo_hits"] += 1
+            self.counters["passes"] = self.counters["relaxations_attempted"] = 0
+            self.counters["relaxations_improved"] = 0
+        else:
+            self.counters["memo_misses"] += 1
+            if self.cancelled:
+                raise Cancelled("Query cancelled")
+            with self.profile.stage("solve"):
+                if engine == "dijkstra":
+                    dist, pred, _ = self._dijkstra(src_index, progress=progress)
+                    self.memo[src_index] = (np.array([self.UNREACHED if d == INF else d for d in dist],
+                                                     dtype=np.int64), np.array(pred, dtype=np.int64), engine)
+                else:
+                    self.memo[src_index] = self._relax(src_index, engine, progress) + (engine,)
+        # Every engine gives the same distances, so a row is shared; report the engine that made it
+        dist, pred, engine = self.memo[src_index]
+        with self.profile.stage("parse"):  # Arrays -> Python lists, like decoding the C reply
+            return ShortestPathTree(self.names, source,
+                                    [INF if d >= self.UNREACHED else int(d) for d in dist],
+                                    pred.tolist(), cached, engine, self.name)
+
+    def route(self, source, target, bidirectional=False, progress=None):
+        """Shortest route source -> target (see BackendSolver.route)"""
+        if source not in self.index:
+            raise ValueError("Invalid source city.")
+        if target not in self.index:
+            raise ValueError("Invalid target city.")
+        if self.has_negative:
+            return self.query(source, progress=progress).route(target)
+        s, t = self.index[source], self.index[target]
+        if self.cancelled:
+            raise Cancelled("Query cancelled")
+        with self.profile.stage("solve"):
+            if bidirectional:
+                distance, path, settled = self._bidirectional(s, t, progress)
+            else:
+                dist, pred, settled = self._dijkstra(s, t, progress)
+                distance, path = dist[t], []
+                v = t if distance != INF else -1
+                while v != -1:
+                    path.append(v)
+                    v = pred[v]
+                path.reverse()
+        return Route(self.names, path, distance, "bidirectional" if bidirectional else "dijkstra",
+                     self.name, settled)
+
+    def stats(self):
+        """Work counters: the last query's passes and relaxations, memo hits/misses"""
+        return dict(self.counters)
+
+    def cancel(self):
+        """Stop a running query from another thread (checked before every pass).
+        Queries keep raising Cancelled until reset_cancel()."""
+        self.cancelled = True
+
+    def reset_cancel(self):
+        """Forget an earlier cancel() before starting a new job"""
+        self.cancelled = False
+
+    def close(self):
+        """Nothing to release; present so every solver can be closed the same way"""
+        self.memo = {}
+
+
+def graph_hash(names, edges):
+    """Stable hash of a graph's city names and edge set (edge order doesn't matter);
+    same as Graph.digest()"""
+    return Graph.from_edges(names, edges).digest()
+
+
+class AllPairs:
+    """Distance and predecessor matrices for every source, cached per edge set.
+
+    compute() runs Floyd-Warshall vectorized with NumPy (one broadcast step per
+    intermediate city) and keeps the V x V results until the graph hash changes.
+    Row s of the predecessor matrix is exactly the shortest path tree from s.
+    A negative cycle anywhere stops compute() with NegativeCycleError.
+    """
+
+    UNREACHED = 2**61  # Large enough for infinity; the sum of two still fits in int64
+    MAX_CITIES = 3000  # Two V x V int64 matrices plus temporaries: about 300 MB at this size
+
+    def __init__(self):
+        self.key = None
+        self.names = []
+        self.index = {}
+        self.dist = self.pred = None
+        self.negative_cycle = False  # The cached graph has a negative cycle (no matrices kept)
+        self.cancelled = False
+
+    def matches(self, graph):
+        """True if the cached matrices belong to this Graph"""
+        return self.key is not None and self.key == graph.digest()
+
+    def compute(self, graph, progress=None):
+        """Fill the matrices for a Graph; returns True if they had to be recomputed.
+
+        progress(k, V) is called after each intermediate city k. Raises
+        ValueError above MAX_CITIES and NegativeCycleError as soon as a city
+        can reach itself at a negative cost.
+        """
+        key = graph.digest()
+        if key == self.key:
+            if self.negative_cycle:
+                raise NegativeCycleError("Error: Graph contains a negative weight cycle!")
+            return False
+        V = graph.V
+        if V > self.MAX_CITIES:
+            raise ValueError(f"Error: All sources can be precomputed for up to {self.MAX_CITIES:,} cities "
+                             f"(this graph has {V:,}); untick \"Precompute all sources\".")
+        dist = np.full((V, V), self.UNREACHED, dtype=np.int64)
+        src, dest, weight = graph.columns()
+        np.minimum.at(dist, (src, dest), weight)  # Keep the cheapest of any parallel roads
+        pred = np.where(dist < self.UNREACHED, np.arange(V)[:, None], -1)  # Direct road u -> v: pred u
+        diagonal = np.arange(V)
+        # Staying put costs 0 unless a negative self-loop exists
+        dist[diagonal, diagonal] = np.minimum(dist[diagonal, diagonal], 0)
+        pred[diagonal, diagonal] = -1
+
+        for k in range(V):
+            # A city with a negative distance to itself lies on a negative cycle. Stop
+            # right away: each further step would keep lowering (and finally wrap) the sums
+            if (dist[diagonal, diagonal] < 0).any():
+                self._negative_cycle(key)
+            if self.cancelled:
+                raise Cancelled("Query cancelled")
+            if progress:
+                progress(k + 1, V)
+            # Try every path i -> k -> j at once
+            to_k, from_k = dist[:, k, None], dist[None, k, :]
+            cand = to_k + from_k
+            better = (cand < dist) & (to_k < self.UNREACHED) & (from_k < self.UNREACHED)
+            dist = np.where(better, cand, dist)
+            pred = np.where(better, pred[None, k, :], pred)
+        if (dist[diagonal, diagonal] < 0).any():
+            self._negative_cycle(key)
+
+        self.dist, self.pred = dist, pred
+        self.negative_cycle = False
+        self.names = list(graph.names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.key = key
+        return True
+
+    def _negative_cycle(self, key):
+        """Remember that graph key has a negative cycle and raise NegativeCycleError"""
+        self.key, self.negative_cycle = key, True
+        self.dist = self.pred = None
+        raise NegativeCycleError("Error: Graph contains a negative weight cycle!")
+
+    def cancel(self):
+        """Stop a running compute() from another thread (in force until reset_cancel())"""
+        self.cancelled = True
+
+    def reset_cancel(self):
+        """Forget an earlier cancel() before starting a new job"""
+        self.cancelled = False
+
+    def tree(self, source):
+        """ShortestPathTree for one source, straight from the cached matrices"""
+        if self.negative_cycle:
+            raise NegativeCycleError("Error: Graph contains a negative weight cycle!")
+        s = self.index[source]
+        dist = [INF if d >= self.UNREACHED else int(d) for d in self.dist[s]]
+        return ShortestPathTree(self.names, source, dist, self.pred[s].tolist(),
+                                cached=True, engine="floyd-warshall", backend="all-pairs")
+
+
+class DynamicShortestPaths:
+    """One source's shortest path tree, repaired incrementally when a single road changes.
+
+    - A road getting cheaper (or a new road) only pushes improvements outward
+      from its destination city.
+    - A tree road getting more expensive (or removed) only invalidates the
+      subtree hanging below it; those cities are re-seeded from their incoming
+      roads and improved again. Roads outside the tree can't change anything.
+
+    There is one weight per ordered city pair, like a cell in the GUI matrix.
+    """
+
+    def __init__(self, graph, tree=None):
+        self.names = list(graph.names)
+        V = len(self.names)
+        # Editable copies of the roads (a Graph's arrays are fixed once built)
+        self.out = [{} for _ in range(V)]  # out[u][v] = weight of road u -> v
+        self.inc = [{} for _ in range(V)]  # inc[v][u] = weight of road u -> v
+        for u, v, w in graph.edges():
+            if v not in self.out[u] or w < self.out[u][v]:
+                self.out[u][v] = self.inc[v][u] = w
+        self.source = tree.source if tree else None
+        self.touched = 0  # Cities re-evaluated by the last update
+        self.needs_full_solve = True
+        if tree is not None:
+            self._load(tree)
+
+    def _load(self, tree):
+        """Take distances and predecessors from a full solve"""
+        self.source = tree.source
+        self.src_index = tree.index[tree.source]
+        self.dist = list(tree.dist)
+        self.pred = list(tree.pred)
+        self.children = [set() for _ in self.names]
+        for v, p in enumerate(self.pred):
+            if p != -1:
+                self.children[p].add(v)
+        self.needs_full_solve = False
+
+    def _full_solve(self):
+        """Recompute from scratch (after a negative cycle left the tree unusable)"""
+        solver = NumpySolver()
+        solver.set_graph(self.names, self.edges())
+        self.touched = len(self.names)
+        self._load(solver.query(self.source))
+
+    def _set_pred(self, v, p):
+        """Move city v under parent p in the tree"""
+        if self.pred[v] != -1:
+            self.children[self.pred[v]].discard(v)
+        self.pred[v] = p
+        if p != -1:
+            self.children[p].add(v)
+
+    def _propagate(self, queue):
+        """Label-correcting pass starting from the cities in queue"""
+        V = len(self.names)
+        queue = deque(queue)
+        in_queue = set(queue)
+        times_queued = {}
+        while queue:
+            u = queue.popleft()
+            in_queue.discard(u)
+            self.touched += 1
+            for v, w in self.out[u].items():
+                if self.dist[u] + w < self.dist[v]:
+                    if v == self.src_index:  # The source can only get cheaper than 0 around a negative cycle
+                        raise NegativeCycleError("Error: Graph contains a negative weight cycle!")
+                    self.dist[v] = self.dist[u] + w
+                    self._set_pred(v, u)
+                    if v not in in_queue:
+                        times_queued[v] = times_queued.get(v, 0) + 1
+                        if times_queued[v] >= V:
+                            raise NegativeCycleError("Error: Graph contains a negative weight cycle!")
+                        queue.append(v)
+                        in_queue.add(v)
+
+    def set_edge(self, u, v, weight):
+        """Change road u -> v to weight (None removes it) and repair the tree.
+
+        Returns the updated ShortestPathTree; raises NegativeCycleError if the
+        change creates a negative cycle reachable from the source.
+        """
+        old = self.out[u].get(v)
+        if weight is None:
+            self.out[u].pop(v, None); self.inc[v].pop(u, None)
+        else:
+            self.out[u][v] = self.inc[v][u] = weight
+        self.touched = 0
+        if self.needs_full_solve:
+            self._full_solve()
+            return self.tree()
+
+        try:
+            if weight is not None and (old is None or weight < old):
+                # Cheaper road: only cities reachable through v can improve
+                if self.dist[u] != INF and self.dist[u] + weight < self.dist[v]:
+                    if v == self.src_index:
+                        raise NegativeCycleError("Error: Graph contains a negative weight cycle!")
+                    self.dist[v] = self.dist[u] + weight
+                    self._set_pred(v, u)
+                    self._propagate([v])
+            elif old is not None and self.pred[v] == u and weight != old:
+                # A tree road got worse: re-solve only the subtree below v
+                subtree, stack = [], [v]
+                while stack:
+                    x = stack.pop()
+                    subtree.append(x)
+                    stack.extend(self.children[x])
+                affected = set(subtree)
+                for x in subtree:
+                    self.dist[x] = INF
+                    self._set_pred(x, -1)
+                # Best way into each affected city from the untouched part of the tree
+                seeds = []
+                for x in subtree:
+                    for p, w in self.inc[x].items():
+                        if p not in affected and self.dist[p] != INF and self.dist[p] + w < self.dist[x]:
+                            self.dist[x] = self.dist[p] + w
+                            self._set_pred(x, p)
+                    if self.dist[x] != INF:
+                        seeds.append(x)
+                self._propagate(seeds)
+        except NegativeCycleError:
+            self.needs_full_solve = True  # Distances are half-updated; start over on the next edit
+            raise
+        return self.tree()
+
+    def edges(self):
+        """Current edge list as (from_index, to_index, weight)"""
+        return [(u, v, w) for u, roads in enumerate(self.out) for v, w in roads.items()]
+
+    def tree(self):
+        """Current ShortestPathTree"""
+        if self.needs_full_solve:
+            self._full_solve()
+        return ShortestPathTree(self.names, self.source, list(self.dist), list(self.pred),
+                                engine="incremental", backend="dynamic")
+
+
+# Solver backends that open_solver() accepts
+BACKENDS = ("auto", "c", "numpy")
+
+
+def open_solver(backend="auto", exe_path=BACKEND_EXE):
+    """Create a solver: "c" (compiled backend), "numpy", or "auto" (C if compiled, else NumPy)"""
+    if backend == "auto":
+        backend = "c" if os.path.exists(exe_path) else "numpy"
+    if backend == "c":
+        return BackendSolver(exe_path)
+    if backend == "numpy":
+        return NumpySolver()
+    raise ValueError(f"Unknown solver backend {backend}")
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from bellman_cache import ResultCache
+from bellman_solver import INF, NegativeCycleError, ShortestPathTree
+
+NAMES = ["A", "B", "C", "D"]
+
+
+def tree():
+    """Small tree with an unreachable city, so INF has to survive the round trip"""
+    return ShortestPathTree(NAMES, "A", [0, 5, -3, INF], [-1, 0, 1, -1], engine="spfa", backend="c")
+
+
+def test_put_then_get_returns_the_same_tree(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    assert cache.get("g1", "A", "auto", NAMES) is None
+    cache.put("g1", "A", "auto", tree())
+    hit = cache.get("g1", "A", "auto", NAMES)
+    assert hit.dist == [0, 5, -3, INF]
+    assert hit.pred == [-1, 0, 1, -1]
+    assert hit.cached and hit.engine == "spfa" and hit.backend == "c via disk cache"
+    assert (cache.hits, cache.misses) == (1, 1)
+    # Another graph, source, engine or city count is a different entry
+    assert cache.get("g2", "A", "auto", NAMES) is None
+    assert cache.get("g1", "B", "auto", NAMES) is None
+    assert cache.get("g1", "A", "classic", NAMES) is None
+    assert cache.get("g1", "A", "auto", NAMES + ["E"]) is None
+
+
+def test_negative_cycle_marker_raises(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.put_negative_cycle("g1", "A", "auto", len(NAMES))
+    with pytest.raises(NegativeCycleError):
+        cache.get("g1", "A", "auto", NAMES)
+    assert cache.hits == 1
+
+
+def test_truncated_entry_is_a_miss_and_removed(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.put("g1", "A", "auto", tree())
+    path = cache.path("g1", "A", "auto")
+    with open(path, "r+b") as f:
+        f.truncate(10)
+    assert cache.get("g1", "A", "auto", NAMES) is None
+    assert not os.path.exists(path)
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    for i, source in enumerate(NAMES):
+        cache.put("g1", source, "auto", tree())
+        os.utime(cache.path("g1", source, "auto"), (1000 + i, 1000 + i))  # A oldest, D newest
+    size = os.path.getsize(cache.path("g1", "A", "auto"))
+    cache.get("g1", "A", "auto", NAMES)  # A hit makes A the most recently used
+    # Room for about three entries: writing a fifth has to drop the two oldest (B and C)
+    cache.max_bytes = int(size * 3.5)
+    cache.used = None
+    cache.put("g2", "A", "auto", tree())
+    left = [source for source in NAMES if os.path.exists(cache.path("g1", source, "auto"))]
+    assert left == ["A", "D"]
+    assert os.path.exists(cache.path("g2", "A", "auto"))
+    assert cache.stats()["disk_cache_bytes"] == 3 * size
+
+
+def test_clear_removes_every_entry(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.put("g1", "A", "auto", tree())
+    cache.put_negative_cycle("g1", "B", "auto", len(NAMES))
+    cache.clear()
+    assert cache.stats()["disk_cache_bytes"] == 0
+    assert cache.get("g1", "A", "auto", NAMES) is None
@@ -0,0 +1,44 @@
+import random
+
+from bellman_graph import Graph
+from bellman_solver import DynamicShortestPaths, NegativeCycleError, NumpySolver
+
+
+def full_solve(names, roads, source):
+    """Distances from a fresh NumpySolver, or "cycle" for a negative cycle"""
+    solver = NumpySolver()
+    solver.set_graph(names, [(u, v, w) for (u, v), w in roads.items()])
+    try:
+        return solver.query(source).distances()
+    except NegativeCycleError:
+        return "cycle"
+
+
+def test_live_edits_match_a_full_solve():
+    rng = random.Random(7)
+    edits = 0
+    while edits < 6000:
+        # A fresh graph every 50 edits, so trees of many shapes get repaired
+        V = rng.randint(3, 12)
+        names = [f"C{i}" for i in range(V)]
+        roads = {(u, v): rng.randint(0, 30) for u in range(V) for v in range(V)
+                 if u != v and rng.random() < 0.3}
+        source = rng.choice(names)
+        solver = NumpySolver()
+        solver.set_graph(names, [(u, v, w) for (u, v), w in roads.items()])
+        dynamic = DynamicShortestPaths(Graph.from_edges(names, [(u, v, w) for (u, v), w in roads.items()]),
+                                       solver.query(source))
+        for _ in range(50):
+            u, v = rng.sample(range(V), 2)
+            # Like clearing or typing a cell; few negative roads, so most graphs stay cycle-free
+            weight = None if rng.random() < 0.2 else rng.randint(-8, -1) if rng.random() < 0.1 else rng.randint(0, 30)
+            if weight is None:
+                roads.pop((u, v), None)
+            else:
+                roads[(u, v)] = weight
+            try:
+                live = dynamic.set_edge(u, v, weight).distances()
+            except NegativeCycleError:
+                live = "cycle"
+            assert live == full_solve(names, roads, source), (names, roads, source, (u, v, weight))
+            edits += 1
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from bellman_generate import generate
+from bellman_solver import NegativeCycleError, NumpySolver
+
+
+@pytest.mark.parametrize("V, topology, density", [(3000, "random", 1e-8), (100, "scale-free", 1e-5),
+                                                  (5000, "random", 1e-8)])
+def test_density_so_low_that_no_road_survives(V, topology, density):
+    graph = generate(V, topology, density, seed=1)
+    assert graph.V == V and graph.E == 0
+
+
+def test_forbid_makes_negative_roads_without_zero_weights_or_cycles():
+    for seed in range(40):
+        graph = generate(30, density=0.2, negative=0.4, cycles="forbid", seed=seed)
+        weight = graph.columns()[2]
+        assert (weight < 0).any()
+        assert not (weight == 0).any()  # The GUI grid would read 0 as "no road"
+        solver = NumpySolver()
+        solver.set_graph_model(graph)
+        try:
+            for source in graph.names[:5]:
+                solver.query(source)
+        except NegativeCycleError:
+            pytest.fail(f"seed {seed} made a negative cycle")
+
+
+def test_same_seed_same_graph():
+    a, b = (generate(200, "geometric", 0.05, negative=0.2, seed=9) for _ in range(2))
+    assert a.digest() == b.digest() and np.array_equal(a.columns()[2], b.columns()[2])
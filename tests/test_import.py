@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from bellman_import import GraphFileError, import_graph, read_graph, snapshot_path
+
+GR = """c small test graph
+p sp 3 3
+a 1 2 10
+a 2 3 -4
+a 3 1 7
+"""
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+def problem_numbers(path):
+    with pytest.raises(GraphFileError) as caught:
+        read_graph(path)
+    return [number for number, _ in caught.value.problems]
+
+
+def test_dimacs_errors_have_line_numbers(tmp_path):
+    path = write(tmp_path, "bad.gr", "p sp 3 2\na 1 2 10\na 1 9 5\nx 2 3\na 2 3 2.5\n")
+    assert problem_numbers(path) == [3, 4, 5]
+
+
+def test_matrix_csv_errors_have_line_numbers(tmp_path):
+    path = write(tmp_path, "bad.csv", ",A,B\nA,0,5\nZ,1,0\nB,3\n")
+    assert problem_numbers(path) == [3, 4]
+
+
+def test_json_errors_name_the_road(tmp_path):
+    path = write(tmp_path, "bad.json", '{"cities": ["A", "B"], "roads": [["A", "B", 1], ["A", "B"], ["B", "A", 1.5]]}')
+    assert problem_numbers(path) == ["roads[1]", "roads[2]"]
+
+
+def test_unchanged_file_is_opened_from_its_snapshot(tmp_path):
+    path = write(tmp_path, "roads.gr", GR)
+    snapshots = str(tmp_path / "snapshots")
+    parsed = import_graph(path, snapshots)
+    assert not isinstance(parsed.offsets, memoryview)  # Parsed from the text
+    snapshot = snapshot_path(path, snapshots)
+    saved = os.stat(snapshot).st_mtime_ns
+    mapped = import_graph(path, snapshots)
+    assert isinstance(mapped.offsets, memoryview)  # Views of the mapped snapshot
+    assert mapped == parsed and mapped.digest() == parsed.digest()
+    assert os.stat(snapshot).st_mtime_ns == saved  # Not written again
+
+
+def test_changed_file_is_parsed_again(tmp_path):
+    path = write(tmp_path, "roads.gr", GR)
+    snapshots = str(tmp_path / "snapshots")
+    before = import_graph(path, snapshots)
+    write(tmp_path, "roads.gr", GR.replace("a 2 3 -4", "a 2 3 -40"))  # New size, whatever the clock resolution
+    after = import_graph(path, snapshots)
+    assert not isinstance(after.offsets, memoryview)
+    assert after.weight(1, 2) == -40 and after.digest() != before.digest()
+    # Same size and content but a new modification time also counts as changed
+    info = os.stat(path)
+    os.utime(path, ns=(info.st_atime_ns, info.st_mtime_ns + 10**9))
+    assert not isinstance(import_graph(path, snapshots).offsets, memoryview)
+    assert isinstance(import_graph(path, snapshots).offsets, memoryview)  # Snapshot refreshed
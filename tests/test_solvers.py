@@ -0,0 +1,145 @@
+import os
+import random
+
+import pytest
+
+from bellman_graph import Graph
+from bellman_solver import BACKEND_EXE, INF, AllPairs, BackendSolver, Cancelled, NegativeCycleError, NumpySolver
+
+needs_backend = pytest.mark.skipif(not os.path.exists(BACKEND_EXE),
+                                   reason="C backend not compiled (gcc bellman_backend.c -o bellman_backend.exe)")
+
+
+def random_graph(rng):
+    """Small random graph with some negative roads, so some graphs have negative cycles"""
+    V = rng.randint(2, 12)
+    names = [f"C{i}" for i in range(V)]
+    edges = [(u, v, rng.randint(-5, 30)) for u in range(V) for v in range(V)
+             if u != v and rng.random() < 0.3]
+    return names, edges
+
+
+def solve(solver, source, engine):
+    """Distances from source, or "cycle" when the solver reports a negative cycle"""
+    try:
+        return solver.query(source, engine).distances()
+    except NegativeCycleError:
+        return "cycle"
+
+
+@needs_backend
+def test_c_backend_matches_numpy_on_random_graphs():
+    rng = random.Random(5)
+    c, numpy = BackendSolver(), NumpySolver()
+    try:
+        for _ in range(500):
+            names, edges = random_graph(rng)
+            c.set_graph(names, edges)
+            numpy.set_graph(names, edges)
+            source = rng.choice(names)
+            for engine in ("classic", "early-exit", "spfa"):
+                assert solve(c, source, engine) == solve(numpy, source, engine), (names, edges, source, engine)
+    finally:
+        c.close()
+
+
+@needs_backend
+@pytest.mark.parametrize("engine", ["classic", "early-exit", "spfa", "dijkstra"])
+def test_c_backend_sums_large_weights_without_overflow(engine):
+    names, edges = ["A", "B", "C"], [(0, 1, 2000000000), (1, 2, 2000000000)]
+    c, numpy = BackendSolver(), NumpySolver()
+    try:
+        c.set_graph(names, edges)
+        numpy.set_graph(names, edges)
+        assert c.query("A", engine).distance("C") == 4000000000
+        assert numpy.query("A", engine).distance("C") == 4000000000
+        assert c.route("A", "C").distance == c.route("A", "C", bidirectional=True).distance == 4000000000
+    finally:
+        c.close()
+
+
+@pytest.mark.parametrize("solver_class", [pytest.param(BackendSolver, marks=needs_backend), NumpySolver])
+def test_query_after_cancel_and_reset(solver_class):
+    graph = Graph.from_edges(["A", "B", "C"], [(0, 1, 4), (1, 2, 5)])
+    solver = solver_class()
+    try:
+        solver.set_graph_model(graph)
+        solver.cancel()  # Kills an idle C worker: the next query has to restart it with the graph
+        with pytest.raises(Cancelled):
+            solver.query("A")
+        solver.reset_cancel()
+        assert solver.query("A").distances() == {"A": 0, "B": 4, "C": 9}
+        assert solver.route("A", "C").distance == 9
+    finally:
+        solver.close()
+
+
+@pytest.mark.parametrize("solver_class", [pytest.param(BackendSolver, marks=needs_backend), NumpySolver])
+def test_memo_hit_reports_the_engine_that_solved_it(solver_class):
+    solver = solver_class()
+    try:
+        solver.set_graph(["A", "B"], [(0, 1, 3)])
+        assert solver.query("A", "spfa").engine == "spfa"
+        tree = solver.query("A", "classic")  # Same distances, answered from the memo row
+        assert tree.cached and tree.engine == "spfa"
+    finally:
+        solver.close()
+
+
+@pytest.mark.parametrize("solver_class", [pytest.param(BackendSolver, marks=needs_backend), NumpySolver])
+def test_routes_match_a_full_solve(solver_class):
+    rng = random.Random(11)
+    solver = solver_class()
+    try:
+        for _ in range(200):
+            names, edges = random_graph(rng)
+            edges = [(u, v, abs(w)) for u, v, w in edges]  # Point-to-point search needs non-negative roads
+            graph = Graph.from_edges(names, edges)
+            solver.set_graph_model(graph)
+            source, target = rng.choice(names), rng.choice(names)
+            expected = solver.query(source, "classic").distance(target)
+            for bidirectional in (False, True):
+                route = solver.route(source, target, bidirectional)
+                assert route.distance == expected, (names, edges, source, target, bidirectional)
+                if expected == INF:
+                    assert route.path == []
+                else:  # The path really is a route of that length
+                    assert route.path[0] == source and route.path[-1] == target
+                    index = graph.index
+                    assert sum(graph.weight(index[a], index[b]) for a, b in zip(route.path, route.path[1:])) == expected
+    finally:
+        solver.close()
+
+
+def test_all_pairs_matches_numpy():
+    rng = random.Random(13)
+    all_pairs, numpy = AllPairs(), NumpySolver()
+    cycles = 0
+    for _ in range(200):
+        names, edges = random_graph(rng)
+        graph = Graph.from_edges(names, edges)
+        numpy.set_graph_model(graph)
+        answers = {source: solve(numpy, source, "classic") for source in names}
+        if "cycle" in answers.values():
+            # Any negative cycle stops Floyd-Warshall, and the verdict is cached for the graph
+            cycles += 1
+            for _ in range(2):
+                with pytest.raises(NegativeCycleError):
+                    all_pairs.compute(graph)
+            continue
+        assert all_pairs.compute(graph)
+        assert all_pairs.matches(graph) and not all_pairs.compute(graph)  # Second call reuses the matrices
+        for source in names:
+            tree = all_pairs.tree(source)
+            assert tree.distances() == answers[source], (names, edges, source)
+            for target in names:  # Predecessors give a path of exactly that length
+                path = tree.path_indices(target)
+                if path:
+                    assert sum(graph.weight(u, v) for u, v in zip(path, path[1:])) == tree.distance(target)
+    assert cycles > 0
+
+
+def test_all_pairs_refuses_big_graphs():
+    graph = Graph.from_edges([str(i) for i in range(AllPairs.MAX_CITIES + 1)], [(0, 1, 1)])
+    with pytest.raises(ValueError):
+        AllPairs().compute(graph)